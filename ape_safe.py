@@ -1,28 +1,46 @@
-from copy import copy
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from copy import copy, deepcopy
+from io import StringIO
 from typing import Dict, List, Union, Optional
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 
 import click
+import multiprocessing
 import os
+import random
 import requests
+import socket
+import threading
+import time
 from web3 import Web3  # don't move below brownie import
-from brownie import Contract, accounts, chain, history, web3
+from brownie import Contract, accounts, chain, history, network, project, web3
+from brownie._config import CONFIG
 from brownie.convert.datatypes import EthAddress
+from brownie.exceptions import VirtualMachineError
+from brownie.network.event import EventDict, _decode_logs
+from brownie.network.state import _find_contract
 from brownie.network.account import LocalAccount
 from brownie.network.transaction import TransactionReceipt
 from eth_abi import encode_abi
-from eth_utils import is_address, to_checksum_address
+from eth_utils import is_address, keccak, to_checksum_address
 from gnosis.eth import EthereumClient
 from gnosis.safe import Safe, SafeOperation
 from gnosis.safe.multi_send import MultiSend, MultiSendOperation, MultiSendTx
 from gnosis.safe.safe_tx import SafeTx
 from gnosis.safe.signatures import signature_split, signature_to_bytes
 from hexbytes import HexBytes
+from requests.adapters import HTTPAdapter
 from trezorlib import tools, ui, ethereum
 from trezorlib.client import TrezorClient
 from trezorlib.messages import EthereumSignMessage
 from trezorlib.transport import get_transport
 
+from helpers.cache import cache_path, dump_json, load_json
+from helpers.contracts import get_contract
+
+# seconds between two full listings of the pending queue, see `PendingTransactionCache`
+FULL_SYNC_INTERVAL = 600
 MULTISEND_CALL_ONLY = "0x40A2aCCbd92BCA938b02010E17A5b8929b49130D"
 multisends = {
     250: "0x10B62CC1E8D9a9f1Ad05BCC491A7984697c19f7E",
@@ -46,6 +64,11 @@ transaction_service = {
 }
 
 
+# storage layout of the safe singleton, see SafeStorage.sol
+APPROVED_HASHES_SLOT = 8
+TRANSFER_TOPIC = HexBytes(keccak(text="Transfer(address,address,uint256)"))
+
+
 class ExecutionFailure(Exception):
     pass
 
@@ -54,8 +77,311 @@ class ApiError(Exception):
     pass
 
 
+class TransactionServiceClient:
+    """
+    Session-based HTTP client for the Safe transaction service.
+
+    Connections are pooled and kept alive across calls, every request gets a
+    (connect, read) timeout, idempotent requests are retried with jittered
+    exponential backoff on connection errors and 429/5xx responses, and
+    requests to the same host are spaced out by `min_interval` seconds.
+    """
+
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        timeout=(5, 30),
+        retries=5,
+        backoff=0.5,
+        max_backoff=30,
+        min_interval=0.2,
+        pool_size=10,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.min_interval = min_interval
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def _throttle(self, url):
+        # reserve the next free slot for this host and wait for it
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _sleep_before_retry(self, attempt, retry_after=None):
+        # full jitter: https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.max_backoff, int(retry_after)))
+        time.sleep(delay)
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        # a POST that reached the server may have been processed, so only
+        # requests without side effects are retried
+        retries = self.retries if method.upper() in self.IDEMPOTENT_METHODS else 0
+        for attempt in range(retries + 1):
+            self._throttle(url)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+            if response.status_code not in self.RETRY_STATUSES or attempt == retries:
+                return response
+            self._sleep_before_retry(attempt, response.headers.get("Retry-After"))
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+# shared by all safes so that pooling and rate limiting span the whole session
+default_client = TransactionServiceClient()
+
+
+class PendingTransactionCache:
+    """
+    Local mirror of the queued multisig transactions of a safe.
+
+    Raw service entries are kept in memory and persisted to disk, indexed by
+    nonce and safe_tx_hash. Each sync only requests the entries modified
+    after the latest `modified` timestamp seen so far and drops everything
+    that got executed or fell below the on-chain nonce. Deleted entries are
+    never reported as modified, and confirmations don't always bump it, so
+    every `FULL_SYNC_INTERVAL` seconds the whole queue is listed, changed
+    entries are replaced and entries missing from it are dropped. Decoded
+    SafeTx objects are built lazily and reused until their entry changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        stored = load_json(path, default={})
+        self.last_modified = stored.get("last_modified")
+        self.last_full_sync = stored.get("last_full_sync", 0)
+        self.nonce = stored.get("nonce", 0)
+        # safe_tx_hash -> raw entry from the transaction service
+        self.entries = stored.get("transactions", {})
+        self.by_nonce = {}
+        self.decoded = {}
+        for safe_tx_hash, entry in self.entries.items():
+            self.by_nonce.setdefault(entry["nonce"], set()).add(safe_tx_hash)
+
+    def upsert(self, entry):
+        safe_tx_hash = entry["safeTxHash"]
+        previous = self.entries.get(safe_tx_hash)
+        # `modified` is not bumped reliably (e.g. on new confirmations)
+        if previous == entry:
+            return
+        if previous:
+            self.by_nonce[previous["nonce"]].discard(safe_tx_hash)
+        self.decoded.pop(safe_tx_hash, None)
+        self.entries[safe_tx_hash] = entry
+        self.by_nonce.setdefault(entry["nonce"], set()).add(safe_tx_hash)
+        if self.last_modified is None or entry["modified"] > self.last_modified:
+            self.last_modified = entry["modified"]
+
+    def prune(self, nonce):
+        self.nonce = nonce
+        for safe_tx_hash, entry in list(self.entries.items()):
+            if entry["nonce"] >= nonce and not entry["isExecuted"]:
+                continue
+            del self.entries[safe_tx_hash]
+            self.decoded.pop(safe_tx_hash, None)
+            self.by_nonce[entry["nonce"]].discard(safe_tx_hash)
+            if not self.by_nonce[entry["nonce"]]:
+                del self.by_nonce[entry["nonce"]]
+
+    def needs_full_sync(self):
+        return (
+            self.last_modified is None
+            or time.time() - self.last_full_sync > FULL_SYNC_INTERVAL
+        )
+
+    def retain(self, safe_tx_hashes):
+        # after a full listing: whatever the service didn't return was deleted
+        self.last_full_sync = time.time()
+        for safe_tx_hash in set(self.entries) - set(safe_tx_hashes):
+            entry = self.entries.pop(safe_tx_hash)
+            self.decoded.pop(safe_tx_hash, None)
+            self.by_nonce[entry["nonce"]].discard(safe_tx_hash)
+            if not self.by_nonce[entry["nonce"]]:
+                del self.by_nonce[entry["nonce"]]
+
+    def hashes_at(self, nonce) -> List[str]:
+        # same order the service queue shows them in: oldest submission first
+        return sorted(
+            self.by_nonce.get(nonce, ()),
+            key=lambda h: self.entries[h]["submissionDate"],
+        )
+
+    def save(self):
+        dump_json(
+            self.path,
+            {
+                "last_modified": self.last_modified,
+                "last_full_sync": self.last_full_sync,
+                "nonce": self.nonce,
+                "transactions": self.entries,
+            },
+        )
+
+
+class OverridePreview:
+    """
+    Result of a safe tx preview run as a single `debug_traceCall` with state overrides.
+
+    Mirrors the parts of a brownie `TransactionReceipt` the preview helpers rely
+    on: `sender`, `receiver`, `input`, `value`, `nonce`, `gas_used`, `status`,
+    `events`, `info()` and `call_trace()`. Nothing is mined, so the fork state
+    is left untouched.
+    """
+
+    def __init__(self, sender, receiver, calldata, value, trace):
+        self.sender = sender
+        self.receiver = receiver
+        self.input = calldata
+        self.value = value
+        self.nonce = web3.eth.get_transaction_count(sender.address)
+        self.trace = trace
+        self.gas_used = int(trace["gasUsed"], 16)
+        self.status = 0 if trace.get("error") else 1
+        self.revert_msg = trace.get("revertReason") or trace.get("error")
+        logs = [
+            {**log, "address": to_checksum_address(log["address"])}
+            for log in self._flatten_logs(trace)
+        ]
+        self.events = _decode_logs(logs) if logs else EventDict()
+
+    @classmethod
+    def _flatten_logs(cls, frame) -> List[Dict]:
+        # logs of reverted frames never make it on chain
+        if frame.get("error"):
+            return []
+        # `position` is the number of subcalls made before the log was emitted
+        calls = frame.get("calls", [])
+        logs = sorted(
+            frame.get("logs", []),
+            key=lambda log: int(str(log.get("position", len(calls))), 0),
+        )
+        flat, i = [], 0
+        for n, call in enumerate(calls):
+            while i < len(logs) and int(str(logs[i].get("position", n)), 0) <= n:
+                flat.append(logs[i])
+                i += 1
+            flat.extend(cls._flatten_logs(call))
+        return flat + logs[i:]
+
+    def info(self):
+        status = "Success" if self.status else f"Reverted ({self.revert_msg})"
+        print(f"Override preview of {self.receiver}")
+        print(f"  From: {self.sender.address}")
+        print(f"  Status: {status}")
+        print(f"  Gas Used: {self.gas_used}")
+        if self.events:
+            print("\n  Events In This Transaction")
+            for event in self.events:
+                print(f"  {event.name}")
+                for key, value in event.items():
+                    print(f"      {key}: {value}")
+
+    def call_trace(self, expand=False):
+        print(f"Call trace for override preview of {self.receiver}:")
+        self._print_frame(self.trace, 0, expand)
+
+    def _print_frame(self, frame, depth, expand):
+        contract = _find_contract(frame["to"])
+        target = contract._name if contract else to_checksum_address(frame["to"])
+        method = frame["input"][:10]
+        if contract and contract.get_method(frame["input"]):
+            method = contract.get_method(frame["input"])
+        line = f"{'  ' * depth}{frame['type']} {target}.{method}  [{int(frame['gasUsed'], 16)} gas]"
+        if frame.get("error"):
+            line += f"  <- {frame.get('revertReason') or frame['error']}"
+        print(line)
+        # without expand only the calls made directly by the safe are shown
+        if expand or depth == 0:
+            for call in frame.get("calls", []):
+                self._print_frame(call, depth + 1, expand)
+
+
+def approved_hash_slot(owner, safe_tx_hash) -> str:
+    """
+    Storage slot of `approvedHashes[owner][safe_tx_hash]` in a Safe, a
+    mapping(address => mapping(bytes32 => uint256)) at `APPROVED_HASHES_SLOT`.
+    """
+    owner_slot = keccak(encode_abi(["address", "uint"], [owner, APPROVED_HASHES_SLOT]))
+    return "0x" + keccak(bytes(HexBytes(safe_tx_hash)) + owner_slot).hex()
+
+
+def _free_ports(count) -> List[int]:
+    # let the os pick unused ports, all bound at once so they are distinct
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_STREAM) for _ in range(count)]
+    try:
+        for sock in sockets:
+            sock.bind(("127.0.0.1", 0))
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+# per process safe used by the isolated preview workers, see `_init_fork_worker`
+_fork_safe = None
+
+
+def _init_fork_worker(network_id, project_path, ports, fork_block, safe_address):
+    # every worker launches its own fork on its own port, from a copy of the
+    # network config registered under its own id so `network_id` is left as is
+    global _fork_safe
+    if project_path:
+        project.load(project_path)
+    worker_network = dict(deepcopy(CONFIG.networks[network_id]))
+    settings = dict(worker_network["cmd_settings"])
+    fork = settings["fork"]
+    if fork in CONFIG.networks:
+        settings["chain_id"] = int(CONFIG.networks[fork]["chainid"])
+        fork = CONFIG.networks[fork]["host"]
+    if fork_block:
+        fork = f"{fork.split('@')[0]}@{fork_block}"
+    settings.update(fork=fork, port=ports.get())
+    worker_id = f"{network_id}-preview-worker"
+    worker_network.update(id=worker_id, cmd_settings=settings)
+    CONFIG.networks[worker_id] = worker_network
+    network.connect(worker_id)
+    _fork_safe = ApeSafe(safe_address)
+
+
+def _simulate_in_fork(fields):
+    chain.snapshot()
+    try:
+        safe_tx = _fork_safe.build_multisig_tx(**fields)
+        return _fork_safe.simulate(safe_tx)
+    finally:
+        chain.revert()
+
+
 class ApeSafe(Safe):
-    def __init__(self, address, base_url=None, multisend=None):
+    def __init__(self, address, base_url=None, multisend=None, client=None):
         """
         Create an ApeSafe from an address or a ENS name and use a default connection.
         """
@@ -67,7 +393,11 @@ class ApeSafe(Safe):
         ethereum_client = EthereumClient(web3.provider.endpoint_uri)
         self.base_url = base_url or transaction_service[chain.id]
         self.multisend = multisend or multisends.get(chain.id, MULTISEND_CALL_ONLY)
+        self.client = client or default_client
         super().__init__(address, ethereum_client)
+        self.tx_cache = PendingTransactionCache(
+            cache_path("pending_txs", chain.id, f"{self.address}.json")
+        )
 
     def __str__(self):
         return EthAddress(self.address)
@@ -86,9 +416,7 @@ class ApeSafe(Safe):
         """
         Instantiate a Brownie Contract owned by Safe account.
         """
-        if not web3.isChecksumAddress(address):
-            address = web3.ens.resolve(address)
-        return Contract(address, owner=self.account)
+        return get_contract(address, owner=self.account)
 
     def pending_nonce(self) -> int:
         """
@@ -97,9 +425,15 @@ class ApeSafe(Safe):
         url = urljoin(
             self.base_url, f"/api/v1/safes/{self.address}/multisig-transactions/"
         )
-        results = requests.get(url).json()["results"]
+        results = self._get_results(url)
         return results[0]["nonce"] + 1 if results else 0
 
+    def _get_results(self, url, params=None) -> List[Dict]:
+        response = self.client.get(url, params=params)
+        if not response.ok:
+            raise ApiError(f"Error fetching {url}: {response.text}")
+        return response.json()["results"]
+
     def tx_from_receipt(
         self,
         receipt: TransactionReceipt,
@@ -297,7 +631,7 @@ class ApeSafe(Safe):
             "signature": safe_tx.signatures.hex() if safe_tx.signatures else None,
             "origin": "github.com/banteg/ape-safe",
         }
-        response = requests.post(url, json=data)
+        response = self.client.post(url, json=data)
         if not response.ok:
             raise ApiError(f"Error posting transaction: {response.text}")
 
@@ -309,20 +643,43 @@ class ApeSafe(Safe):
             self.base_url,
             f"/api/v1/multisig-transactions/{safe_tx.safe_tx_hash.hex()}/confirmations/",
         )
-        response = requests.post(url, json={"signature": HexBytes(signature).hex()})
+        response = self.client.post(url, json={"signature": HexBytes(signature).hex()})
         if not response.ok:
             raise ApiError(f"Error posting signature: {response.text}")
 
-    @property
-    def pending_transactions(self) -> List[SafeTx]:
+    def sync_pending_transactions(self) -> PendingTransactionCache:
         """
-        Retrieve pending transactions from the transaction service.
+        Bring the local pending transactions cache up to date with the transaction service.
         """
-        url = urljoin(self.base_url, f"/api/v1/safes/{self.address}/transactions/")
-        results = requests.get(url).json()["results"]
+        url = urljoin(
+            self.base_url, f"/api/v1/safes/{self.address}/multisig-transactions/"
+        )
         nonce = self.retrieve_nonce()
-        transactions = [
-            self.build_multisig_tx(
+        params = {"nonce__gte": nonce, "ordering": "modified", "limit": 100}
+        full = self.tx_cache.needs_full_sync()
+        if not full:
+            params["modified__gt"] = self.tx_cache.last_modified
+        seen = []
+        while url:
+            response = self.client.get(url, params=params)
+            if not response.ok:
+                raise ApiError(f"Error fetching {url}: {response.text}")
+            page = response.json()
+            for tx in page["results"]:
+                self.tx_cache.upsert(tx)
+                seen.append(tx["safeTxHash"])
+            # `next` already carries the query string
+            url, params = page["next"], None
+        if full:
+            self.tx_cache.retain(seen)
+        self.tx_cache.prune(nonce)
+        self.tx_cache.save()
+        return self.tx_cache
+
+    def _decode_pending(self, safe_tx_hash) -> SafeTx:
+        if safe_tx_hash not in self.tx_cache.decoded:
+            tx = self.tx_cache.entries[safe_tx_hash]
+            self.tx_cache.decoded[safe_tx_hash] = self.build_multisig_tx(
                 to=tx["to"],
                 value=int(tx["value"]),
                 data=HexBytes(tx["data"] or b""),
@@ -335,10 +692,28 @@ class ApeSafe(Safe):
                 signatures=self.confirmations_to_signatures(tx["confirmations"]),
                 safe_nonce=tx["nonce"],
             )
-            for tx in reversed(results)
-            if tx["nonce"] >= nonce and not tx["isExecuted"]
+        # signing helpers assign `signatures` on the tx they get, hand out copies so
+        # a failed post doesn't leave a half signed tx in the cache
+        return copy(self.tx_cache.decoded[safe_tx_hash])
+
+    @property
+    def pending_transactions(self) -> List[SafeTx]:
+        """
+        Retrieve pending transactions from the transaction service.
+        """
+        cache = self.sync_pending_transactions()
+        return [
+            self._decode_pending(safe_tx_hash)
+            for nonce in sorted(cache.by_nonce)
+            for safe_tx_hash in cache.hashes_at(nonce)
         ]
-        return transactions
+
+    def pending_transaction_by_nonce(self, nonce: int) -> Optional[SafeTx]:
+        """
+        Retrieve the first pending transaction queued at `nonce`, if any.
+        """
+        hashes = self.sync_pending_transactions().hashes_at(nonce)
+        return self._decode_pending(hashes[0]) if hashes else None
 
     def confirmations_to_signatures(self, confirmations: List[Dict]) -> bytes:
         """
@@ -405,6 +780,78 @@ class ApeSafe(Safe):
             receipt.call_trace(True)
         return receipt
 
+    def preview_with_overrides(
+        self, safe_tx: SafeTx, events=True, call_trace=False
+    ) -> OverridePreview:
+        """
+        Dry run a Safe transaction as one `debug_traceCall`, forging the owners' approvals
+        through a state override of `approvedHashes` instead of mining `approveHash` calls.
+        Needs a node implementing `debug_traceCall` with state overrides (geth, anvil,
+        erigon), ganache-cli does not.
+        """
+        tx = copy(safe_tx)
+        safe = Contract.from_abi("Gnosis Safe", self.address, self.get_contract().abi)
+        tx.safe_nonce = safe.nonce()
+        threshold = safe.getThreshold()
+        sorted_owners = sorted(safe.getOwners(), key=lambda x: int(x, 16))
+        owners = sorted_owners[:threshold]
+        # the first owner sends the call, the rest pre-approve the hash
+        approved = "0x" + (1).to_bytes(32, "big").hex()
+        state_diff = {
+            approved_hash_slot(owner, tx.safe_tx_hash): approved for owner in owners[1:]
+        }
+        tx.signatures = b"".join(
+            [encode_abi(["address", "uint"], [owner, 0]) + b"\x01" for owner in owners]
+        )
+        calldata = safe.execTransaction.encode_input(
+            tx.to,
+            tx.value,
+            HexBytes(tx.data).hex(),
+            tx.operation,
+            tx.safe_tx_gas,
+            tx.base_gas,
+            tx.gas_price,
+            tx.gas_token,
+            tx.refund_receiver,
+            tx.signatures.hex(),
+        )
+        call = {
+            "from": owners[0],
+            "to": self.address,
+            "data": calldata,
+            "gas": hex(chain.block_gas_limit),
+        }
+        config = {
+            "tracer": "callTracer",
+            "tracerConfig": {"withLog": True},
+            "stateOverrides": {self.address: {"stateDiff": state_diff}},
+        }
+        response = web3.provider.make_request(
+            "debug_traceCall", [call, "latest", config]
+        )
+        if "error" in response:
+            raise ApiError(
+                f"debug_traceCall with state overrides is not supported by this node, "
+                f"preview with the fork engine instead: {response['error']}"
+            )
+        receipt = OverridePreview(
+            accounts.at(owners[0], force=True),
+            self.address,
+            calldata,
+            0,
+            response["result"],
+        )
+
+        if "ExecutionSuccess" not in receipt.events:
+            receipt.info()
+            receipt.call_trace(True)
+            raise ExecutionFailure()
+        if events:
+            receipt.info()
+        if call_trace:
+            receipt.call_trace(True)
+        return receipt
+
     def execute_transaction(self, safe_tx: SafeTx, signer=None) -> TransactionReceipt:
         """
         Execute a fully signed transaction likely retrieved from the pending_transactions method.
@@ -445,3 +892,130 @@ class ApeSafe(Safe):
         """
         for safe_tx in self.pending_transactions:
             self.preview(safe_tx, events=events, call_trace=call_trace, reset=False)
+
+    def _token_deltas(self, receipt: TransactionReceipt) -> Dict[str, int]:
+        # net erc20 flows of the safe, read from the raw Transfer logs
+        deltas = {}
+        for log in receipt.logs:
+            topics = [HexBytes(topic) for topic in log["topics"]]
+            if len(topics) != 3 or topics[0] != TRANSFER_TOPIC:
+                continue
+            token = to_checksum_address(log["address"])
+            amount = int(HexBytes(log["data"]).hex(), 16)
+            if to_checksum_address(topics[1][-20:]) == self.address:
+                deltas[token] = deltas.get(token, 0) - amount
+            if to_checksum_address(topics[2][-20:]) == self.address:
+                deltas[token] = deltas.get(token, 0) + amount
+        return {token: delta for token, delta in deltas.items() if delta != 0}
+
+    def simulate(self, safe_tx: SafeTx) -> Dict:
+        """
+        Preview a Safe transaction on top of the current fork state without raising,
+        and summarise its outcome.
+        """
+        result = {
+            "nonce": safe_tx.safe_nonce,
+            "safe_tx_hash": safe_tx.safe_tx_hash.hex(),
+            "success": False,
+            "gas_used": None,
+            "eth_delta": 0,
+            "token_deltas": {},
+            "error": None,
+        }
+        eth_before = self.account.balance()
+        last_tx = history[-1] if history else None
+        try:
+            with redirect_stdout(StringIO()):
+                receipt = self.preview(safe_tx, events=False, reset=False)
+            result["success"] = True
+            result["gas_used"] = receipt.gas_used
+            result["token_deltas"] = self._token_deltas(receipt)
+        except (ExecutionFailure, VirtualMachineError) as e:
+            # the last tx may be one of the approveHash calls, only its revert
+            # reason is reported, its gas isn't the exec's
+            receipt = history[-1] if history and history[-1] != last_tx else None
+            result["error"] = (receipt and receipt.revert_msg) or repr(e)
+        result["eth_delta"] = self.account.balance() - eth_before
+        return result
+
+    def simulate_pending(
+        self, isolated=True, workers=0, fork_block=None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Simulate the pending queue from a single fork snapshot.
+
+        "queue" applies the pending transactions in nonce order on top of each
+        other, so every result includes the effect of the ones before it.
+        "isolated" previews each transaction alone against the snapshot. With
+        `workers` > 0 the isolated previews run in a process pool, each worker
+        on its own fork of the upstream node at `fork_block` (or its latest
+        block). The workers never see transactions sent on the local fork, so
+        the pool is refused once any were.
+        """
+        queue, seen = [], set()
+        for safe_tx in self.pending_transactions:
+            # replacements share a nonce, only the first one queued can execute
+            if safe_tx.safe_nonce not in seen:
+                seen.add(safe_tx.safe_nonce)
+                queue.append(safe_tx)
+
+        pool = None
+        if isolated and workers and queue:
+            ## workers fork upstream, local changes would only show in "queue"
+            assert (
+                len(history) == 0
+            ), "Error: local fork has transactions the workers cannot see, use workers=0"
+            loaded = project.get_loaded_projects()
+            ctx = multiprocessing.get_context("spawn")
+            ports = ctx.Manager().Queue()
+            for port in _free_ports(workers):
+                ports.put(port)
+            pool = ProcessPoolExecutor(
+                workers,
+                mp_context=ctx,
+                initializer=_init_fork_worker,
+                initargs=(
+                    network.show_active(),
+                    str(loaded[0]._path) if loaded else None,
+                    ports,
+                    fork_block,
+                    self.address,
+                ),
+            )
+            # submit first so the forks spin up while the queue runs locally
+            futures = [
+                pool.submit(
+                    _simulate_in_fork,
+                    {
+                        "to": safe_tx.to,
+                        "value": safe_tx.value,
+                        "data": bytes(safe_tx.data),
+                        "operation": safe_tx.operation,
+                        "safe_tx_gas": safe_tx.safe_tx_gas,
+                        "base_gas": safe_tx.base_gas,
+                        "gas_price": safe_tx.gas_price,
+                        "gas_token": safe_tx.gas_token,
+                        "refund_receiver": safe_tx.refund_receiver,
+                        "safe_nonce": safe_tx.safe_nonce,
+                    },
+                )
+                for safe_tx in queue
+            ]
+
+        results = {"queue": []}
+        chain.snapshot()
+        try:
+            for safe_tx in queue:
+                results["queue"].append(self.simulate(safe_tx))
+            if isolated and pool:
+                results["isolated"] = [future.result() for future in futures]
+            elif isolated:
+                results["isolated"] = []
+                for safe_tx in queue:
+                    chain.revert()
+                    results["isolated"].append(self.simulate(safe_tx))
+        finally:
+            chain.revert()
+            if pool:
+                pool.shutdown()
+        return results
@@ -3,12 +3,13 @@ import os
 import requests
 from decimal import Decimal
 
-from brownie import Contract, chain, interface
+from brownie import chain, interface
 from rich.pretty import pprint
 from rich.prompt import Confirm
 
 from great_ape_safe.ape_api.helpers.coingecko import get_cg_price
 from helpers.addresses import registry
+from helpers.contracts import get_contract
 
 
 class Cow:
@@ -137,7 +138,7 @@ class Cow:
                     ):
                         raise
             try:
-                processor = Contract(origin)
+                processor = get_contract(origin)
             except ValueError:
                 # origin is not a (verified) contract
                 pass
@@ -1,10 +1,16 @@
+from contextlib import contextmanager
 from datetime import datetime
 from enum import Enum
+from functools import cached_property
 
-from brownie import interface, chain
+from brownie import interface, chain, multicall
+from eth_utils import to_checksum_address
 from rich.console import Console
+from great_ape_safe.ape_api.helpers.ebtc.authority import read_authority_state
+from great_ape_safe.ape_api.helpers.ebtc.signatures import GOVERNANCE_SIGNATURES
+from great_ape_safe.ape_api.helpers.ebtc.sorted_cdps import SortedCdpsMirror, nominal_cr
 from helpers.addresses import registry, r
-from helpers.utils import encode_signature, approx
+from helpers.utils import approx, hash_operation, hash_operation_batch
 from helpers.constants import (
     EmptyBytes32,
     AddressZero,
@@ -15,18 +21,153 @@ from helpers.constants import (
     MAX_MINUTE_DECAY_FACTOR,
     MINIMUM_GRACE_PERIOD,
     MAX_FEE_BPS,
+    TIMELOCK_ADMIN_ROLE,
+    PROPOSER_ROLE,
+    EXECUTOR_ROLE,
+    CANCELLER_ROLE,
+    DONE_TIMESTAMP,
 )
 
 
 C = Console()
 
 
+# role hashes are the same on every timelock, no need to read them on chain
+TIMELOCK_ROLES = {
+    "PROPOSER_ROLE": PROPOSER_ROLE,
+    "CANCELLER_ROLE": CANCELLER_ROLE,
+    "EXECUTOR_ROLE": EXECUTOR_ROLE,
+    "TIMELOCK_ADMIN_ROLE": TIMELOCK_ADMIN_ROLE,
+}
+
+
 class CdpStatus(Enum):
     # NOTE: there are more states, adding `2` to avoid magic numbers in code
     CLOSED = 2
 
 
+# Contains a mapping of governancce roles to the role numbers used in the authority contract
+class governanceRoles(Enum):
+    ADMIN = 0  # Admin
+    EBTC_MINTER = 1  # eBTCToken: mint
+    EBTC_BURNER = 2  # eBTCToken: burn
+    CDP_MANAGER_ALL = 3  # CDPManager: all
+    PAUSER = 4  # CDPManager+BorrowerOperations+ActivePool: pause
+    FL_FEE_ADMIN = 5  # BorrowerOperations+ActivePool: setFeeBps
+    SWEEPER = 6  # ActivePool+CollSurplusPool: sweepToken
+    FEE_CLAIMER = 7  # ActivePool: claimFeeRecipientCollShares
+    PRIMARY_ORACLE_SETTER = 8  # EbtcFeed: setPrimaryOracle
+    SECONDARY_ORACLE_SETTER = 9  # EbtcFeed: setSecondaryOracle
+    FALLBACK_CALLER_SETTER = 10  # PriceFeed: setFallbackCaller
+    STETH_MARKET_RATE_SWITCHER = (
+        11  # PriceFeed+CDPManager: CollFeedSource & RedemptionFeeFloor
+    )
+    PYS_REWARD_SPLIT_SETTER = 12  # CDPManager: setStakingRewardSplit
+    STEBTC_DONOR = 13  # StakedEbtc: Donor
+    STEBTC_MANAGER = 14  # StakedEbtc: Manager
+    BSM_ADMIN = 15  # BSM: Admin
+    BSM_FEE_MANAGER = 16  # BSM: Fee Manager
+    BSM_PAUSER = 17  # BSM: Pauser
+    BSM_ESCROW_MANAGER = 18  # BSM: Escrow manager
+    BSM_CONSTRAINT_MANAGER = 19  # BSM: Constraint manager
+    BSM_AUTHORIZED_USER = 20  # BSM: Authorized User
+
+
+class _LazyContract:
+    """
+    Binds `r.ebtc.<key>` to `interface.<interface_name>` on first access and
+    memoizes it on the instance, so that `init_ebtc()` does no rpc calls.
+    """
+
+    def __init__(self, key, interface_name):
+        self.key = key
+        self.interface_name = interface_name
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        contract = instance.safe.contract(
+            r.ebtc[self.key], getattr(interface, self.interface_name)
+        )
+        # non-data descriptor: the instance attribute shadows it from now on
+        instance.__dict__[self.name] = contract
+        return contract
+
+
+class _GovernanceBatch:
+    """
+    Timelock operations collected by `eBTC.governance_batch`, grouped by timelock.
+    Helpers register their post-execution checks along with their operations,
+    with any state they compare against read while the batch is built. Once
+    the batch is executed only those checks run, not the helpers again.
+    """
+
+    def __init__(self, timelock=None):
+        self.timelock = timelock
+        self.operations = {}
+        self.checks = []
+
+    def add(self, timelock, targets, values, data, check=None):
+        if self.timelock:
+            assert (
+                timelock.address == self.timelock.address
+            ), "Error: Operation on another timelock"
+        operation = self.operations.setdefault(
+            timelock.address,
+            {"timelock": timelock, "targets": [], "values": [], "data": []},
+        )
+        operation["targets"].extend(targets)
+        operation["values"].extend(values)
+        operation["data"].extend(data)
+        if check:
+            self.checks.append((timelock.address, check))
+
+
 class eBTC:
+    # contracts are bound lazily on first access, see `_LazyContract`
+    authority = _LazyContract("authority", "IGovernor")
+    liquidation_library = _LazyContract("liquidation_library", "ILiquidationLibrary")
+    cdp_manager = _LazyContract("cdp_manager", "ICdpManager")
+    borrower_operations = _LazyContract("borrower_operations", "IBorrowerOperations")
+    ebtc_token = _LazyContract("ebtc_token", "IEBTCToken")
+    ebtc_feed = _LazyContract("ebtc_feed", "IEbtcFeed")
+    active_pool = _LazyContract("active_pool", "IActivePool")
+    coll_surplus_pool = _LazyContract("coll_surplus_pool", "ICollSurplusPool")
+    sorted_cdps = _LazyContract("sorted_cdps", "ISortedCdps")
+    hint_helpers = _LazyContract("hint_helpers", "IHintHelpers")
+    multi_cdp_getter = _LazyContract("multi_cdp_getter", "IMultiCdpGetter")
+    highsec_timelock = _LazyContract(
+        "highsec_timelock", "ITimelockControllerEnumerable"
+    )
+    lowsec_timelock = _LazyContract("lowsec_timelock", "ITimelockControllerEnumerable")
+    treasury_timelock = _LazyContract(
+        "treasury_timelock", "ITimelockControllerEnumerable"
+    )
+    staked_ebtc = _LazyContract("staked_ebtc", "IStakedEbtc")
+    bsm = _LazyContract("bsm", "IEbtcBsm")
+    bsm_escrow = _LazyContract("bsm_escrow", "IEscrow")
+    bsm_oracle_price_constraint = _LazyContract(
+        "bsm_oracle_price_constraint", "IOraclePriceConstraint"
+    )
+    bsm_rate_limiting_constraint = _LazyContract(
+        "bsm_rate_limiting_constraint", "IRateLimitingConstraint"
+    )
+
+    ##################################################################
+    ##
+    ##             Governance Configuration and Settings
+    ##
+    ##################################################################
+
+    # Contains a mapping of governancce roles to the role numbers used in the authority contract
+    governance_roles = governanceRoles
+
+    # Dictionary of all of the governable function signatures used in the authority contract
+    governance_signatures = GOVERNANCE_SIGNATURES
+
     def __init__(self, safe):
         self.safe = safe
 
@@ -36,184 +177,44 @@ class eBTC:
 
         self.LIQUIDATOR_REWARD = 2e17
 
-        # contracts
-        if chain.id == 1:
-            self.collateral = safe.contract(r.ebtc.collateral, interface.ILido)
-            self.price_feed = safe.contract(r.ebtc.price_feed, interface.IPriceFeed)
-        else:
-            self.collateral = safe.contract(
-                r.ebtc.collateral, interface.ICollateralTokenTester
-            )
-            self.price_feed = safe.contract(
-                r.ebtc.price_feed, interface.IPriceFeedTestnet
-            )
-        self.authority = safe.contract(r.ebtc.authority, interface.IGovernor)
-        self.liquidation_library = safe.contract(
-            r.ebtc.liquidation_library, interface.ILiquidationLibrary
-        )
-        self.cdp_manager = safe.contract(r.ebtc.cdp_manager, interface.ICdpManager)
-        self.borrower_operations = safe.contract(
-            r.ebtc.borrower_operations, interface.IBorrowerOperations
-        )
-        self.ebtc_token = safe.contract(r.ebtc.ebtc_token, interface.IEBTCToken)
-        self.ebtc_feed = safe.contract(r.ebtc.ebtc_feed, interface.IEbtcFeed)
-        self.active_pool = safe.contract(r.ebtc.active_pool, interface.IActivePool)
-        self.coll_surplus_pool = safe.contract(
-            r.ebtc.coll_surplus_pool, interface.ICollSurplusPool
-        )
-        self.sorted_cdps = safe.contract(r.ebtc.sorted_cdps, interface.ISortedCdps)
-        self.hint_helpers = safe.contract(r.ebtc.hint_helpers, interface.IHintHelpers)
-        self.multi_cdp_getter = safe.contract(
-            r.ebtc.multi_cdp_getter, interface.IMultiCdpGetter
-        )
-        self.highsec_timelock = safe.contract(
-            r.ebtc.highsec_timelock,
-            interface.ITimelockControllerEnumerable,
-        )
-        self.lowsec_timelock = safe.contract(
-            r.ebtc.lowsec_timelock,
-            interface.ITimelockControllerEnumerable,
-        )
-        self.treasury_timelock = safe.contract(
-            r.ebtc.treasury_timelock,
-            interface.ITimelockControllerEnumerable,
-        )
-        self.fee_recipient = self.active_pool.feeRecipientAddress()
+        # check the locally computed hints against `findInsertPosition`
+        self.VERIFY_HINTS = False
+
         self.security_multisig = r.ebtc_wallets.security_multisig
         self.techops_multisig = r.ebtc_wallets.techops_multisig
-        self.staked_ebtc = safe.contract(r.ebtc.staked_ebtc, interface.IStakedEbtc)
-        self.bsm = safe.contract(r.ebtc.bsm, interface.IEbtcBsm)
-        self.bsm_escrow = safe.contract(r.ebtc.bsm_escrow, interface.IEscrow)
-        self.bsm_oracle_price_constraint = safe.contract(
-            r.ebtc.bsm_oracle_price_constraint, interface.IOraclePriceConstraint
-        )
-        self.bsm_rate_limiting_constraint = safe.contract(
-            r.ebtc.bsm_rate_limiting_constraint, interface.IRateLimitingConstraint
+
+        # set within `governance_batch`
+        self._governance_batch = None
+
+    @cached_property
+    def collateral(self):
+        if chain.id == 1:
+            return self.safe.contract(r.ebtc.collateral, interface.ILido)
+        return self.safe.contract(r.ebtc.collateral, interface.ICollateralTokenTester)
+
+    @cached_property
+    def sorted_cdps_mirror(self):
+        return SortedCdpsMirror(
+            self.sorted_cdps, self.cdp_manager, self.multi_cdp_getter
         )
 
-        ##################################################################
-        ##
-        ##             Governance Configuration and Settings
-        ##
-        ##################################################################
-
-        # Contains a mapping of governancce roles to the role numbers used in the authority contract
-        class governanceRoles(Enum):
-            ADMIN = 0  # Admin
-            EBTC_MINTER = 1  # eBTCToken: mint
-            EBTC_BURNER = 2  # eBTCToken: burn
-            CDP_MANAGER_ALL = 3  # CDPManager: all
-            PAUSER = 4  # CDPManager+BorrowerOperations+ActivePool: pause
-            FL_FEE_ADMIN = 5  # BorrowerOperations+ActivePool: setFeeBps
-            SWEEPER = 6  # ActivePool+CollSurplusPool: sweepToken
-            FEE_CLAIMER = 7  # ActivePool: claimFeeRecipientCollShares
-            PRIMARY_ORACLE_SETTER = 8  # EbtcFeed: setPrimaryOracle
-            SECONDARY_ORACLE_SETTER = 9  # EbtcFeed: setSecondaryOracle
-            FALLBACK_CALLER_SETTER = 10  # PriceFeed: setFallbackCaller
-            STETH_MARKET_RATE_SWITCHER = (
-                11  # PriceFeed+CDPManager: CollFeedSource & RedemptionFeeFloor
-            )
-            PYS_REWARD_SPLIT_SETTER = 12  # CDPManager: setStakingRewardSplit
-            STEBTC_DONOR = 13  # StakedEbtc: Donor
-            STEBTC_MANAGER = 14  # StakedEbtc: Manager
-            BSM_ADMIN = 15  # BSM: Admin
-            BSM_FEE_MANAGER = 16  # BSM: Fee Manager
-            BSM_PAUSER = 17  # BSM: Pauser
-            BSM_ESCROW_MANAGER = 18  # BSM: Escrow manager
-            BSM_CONSTRAINT_MANAGER = 19  # BSM: Constraint manager
-            BSM_AUTHORIZED_USER = 20  # BSM: Authorized User
-
-        self.governance_roles = governanceRoles
-
-        # Dictionary of all of the governable function signatures used in the authority contract
-        self.governance_signatures = {
-            "SET_STAKING_REWARD_SPLIT_SIG": encode_signature(
-                "setStakingRewardSplit(uint256)"
-            ),
-            "SET_REDEMPTION_FEE_FLOOR_SIG": encode_signature(
-                "setRedemptionFeeFloor(uint256)"
-            ),
-            "SET_MINUTE_DECAY_FACTOR_SIG": encode_signature(
-                "setMinuteDecayFactor(uint256)"
-            ),
-            "SET_BETA_SIG": encode_signature("setBeta(uint256)"),
-            "SET_REDEMPTIONS_PAUSED_SIG": encode_signature(
-                "setRedemptionsPaused(bool)"
-            ),
-            "SET_GRACE_PERIOD_SIG": encode_signature("setGracePeriod(uint128)"),
-            "MINT_SIG": encode_signature("mint(address,uint256)"),
-            "BURN_SIG": encode_signature("burn(address,uint256)"),
-            "BURN2_SIG": encode_signature("burn(uint256)"),
-            "SET_FALLBACK_CALLER_SIG": encode_signature("setFallbackCaller(address)"),
-            "SET_PRIMARY_ORACLE_SIG": encode_signature("setPrimaryOracle(address)"),
-            "SET_SECONDARY_ORACLE_SIG": encode_signature("setSecondaryOracle(address)"),
-            "SET_FEE_BPS_SIG": encode_signature("setFeeBps(uint256)"),
-            "SET_FLASH_LOANS_PAUSED_SIG": encode_signature("setFlashLoansPaused(bool)"),
-            "SWEEP_TOKEN_SIG": encode_signature("sweepToken(address,uint256)"),
-            "CLAIM_FEE_RECIPIENT_COLL_SIG": encode_signature(
-                "claimFeeRecipientCollShares(uint256)"
-            ),
-            "SET_ROLE_NAME_SIG": encode_signature("setRoleName(uint8,string)"),
-            "SET_USER_ROLE_SIG": encode_signature("setUserRole(address,uint8,bool)"),
-            "SET_ROLE_CAPABILITY_SIG": encode_signature(
-                "setRoleCapability(uint8,address,bytes4,bool)"
-            ),
-            "SET_PUBLIC_CAPABILITY_SIG": encode_signature(
-                "setPublicCapability(address,bytes4,bool)"
-            ),
-            "BURN_CAPABILITY_SIG": encode_signature("burnCapability(address,bytes4)"),
-            "TRANSFER_OWNERSHIP_SIG": encode_signature("transferOwnership(address)"),
-            "SET_AUTHORITY_SIG": encode_signature("setAuthority(address)"),
-            "SET_COLLATERAL_FEED_SOURCE_SIG": encode_signature(
-                "setCollateralFeedSource(bool)"
-            ),
-            "STEBTC_SET_MIN_REWARDS_PER_PERIOD_SIG": encode_signature(
-                "setMinRewardsPerPeriod(uint256)"
-            ),
-            "STEBTC_DONATE": encode_signature("donate(uint256)"),
-            "STEBTC_SWEEP": encode_signature("sweep(address)"),
-            "STEBTC_SET_MINTING_FEE": encode_signature("setMintingFee(uint256)"),
-            "STEBTC_SET_MAX_DISTRIBUTION_PER_SECOND_PER_ASSET": encode_signature(
-                "setMaxDistributionPerSecondPerAsset(uint256)"
-            ),
-            "BSM_UPDATE_ESCROW": encode_signature("updateEscrow(address)"),
-            "BSM_SET_ORACLE_PRICE_CONSTRAINT": encode_signature(
-                "setOraclePriceConstraint(address)"
-            ),
-            "BSM_SET_RATE_LIMITING_CONSTRAINT": encode_signature(
-                "setRateLimitingConstraint(address)"
-            ),
-            "BSM_SET_BUY_ASSET_CONSTRAINT": encode_signature(
-                "setBuyAssetConstraint(address)"
-            ),
-            "BSM_SET_FEE_TO_BUY": encode_signature("setFeeToBuy(uint256)"),
-            "BSM_SET_FEE_TO_SELL": encode_signature("setFeeToSell(uint256)"),
-            "BSM_PAUSE": encode_signature("pause()"),
-            "BSM_UNPAUSE": encode_signature("unpause()"),
-            "BSM_CLAIM_PROFIT": encode_signature("claimProfit()"),
-            "BSM_CLAIM_TOKENS": encode_signature("claimTokens(address,uint256)"),
-            "BSM_DEPOSIT_TO_EXTERNAL_VAULT": encode_signature(
-                "depositToExternalVault(uint256,uint256)"
-            ),
-            "BSM_REDEEM_FROM_EXTERNAL_VAULT": encode_signature(
-                "redeemFromExternalVault(uint256,uint256)"
-            ),
-            "BSM_SET_MIN_PRICE": encode_signature("setMinPrice(uint256)"),
-            "BSM_SET_ORACLE_FRESHNESS": encode_signature("setOracleFreshness(uint256)"),
-            "BSM_SET_MINTING_CONFIG": encode_signature(
-                "setMintingConfig(address,(uint256,uint256,bool))"
-            ),
-            "BSM_SELL_ASSET_NO_FEE": encode_signature(
-                "sellAssetNoFee(uint256,address,uint256)"
-            ),
-            "BSM_BUY_ASSET_NO_FEE": encode_signature(
-                "buyAssetNoFee(uint256,address,uint256)"
-            ),
-        }
+    @cached_property
+    def price_feed(self):
+        if chain.id == 1:
+            return self.safe.contract(r.ebtc.price_feed, interface.IPriceFeed)
+        return self.safe.contract(r.ebtc.price_feed, interface.IPriceFeedTestnet)
+
+    @cached_property
+    def fee_recipient(self):
+        return self.active_pool.feeRecipientAddress()
 
-        # Mapping of the governance roles to the list of permissions (signatures within contracts) that they have
-        self.governance_configuration = {
-            governanceRoles.ADMIN.value: [
+    @cached_property
+    def governance_configuration(self):
+        """
+        @dev Mapping of the governance roles to the list of permissions (signatures within contracts) that they have
+        """
+        return {
+            self.governance_roles.ADMIN.value: [
                 {
                     "target": self.authority,
                     "signature": self.governance_signatures["SET_ROLE_NAME_SIG"],
@@ -245,13 +246,13 @@ class eBTC:
                     "signature": self.governance_signatures["SET_AUTHORITY_SIG"],
                 },
             ],
-            governanceRoles.EBTC_MINTER.value: [
+            self.governance_roles.EBTC_MINTER.value: [
                 {
                     "target": self.ebtc_token,
                     "signature": self.governance_signatures["MINT_SIG"],
                 },
             ],
-            governanceRoles.EBTC_BURNER.value: [
+            self.governance_roles.EBTC_BURNER.value: [
                 {
                     "target": self.ebtc_token,
                     "signature": self.governance_signatures["BURN_SIG"],
@@ -261,7 +262,7 @@ class eBTC:
                     "signature": self.governance_signatures["BURN2_SIG"],
                 },
             ],
-            governanceRoles.CDP_MANAGER_ALL.value: [
+            self.governance_roles.CDP_MANAGER_ALL.value: [
                 {
                     "target": self.cdp_manager,
                     "signature": self.governance_signatures[
@@ -283,7 +284,7 @@ class eBTC:
                     "signature": self.governance_signatures["SET_GRACE_PERIOD_SIG"],
                 },
             ],
-            governanceRoles.PAUSER.value: [
+            self.governance_roles.PAUSER.value: [
                 {
                     "target": self.cdp_manager,
                     "signature": self.governance_signatures[
@@ -303,7 +304,7 @@ class eBTC:
                     ],
                 },
             ],
-            governanceRoles.FL_FEE_ADMIN.value: [
+            self.governance_roles.FL_FEE_ADMIN.value: [
                 {
                     "target": self.borrower_operations,
                     "signature": self.governance_signatures["SET_FEE_BPS_SIG"],
@@ -313,7 +314,7 @@ class eBTC:
                     "signature": self.governance_signatures["SET_FEE_BPS_SIG"],
                 },
             ],
-            governanceRoles.SWEEPER.value: [
+            self.governance_roles.SWEEPER.value: [
                 {
                     "target": self.active_pool,
                     "signature": self.governance_signatures["SWEEP_TOKEN_SIG"],
@@ -323,7 +324,7 @@ class eBTC:
                     "signature": self.governance_signatures["SWEEP_TOKEN_SIG"],
                 },
             ],
-            governanceRoles.FEE_CLAIMER.value: [
+            self.governance_roles.FEE_CLAIMER.value: [
                 {
                     "target": self.active_pool,
                     "signature": self.governance_signatures[
@@ -331,25 +332,25 @@ class eBTC:
                     ],
                 },
             ],
-            governanceRoles.PRIMARY_ORACLE_SETTER.value: [
+            self.governance_roles.PRIMARY_ORACLE_SETTER.value: [
                 {
                     "target": self.ebtc_feed,
                     "signature": self.governance_signatures["SET_PRIMARY_ORACLE_SIG"],
                 },
             ],
-            governanceRoles.SECONDARY_ORACLE_SETTER.value: [
+            self.governance_roles.SECONDARY_ORACLE_SETTER.value: [
                 {
                     "target": self.ebtc_feed,
                     "signature": self.governance_signatures["SET_SECONDARY_ORACLE_SIG"],
                 },
             ],
-            governanceRoles.FALLBACK_CALLER_SETTER.value: [
+            self.governance_roles.FALLBACK_CALLER_SETTER.value: [
                 {
                     "target": self.price_feed,
                     "signature": self.governance_signatures["SET_FALLBACK_CALLER_SIG"],
                 },
             ],
-            governanceRoles.STETH_MARKET_RATE_SWITCHER.value: [
+            self.governance_roles.STETH_MARKET_RATE_SWITCHER.value: [
                 {
                     "target": self.price_feed,
                     "signature": self.governance_signatures[
@@ -363,7 +364,7 @@ class eBTC:
                     ],
                 },
             ],
-            governanceRoles.PYS_REWARD_SPLIT_SETTER.value: [
+            self.governance_roles.PYS_REWARD_SPLIT_SETTER.value: [
                 {
                     "target": self.cdp_manager,
                     "signature": self.governance_signatures[
@@ -371,13 +372,13 @@ class eBTC:
                     ],
                 },
             ],
-            governanceRoles.STEBTC_DONOR.value: [
+            self.governance_roles.STEBTC_DONOR.value: [
                 {
                     "target": self.staked_ebtc,
                     "signature": self.governance_signatures["STEBTC_DONATE"],
                 }
             ],
-            governanceRoles.STEBTC_MANAGER.value: [
+            self.governance_roles.STEBTC_MANAGER.value: [
                 {
                     "target": self.staked_ebtc,
                     "signature": self.governance_signatures[
@@ -399,7 +400,7 @@ class eBTC:
                     ],
                 },
             ],
-            governanceRoles.BSM_ADMIN.value: [
+            self.governance_roles.BSM_ADMIN.value: [
                 {
                     "target": self.bsm,
                     "signature": self.governance_signatures["BSM_UPDATE_ESCROW"],
@@ -423,7 +424,7 @@ class eBTC:
                     ],
                 },
             ],
-            governanceRoles.BSM_FEE_MANAGER.value: [
+            self.governance_roles.BSM_FEE_MANAGER.value: [
                 {
                     "target": self.bsm,
                     "signature": self.governance_signatures["BSM_SET_FEE_TO_BUY"],
@@ -433,7 +434,7 @@ class eBTC:
                     "signature": self.governance_signatures["BSM_SET_FEE_TO_SELL"],
                 },
             ],
-            governanceRoles.BSM_PAUSER.value: [
+            self.governance_roles.BSM_PAUSER.value: [
                 {
                     "target": self.bsm,
                     "signature": self.governance_signatures["BSM_PAUSE"],
@@ -443,7 +444,7 @@ class eBTC:
                     "signature": self.governance_signatures["BSM_UNPAUSE"],
                 },
             ],
-            governanceRoles.BSM_ESCROW_MANAGER.value: [
+            self.governance_roles.BSM_ESCROW_MANAGER.value: [
                 {
                     "target": self.bsm_escrow,
                     "signature": self.governance_signatures["BSM_CLAIM_PROFIT"],
@@ -465,7 +466,7 @@ class eBTC:
                     ],
                 },
             ],
-            governanceRoles.BSM_CONSTRAINT_MANAGER.value: [
+            self.governance_roles.BSM_CONSTRAINT_MANAGER.value: [
                 {
                     "target": self.bsm_oracle_price_constraint,
                     "signature": self.governance_signatures["BSM_SET_MIN_PRICE"],
@@ -479,7 +480,7 @@ class eBTC:
                     "signature": self.governance_signatures["BSM_SET_MINTING_CONFIG"],
                 },
             ],
-            governanceRoles.BSM_AUTHORIZED_USER.value: [
+            self.governance_roles.BSM_AUTHORIZED_USER.value: [
                 {
                     "target": self.bsm,
                     "signature": self.governance_signatures["BSM_BUY_ASSET_NO_FEE"],
@@ -491,60 +492,205 @@ class eBTC:
             ],
         }
 
-        # Mapping of the permissioned actors to their assigned roles
-        self.users_roles_configuration = {
+    @cached_property
+    def users_roles_configuration(self):
+        """
+        @dev Mapping of the permissioned actors to their assigned roles
+        """
+        return self._users_roles_configuration(self.fee_recipient)
+
+    def _users_roles_configuration(self, fee_recipient):
+        return {
             self.highsec_timelock.address: [
-                governanceRoles.ADMIN.value,
-                governanceRoles.CDP_MANAGER_ALL.value,
-                governanceRoles.PAUSER.value,
-                governanceRoles.FL_FEE_ADMIN.value,
-                governanceRoles.SWEEPER.value,
-                governanceRoles.FEE_CLAIMER.value,
-                governanceRoles.PRIMARY_ORACLE_SETTER.value,
-                governanceRoles.SECONDARY_ORACLE_SETTER.value,
-                governanceRoles.FALLBACK_CALLER_SETTER.value,
-                governanceRoles.STETH_MARKET_RATE_SWITCHER.value,
-                governanceRoles.BSM_ADMIN.value,
+                self.governance_roles.ADMIN.value,
+                self.governance_roles.CDP_MANAGER_ALL.value,
+                self.governance_roles.PAUSER.value,
+                self.governance_roles.FL_FEE_ADMIN.value,
+                self.governance_roles.SWEEPER.value,
+                self.governance_roles.FEE_CLAIMER.value,
+                self.governance_roles.PRIMARY_ORACLE_SETTER.value,
+                self.governance_roles.SECONDARY_ORACLE_SETTER.value,
+                self.governance_roles.FALLBACK_CALLER_SETTER.value,
+                self.governance_roles.STETH_MARKET_RATE_SWITCHER.value,
+                self.governance_roles.BSM_ADMIN.value,
             ],
             self.lowsec_timelock.address: [
-                governanceRoles.CDP_MANAGER_ALL.value,
-                governanceRoles.PAUSER.value,
-                governanceRoles.FL_FEE_ADMIN.value,
-                governanceRoles.SWEEPER.value,
-                governanceRoles.FEE_CLAIMER.value,
-                governanceRoles.SECONDARY_ORACLE_SETTER.value,
-                governanceRoles.FALLBACK_CALLER_SETTER.value,
-                governanceRoles.STETH_MARKET_RATE_SWITCHER.value,
-                governanceRoles.BSM_FEE_MANAGER.value,
+                self.governance_roles.CDP_MANAGER_ALL.value,
+                self.governance_roles.PAUSER.value,
+                self.governance_roles.FL_FEE_ADMIN.value,
+                self.governance_roles.SWEEPER.value,
+                self.governance_roles.FEE_CLAIMER.value,
+                self.governance_roles.SECONDARY_ORACLE_SETTER.value,
+                self.governance_roles.FALLBACK_CALLER_SETTER.value,
+                self.governance_roles.STETH_MARKET_RATE_SWITCHER.value,
+                self.governance_roles.BSM_FEE_MANAGER.value,
             ],
             self.treasury_timelock.address: [
-                governanceRoles.PYS_REWARD_SPLIT_SETTER.value,
+                self.governance_roles.PYS_REWARD_SPLIT_SETTER.value,
             ],
             self.security_multisig: [
-                governanceRoles.PAUSER.value,
-                governanceRoles.BSM_PAUSER.value,
+                self.governance_roles.PAUSER.value,
+                self.governance_roles.BSM_PAUSER.value,
             ],
             self.techops_multisig: [
-                governanceRoles.PAUSER.value,
-                governanceRoles.STEBTC_MANAGER.value,
-                governanceRoles.BSM_ESCROW_MANAGER.value,
-                governanceRoles.BSM_CONSTRAINT_MANAGER.value,
+                self.governance_roles.PAUSER.value,
+                self.governance_roles.STEBTC_MANAGER.value,
+                self.governance_roles.BSM_ESCROW_MANAGER.value,
+                self.governance_roles.BSM_CONSTRAINT_MANAGER.value,
             ],
-            self.fee_recipient: [
-                governanceRoles.FEE_CLAIMER.value,
-                governanceRoles.SWEEPER.value,
-                governanceRoles.STEBTC_DONOR.value,
+            fee_recipient: [
+                self.governance_roles.FEE_CLAIMER.value,
+                self.governance_roles.SWEEPER.value,
+                self.governance_roles.STEBTC_DONOR.value,
             ],
         }
 
+    def governance_drift(self, block=None):
+        """
+        @dev Diffs the intended governance configuration against the Authority's state.
+             The whole state is read in two multicall rounds, see `read_authority_state`,
+             the fee recipient holding roles is read in the first one at the same block.
+        @param block Block number to compare against, defaults to the latest one.
+        @return dict with the missing and extra roles, capabilities and users, plus the
+                `targets`, `values` and `data` of the minimal batch of `setRoleCapability`
+                and `setUserRole` calls fixing them, ready for `schedule_batch_timelock`.
+        """
+        intended_capabilities = {
+            (role, entry["target"].address, entry["signature"])
+            for role, entries in self.governance_configuration.items()
+            for entry in entries
+        }
+        intended_roles = {role.value for role in self.governance_roles}
+
+        # registry targets are read too, so capabilities granted outside the config show up
+        targets = sorted(
+            {target for _, target, _ in intended_capabilities}
+            | {
+                to_checksum_address(address)
+                for key, address in r.ebtc.items()
+                if key != "test_contracts"
+            }
+        )
+        state = read_authority_state(
+            self.authority,
+            targets,
+            block,
+            calls={"fee_recipient": self.active_pool.feeRecipientAddress},
+        )
+        intended_users = {
+            (to_checksum_address(str(user)), role)
+            for user, roles in self._users_roles_configuration(
+                state["calls"]["fee_recipient"]
+            ).items()
+            for role in roles
+        }
+
+        onchain_capabilities = {
+            (role, target, selector)
+            for (target, selector), capability in state["capabilities"].items()
+            for role in capability["roles"]
+        }
+        onchain_users = {
+            (user, role)
+            for role, details in state["roles"].items()
+            for user in details["users"]
+        }
+        named_roles = {
+            role for role, details in state["roles"].items() if details["name"]
+        }
+
+        drift = {
+            "missing_roles": sorted(intended_roles - named_roles),
+            "extra_roles": sorted(named_roles - intended_roles),
+            "missing_capabilities": sorted(
+                intended_capabilities - onchain_capabilities
+            ),
+            "extra_capabilities": sorted(onchain_capabilities - intended_capabilities),
+            "missing_users": sorted(intended_users - onchain_users),
+            "extra_users": sorted(onchain_users - intended_users),
+        }
+
+        ## Role names are informative only, the fix batch only touches permissions
+        data = (
+            [
+                self.authority.setRoleCapability.encode_input(role, target, sig, True)
+                for role, target, sig in drift["missing_capabilities"]
+            ]
+            + [
+                self.authority.setRoleCapability.encode_input(role, target, sig, False)
+                for role, target, sig in drift["extra_capabilities"]
+            ]
+            + [
+                self.authority.setUserRole.encode_input(user, role, True)
+                for user, role in drift["missing_users"]
+            ]
+            + [
+                self.authority.setUserRole.encode_input(user, role, False)
+                for user, role in drift["extra_users"]
+            ]
+        )
+        drift["targets"] = [self.authority] * len(data)
+        drift["values"] = [0] * len(data)
+        drift["data"] = data
+        return drift
+
     ##################################################################
     ##
     ##                  Timelock Operations Helpers
     ##
     ##################################################################
 
+    def _timelock_checks(self, timelock, role, targets, data, id=None):
+        """
+        @dev Reads everything the timelock helpers assert on in a single multicall.
+        @param timelock The timelock contract the operation goes through.
+        @param role The timelock role the safe is expected to hold.
+        @param targets The targets of the operation.
+        @param data The data of the operation, one entry per target.
+        @param id The id of the operation, if its timestamp is needed.
+        @return (has_role, min_delay, unauthorized, timestamp) where unauthorized lists the (target, selector) pairs the timelock can't call.
+        """
+        # each distinct pair is checked once, whatever the size of the batch
+        pairs = {
+            (str(target), payload[:10])
+            for target, payload in zip(targets, data)
+            if target != timelock.address
+        }
+        with multicall(block_identifier="latest"):
+            has_role = timelock.hasRole(role, self.safe.account)
+            min_delay = timelock.getMinDelay()
+            authorized = {
+                pair: self.authority.canCall(timelock.address, *pair) for pair in pairs
+            }
+            timestamp = timelock.getTimestamp(id) if id else None
+        return (
+            bool(has_role),
+            int(min_delay),
+            sorted(pair for pair, result in authorized.items() if not result),
+            int(timestamp) if id else None,
+        )
+
+    def _print_operation_state(self, id, timestamp):
+        """
+        @dev Prints why an operation can't be executed and reverts. States are derived from its timestamp like TimelockController does.
+        """
+        if timestamp > DONE_TIMESTAMP:
+            exec_date = datetime.utcfromtimestamp(timestamp).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+            C.print(
+                f"[red]Operation {id} is still pending! Execution available at {exec_date}[/red]"
+            )
+            raise
+        elif timestamp == DONE_TIMESTAMP:
+            C.print(f"[green]Operation {id} has already been executed![/green]")
+            raise
+        else:
+            C.print(f"[red]Operation {id} hasn't been scheduled![/red]")
+            raise
+
     def schedule_timelock(
-        self, timelock, target, value, data, predecessor, salt, delay
+        self, timelock, target, value, data, predecessor, salt, delay=None
     ):
         """
         @dev Schedules a timelock transaction.
@@ -554,29 +700,29 @@ class eBTC:
         @param data The data of the timelock transaction (encoding of function signature and parameters).
         @param predecessor The predecessing transacction of the timelock transaction. Matters when there is a dependency between operations.
         @param salt Value used to generate a unique ID for a transaction with identical parameters than an existing.
-        @param delay The time delay at which the transaction will be executable. Must be higher than the min delay.
+        @param delay The time delay at which the transaction will be executable. Must be higher than the min delay. Defaults to the min delay + 1.
         """
+        has_role, min_delay, unauthorized, _ = self._timelock_checks(
+            timelock, PROPOSER_ROLE, [target], [data]
+        )
+
         ## Check that safe has PROPOSER_ROLE on timelock
-        assert timelock.hasRole(
-            timelock.PROPOSER_ROLE(), self.safe.account
-        ), "Error: No role"
+        assert has_role, "Error: No role"
 
         ## Ensures that delay is higher than the min delay
-        assert delay > timelock.getMinDelay(), "Error: Delay too low"
+        if delay is None:
+            delay = min_delay + 1
+        assert delay > min_delay, "Error: Delay too low"
 
         ## Check that timelock has the appropiate permissions
-        if target != timelock.address:
-            assert self.authority.canCall(
-                timelock.address, target, data[:10]
-            ), "Error: Not authorized"
+        assert not unauthorized, f"Error: Not authorized {unauthorized}"
 
         ## Schedule tx
         tx = timelock.schedule(target, value, data, predecessor, salt, delay)
-        id = timelock.hashOperation(target, value, data, predecessor, salt)
-        assert timelock.isOperationPending(id)
-        exec_date = datetime.utcfromtimestamp(timelock.getTimestamp(id)).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
+        id = hash_operation(target, value, data, predecessor, salt)
+        timestamp = timelock.getTimestamp(id)
+        assert timestamp > DONE_TIMESTAMP
+        exec_date = datetime.utcfromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
 
         C.print(
             f"[green]Operation {id} has been scheduled! Execution available at {exec_date}[/green]"
@@ -593,38 +739,24 @@ class eBTC:
         @param predecessor The predecessing transacction of the timelock transaction. Matters when there is a dependency between operations.
         @param salt Value used to generate a unique ID for a transaction with identical parameters than an existing.
         """
+        id = hash_operation(target, value, data, predecessor, salt)
+        has_role, _, unauthorized, timestamp = self._timelock_checks(
+            timelock, EXECUTOR_ROLE, [target], [data], id
+        )
+
         ## Check that safe has EXECUTOR_ROLE on timelock
-        assert timelock.hasRole(
-            timelock.EXECUTOR_ROLE(), self.safe.account
-        ), "Error: No role"
+        assert has_role, "Error: No role"
 
         ## Check that timelock has the appropiate permissions
-        if target != timelock.address:
-            assert self.authority.canCall(
-                timelock.address, target, data[:10]
-            ), "Error: Not authorized"
+        assert not unauthorized, f"Error: Not authorized {unauthorized}"
 
         ## Check that valid tx and execute if so
-        id = timelock.hashOperation(target, value, data, predecessor, salt)
-        if timelock.isOperationReady(id):
+        if DONE_TIMESTAMP < timestamp <= chain.time():
             tx = timelock.execute(target, value, data, predecessor, salt)
-            assert timelock.isOperationDone(id)
+            assert timelock.getTimestamp(id) == DONE_TIMESTAMP
             C.print(f"[green]Operation {id} has been executed![/green]")
             return tx
-        elif timelock.isOperationPending(id):
-            exec_date = datetime.utcfromtimestamp(timelock.getTimestamp(id)).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            C.print(
-                f"[red]Operation {id} is still pending! Execution available at {exec_date}[/red]"
-            )
-            raise
-        elif timelock.isOperationDone(id):
-            C.print(f"[green]Operation {id} has already been executed![/green]")
-            raise
-        else:
-            C.print(f"[red]Operation {id} hasn't been scheduled![/red]")
-            raise
+        self._print_operation_state(id, timestamp)
 
     def cancel_timelock(
         self,
@@ -660,12 +792,10 @@ class eBTC:
         """
         ## Check that safe has CANCELLER_ROLE on timelock
         assert self.lowsec_timelock.hasRole(
-            self.lowsec_timelock.CANCELLER_ROLE(), self.safe.account
+            CANCELLER_ROLE, self.safe.account
         ), "Error: No role"
         if id == "0x0":
-            id = self.lowsec_timelock.hashOperation(
-                target, value, data, predecessor, salt
-            )
+            id = hash_operation(target, value, data, predecessor, salt)
 
         self.cancel_timelock(self.lowsec_timelock, id)
 
@@ -689,35 +819,40 @@ class eBTC:
         """
         ## Check that safe has CANCELLER_ROLE on timelock
         assert self.highsec_timelock.hasRole(
-            self.highsec_timelock.CANCELLER_ROLE(), self.safe.account
+            CANCELLER_ROLE, self.safe.account
         ), "Error: No role"
         if id == "0x0":
-            id = self.highsec_timelock.hashOperation(
-                target, value, data, predecessor, salt
-            )
+            id = hash_operation(target, value, data, predecessor, salt)
 
         self.cancel_timelock(self.highsec_timelock, id)
 
-    def schedule_or_execute_timelock(self, timelock, target, data, salt):
+    def schedule_or_execute_timelock(self, timelock, target, data, salt, check=None):
         """
         @dev Schedules or executes a timelock transaction according to its state.
         @param timelock The timelock contract to execute the transaction on.
         @param target The target of the timelock transaction (contract instance).
         @param data The data of the timelock transaction (encoding of function signature and parameters).
         @param salt Value used to generate a unique ID for a transaction with identical parameters than an existing.
+        @param check Assertions to run once the transaction is executed, deferred within a `governance_batch`.
         """
-        id = timelock.hashOperation(target.address, 0, data, EmptyBytes32, salt)
+        if self._governance_batch:
+            return self._governance_batch.add(timelock, [target], [0], [data], check)
+
+        id = hash_operation(target.address, 0, data, EmptyBytes32, salt)
 
-        if timelock.isOperation(id):
+        if timelock.getTimestamp(id) > 0:
             self.execute_timelock(timelock, target.address, 0, data, EmptyBytes32, salt)
+            if check:
+                check()
             return True  # Returns true if executed, in order to assert the result
         else:
-            delay = timelock.getMinDelay()
             self.schedule_timelock(
-                timelock, target.address, 0, data, EmptyBytes32, salt, delay + 1
+                timelock, target.address, 0, data, EmptyBytes32, salt
             )
 
-    def schedule_batch_timelock(self, timelock, targets, values, data, salt, delay):
+    def schedule_batch_timelock(
+        self, timelock, targets, values, data, salt, delay=None
+    ):
         """
         @dev Schedules a batch of timelock transactions.
         @param timelock The timelock contract to execute the transaction on.
@@ -725,30 +860,29 @@ class eBTC:
         @param values The ETH value to pass for each transaction.
         @param data The data of each of the timelock transactions (encoding of function signatures and parameters).
         @param salt Value used to generate a unique ID for a transaction with identical parameters than an existing.
-        @param delay The time delay at which the transaction will be executable. Must be higher than the min delay.
+        @param delay The time delay at which the transaction will be executable. Must be higher than the min delay. Defaults to the min delay + 1.
         """
+        has_role, min_delay, unauthorized, _ = self._timelock_checks(
+            timelock, PROPOSER_ROLE, targets, data
+        )
+
         ## Check that safe has PROPOSER_ROLE on timelock
-        assert timelock.hasRole(
-            timelock.PROPOSER_ROLE(), self.safe.account
-        ), "Error: No role"
+        assert has_role, "Error: No role"
 
         ## Ensures that delay is higher than the min delay
-        assert delay > timelock.getMinDelay(), "Error: Delay too low"
+        if delay is None:
+            delay = min_delay + 1
+        assert delay > min_delay, "Error: Delay too low"
 
         ## Check that timelock has the appropiate permissions
-        for target in targets:
-            if target != timelock.address:
-                assert self.authority.canCall(
-                    timelock.address, target, data[targets.index(target)][:10]
-                ), "Error: Not authorized"
+        assert not unauthorized, f"Error: Not authorized {unauthorized}"
 
         ## Schedule tx
         tx = timelock.scheduleBatch(targets, values, data, EmptyBytes32, salt, delay)
-        id = timelock.hashOperationBatch(targets, values, data, EmptyBytes32, salt)
-        assert timelock.isOperationPending(id)
-        exec_date = datetime.utcfromtimestamp(timelock.getTimestamp(id)).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
+        id = hash_operation_batch(targets, values, data, EmptyBytes32, salt)
+        timestamp = timelock.getTimestamp(id)
+        assert timestamp > DONE_TIMESTAMP
+        exec_date = datetime.utcfromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
 
         C.print(
             f"[green]Operation {id} has been scheduled! Execution available at {exec_date}[/green]"
@@ -764,42 +898,28 @@ class eBTC:
         @param data The data of each of the timelock transactions (encoding of function signatures and parameters).
         @param salt Value used to generate a unique ID for a transaction with identical parameters than an existing.
         """
+        id = hash_operation_batch(targets, values, data, EmptyBytes32, salt)
+        has_role, _, unauthorized, timestamp = self._timelock_checks(
+            timelock, EXECUTOR_ROLE, targets, data, id
+        )
 
         ## Check that safe has EXECUTOR_ROLE on timelock
-        assert timelock.hasRole(
-            timelock.EXECUTOR_ROLE(), self.safe.account
-        ), "Error: No role"
+        assert has_role, "Error: No role"
 
         ## Check that timelock has the appropiate permissions
-        for target in targets:
-            if target != timelock.address:
-                assert self.authority.canCall(
-                    timelock.address, target, data[targets.index(target)][:10]
-                ), "Error: Not authorized"
+        assert not unauthorized, f"Error: Not authorized {unauthorized}"
 
         ## Check that valid tx and execute if so
-        id = timelock.hashOperationBatch(targets, values, data, EmptyBytes32, salt)
-        if timelock.isOperationReady(id):
+        if DONE_TIMESTAMP < timestamp <= chain.time():
             tx = timelock.executeBatch(targets, values, data, EmptyBytes32, salt)
-            assert timelock.isOperationDone(id)
+            assert timelock.getTimestamp(id) == DONE_TIMESTAMP
             C.print(f"[green]Operation {id} has been executed![/green]")
             return tx
-        elif timelock.isOperationPending(id):
-            exec_date = datetime.utcfromtimestamp(timelock.getTimestamp(id)).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            C.print(
-                f"[red]Operation {id} is still pending! Execution available at {exec_date}[/red]"
-            )
-            raise
-        elif timelock.isOperationDone(id):
-            C.print(f"[green]Operation {id} has already been executed![/green]")
-            raise
-        else:
-            C.print(f"[red]Operation {id} hasn't been scheduled![/red]")
-            raise
+        self._print_operation_state(id, timestamp)
 
-    def schedule_or_execute_batch_timelock(self, timelock, targets, values, data, salt):
+    def schedule_or_execute_batch_timelock(
+        self, timelock, targets, values, data, salt, check=None
+    ):
         """
         @dev Schedules or executes a batch of timelock transactions according to their state.
         @param timelock The timelock contract to execute the transaction on.
@@ -807,17 +927,64 @@ class eBTC:
         @param values The ETH value to pass for each transaction.
         @param data The data of each of the timelock transactions (encoding of function signatures and parameters).
         @param salt Value used to generate a unique ID for a transaction with identical parameters than an existing.
+        @param check Assertions to run once the batch is executed, deferred within a `governance_batch`.
         """
-        id = timelock.hashOperationBatch(targets, values, data, EmptyBytes32, salt)
+        if self._governance_batch:
+            return self._governance_batch.add(timelock, targets, values, data, check)
+
+        id = hash_operation_batch(targets, values, data, EmptyBytes32, salt)
 
-        if timelock.isOperation(id):
+        if timelock.getTimestamp(id) > 0:
             self.execute_batch_timelock(timelock, targets, values, data, salt)
+            if check:
+                check()
             return True
         else:
-            delay = timelock.getMinDelay()
-            self.schedule_batch_timelock(
-                timelock, targets, values, data, salt, delay + 1
+            self.schedule_batch_timelock(timelock, targets, values, data, salt)
+
+    @contextmanager
+    def governance_batch(self, timelock=None, salt=EmptyBytes32, delay=None):
+        """
+        @dev Packs the operations of the timelock helpers called within the block into a
+             single `scheduleBatch` per timelock, or `executeBatch` once it is ready. The
+             helpers' pre-checks run as they are called, their post-execution checks
+             are deferred until the batch is executed.
+             Call the same helpers with the same arguments to schedule and then execute, e.g.
+                with safe.ebtc.governance_batch():
+                    safe.ebtc.cdpManager_set_beta(2)
+                    safe.ebtc.activePool_set_fee_bps(10)
+        @param timelock If given, every collected operation must go through this timelock.
+        @param salt Value used to generate a unique ID for a batch with identical parameters than an existing.
+        @param delay The time delay at which the batch will be executable. Defaults to the min delay + 1.
+        """
+        assert self._governance_batch is None, "Error: Governance batch already open"
+        batch = _GovernanceBatch(timelock)
+        self._governance_batch = batch
+        try:
+            yield batch
+        finally:
+            self._governance_batch = None
+
+        executed = set()
+        for address, operation in batch.operations.items():
+            args = (
+                operation["timelock"],
+                operation["targets"],
+                operation["values"],
+                operation["data"],
+                salt,
             )
+            id = hash_operation_batch(*args[1:4], EmptyBytes32, salt)
+            if operation["timelock"].getTimestamp(id) > 0:
+                if self.execute_batch_timelock(*args):
+                    executed.add(address)
+            else:
+                self.schedule_batch_timelock(*args, delay=delay)
+
+        ## Deferred checks of the operations that were executed
+        for address, check in batch.checks:
+            if address in executed:
+                check()
 
     ##################################################################
     ##
@@ -840,25 +1007,19 @@ class eBTC:
         else:
             timelock = self.lowsec_timelock
 
-        if role_key == "PROPOSER_ROLE":
-            role = timelock.PROPOSER_ROLE()
-        elif role_key == "CANCELLER_ROLE":
-            role = timelock.CANCELLER_ROLE()
-        elif role_key == "EXECUTOR_ROLE":
-            role = timelock.EXECUTOR_ROLE()
-        elif role_key == "TIMELOCK_ADMIN_ROLE":
-            role = timelock.TIMELOCK_ADMIN_ROLE()
-        else:
+        if role_key not in TIMELOCK_ROLES:
             C.print(f"[red]Role not found![/red]")
             return
+        role = TIMELOCK_ROLES[role_key]
 
         target = timelock
         data = target.grantRole.encode_input(role, account)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert timelock.hasRole(role, account)
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def revoke_timelock_role(
         self, role_key, account, salt=EmptyBytes32, use_high_sec=False
     ):
@@ -874,17 +1035,10 @@ class eBTC:
         else:
             timelock = self.lowsec_timelock
 
-        if role_key == "PROPOSER_ROLE":
-            role = timelock.PROPOSER_ROLE()
-        elif role_key == "CANCELLER_ROLE":
-            role = timelock.CANCELLER_ROLE()
-        elif role_key == "EXECUTOR_ROLE":
-            role = timelock.EXECUTOR_ROLE()
-        elif role_key == "TIMELOCK_ADMIN_ROLE":
-            role = timelock.TIMELOCK_ADMIN_ROLE()
-        else:
+        if role_key not in TIMELOCK_ROLES:
             C.print(f"[red]Role not found![/red]")
             return
+        role = TIMELOCK_ROLES[role_key]
 
         ## Check that target has role
         assert timelock.hasRole(role, account), "Error: No role"
@@ -892,10 +1046,11 @@ class eBTC:
         target = timelock
         data = target.revokeRole.encode_input(role, account)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert timelock.hasRole(role, account) == False
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def update_timelock_delay(self, new_delay, salt=EmptyBytes32, use_high_sec=False):
         """
         @dev Updates the delay on the timelock.
@@ -914,10 +1069,11 @@ class eBTC:
         target = timelock
         data = target.updateDelay.encode_input(new_delay)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert timelock.getMinDelay() == new_delay
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     ##################################################################
     ##
     ##                CDP System Management Functions
@@ -946,10 +1102,11 @@ class eBTC:
         target = self.cdp_manager
         data = target.setStakingRewardSplit.encode_input(value)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.cdp_manager.stakingRewardSplit() == value
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def cdpManager_set_redemption_fee_floor(
         self, value, salt=EmptyBytes32, use_high_sec=False
     ):
@@ -971,10 +1128,11 @@ class eBTC:
         target = self.cdp_manager
         data = target.setRedemptionFeeFloor.encode_input(value)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.cdp_manager.redemptionFeeFloor() == value
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def cdpManager_set_minute_decay_factor(
         self, value, salt=EmptyBytes32, use_high_sec=False
     ):
@@ -996,10 +1154,11 @@ class eBTC:
         target = self.cdp_manager
         data = target.setMinuteDecayFactor.encode_input(value)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.cdp_manager.minuteDecayFactor() == value
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def cdpManager_set_beta(self, value, salt=EmptyBytes32, use_high_sec=False):
         """
         @dev Sets the beta for the redemption fee in the CDP Manager.
@@ -1015,10 +1174,11 @@ class eBTC:
         target = self.cdp_manager
         data = target.setBeta.encode_input(value)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.cdp_manager.beta() == value
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def cdpManager_set_redemptions_paused(
         self, pause, use_timelock=False, salt=EmptyBytes32, use_high_sec=False
     ):
@@ -1038,9 +1198,10 @@ class eBTC:
             else:
                 timelock = self.lowsec_timelock
 
-            executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-            if executed:
+            def check():
                 assert self.cdp_manager.redemptionsPaused() == pause
+
+            self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
         else:
             assert self.authority.canCall(
                 self.safe.account, target, data[:10]
@@ -1068,10 +1229,11 @@ class eBTC:
         target = self.cdp_manager
         data = target.setGracePeriod.encode_input(value)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.cdp_manager.recoveryModeGracePeriodDuration() == value
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     #### ===== PRICE FEED ===== ####
 
     def priceFeed_set_fallback_caller(
@@ -1091,10 +1253,11 @@ class eBTC:
         target = self.price_feed
         data = target.setFallbackCaller.encode_input(address)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.price_feed.fallbackCaller() == address
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def priceFeed_set_collateral_feed_source(
         self, enable_dynamic_feed, salt=EmptyBytes32, use_high_sec=False
     ):
@@ -1116,10 +1279,11 @@ class eBTC:
         target = self.price_feed
         data = target.setCollateralFeedSource.encode_input(enable_dynamic_feed)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.price_feed.useDynamicFeed() == enable_dynamic_feed
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     #### ===== EBTC FEED ===== ####
 
     def ebtcFeed_set_primary_oracle(self, address, salt=EmptyBytes32):
@@ -1133,12 +1297,13 @@ class eBTC:
         target = self.ebtc_feed
         data = target.setPrimaryOracle.encode_input(address)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert (
                 self.ebtc_feed.primaryOracle() == address
             ), "Error: Primary Oracle not set"
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def ebtcFeed_set_secondary_oracle(
         self, address, salt=EmptyBytes32, use_high_sec=False
     ):
@@ -1157,12 +1322,13 @@ class eBTC:
         target = self.ebtc_feed
         data = target.setSecondaryOracle.encode_input(address)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert (
                 self.ebtc_feed.secondaryOracle() == address
             ), "Error: Secondary Oracle not set"
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     #### ===== FLASHLOANS and FEES (ACTIVE POOL AND BORROWERS OPERATIONS) ===== ####
 
     def activePool_set_fee_bps(self, value, salt=EmptyBytes32, use_high_sec=False):
@@ -1183,10 +1349,11 @@ class eBTC:
         target = self.active_pool
         data = target.setFeeBps.encode_input(value)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.active_pool.feeBps() == value
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def borrowerOperations_set_fee_bps(
         self, value, salt=EmptyBytes32, use_high_sec=False
     ):
@@ -1207,10 +1374,11 @@ class eBTC:
         target = self.borrower_operations
         data = target.setFeeBps.encode_input(value)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.borrower_operations.feeBps() == value
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     ## TODO: Function to change the fee on both the AP and the BO through a batched timelock tx
 
     def activePool_set_flash_loans_paused(
@@ -1232,9 +1400,10 @@ class eBTC:
             else:
                 timelock = self.lowsec_timelock
 
-            executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-            if executed:
+            def check():
                 assert self.active_pool.flashLoansPaused() == pause
+
+            self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
         else:
             assert self.authority.canCall(
                 self.safe.account, target, data[:10]
@@ -1263,9 +1432,10 @@ class eBTC:
             else:
                 timelock = self.lowsec_timelock
 
-            executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-            if executed:
+            def check():
                 assert self.borrower_operations.flashLoansPaused() == pause
+
+            self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
         else:
             assert self.authority.canCall(
                 self.safe.account, target, data[:10]
@@ -1300,9 +1470,10 @@ class eBTC:
             else:
                 timelock = self.lowsec_timelock
 
-            executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-            if executed:
+            def check():
                 assert coll.sharesOf(fee_recipient) - shares_before == value
+
+            self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
         else:
             assert self.authority.canCall(
                 self.safe.account, target, data[:10]
@@ -1344,9 +1515,10 @@ class eBTC:
             else:
                 timelock = self.lowsec_timelock
 
-            executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-            if executed:
+            def check():
                 assert token.balanceOf(fee_recipient) - balance_before == value
+
+            self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
         else:
             assert self.authority.canCall(
                 self.safe.account, target, data[:10]
@@ -1385,9 +1557,10 @@ class eBTC:
             else:
                 timelock = self.lowsec_timelock
 
-            executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-            if executed:
+            def check():
                 assert token.balanceOf(fee_recipient) - balance_before == value
+
+            self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
         else:
             assert self.authority.canCall(
                 self.safe.account, target, data[:10]
@@ -1421,13 +1594,14 @@ class eBTC:
             self.cdp_manager.setRedemptionFeeFloor.encode_input(new_fee_floor),
         ]
 
-        executed = self.schedule_or_execute_batch_timelock(
-            timelock, targets, values, data, salt
-        )
-        if executed:
+        def check():
             assert self.price_feed.useDynamicFeed() == enable_dynamic_feed
             assert self.cdp_manager.redemptionFeeFloor() == new_fee_floor
 
+        self.schedule_or_execute_batch_timelock(
+            timelock, targets, values, data, salt, check=check
+        )
+
     #### ===== GOVERNANCE CONFIGURATION (Only high sec) ===== ####
 
     def authority_set_role_name(self, role, name, salt=EmptyBytes32):
@@ -1442,10 +1616,11 @@ class eBTC:
         target = self.authority
         data = target.setRoleName.encode_input(role, name)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.authority.getRoleName(role) == name
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def authority_set_user_role(self, user, role, enabled, salt=EmptyBytes32):
         """
         @dev Grants a role to a user in the Authority.
@@ -1459,10 +1634,11 @@ class eBTC:
         target = self.authority
         data = target.setUserRole.encode_input(user, role, enabled)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.authority.doesUserHaveRole(user, role) == enabled
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def authority_set_role_capability(
         self, role, target_address, functionSig, enabled, salt=EmptyBytes32
     ):
@@ -1481,13 +1657,14 @@ class eBTC:
             role, target_address, functionSig, enabled
         )
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert (
                 self.authority.doesRoleHaveCapability(role, target_address, functionSig)
                 == enabled
             )
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def authority_set_public_capability(
         self, target_address, functionSig, enabled, salt=EmptyBytes32
     ):
@@ -1505,13 +1682,14 @@ class eBTC:
             target_address, functionSig, enabled
         )
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert (
                 self.authority.isPublicCapability(target_address, functionSig)
                 == enabled
             )
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def authority_burn_capability(self, target_address, functionSig, salt=EmptyBytes32):
         """
         @dev Burns the ability to call a contract's function from anyone irrespective of their roles in the Authority.
@@ -1524,12 +1702,13 @@ class eBTC:
         target = self.authority
         data = target.burnCapability.encode_input(target_address, functionSig)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert (
                 self.authority.capabilityFlag(target_address, functionSig) == 2
             )  # 2: Burned
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     def authority_set_authority(self, new_authority, salt=EmptyBytes32):
         """
         @dev Changes the Governance underying authority contract.
@@ -1541,10 +1720,11 @@ class eBTC:
         target = self.authority
         data = target.setAuthority.encode_input(new_authority)
 
-        executed = self.schedule_or_execute_timelock(timelock, target, data, salt)
-        if executed:
+        def check():
             assert self.authority.authority() == new_authority
 
+        self.schedule_or_execute_timelock(timelock, target, data, salt, check=check)
+
     #### ===== CDP OPS ===== ####
 
     def _assert_collateral_balance(self, coll_amount):
@@ -1565,14 +1745,22 @@ class eBTC:
         assert new_icr > self.SAFE_ICR_THRESHOLD
 
     def _hint_helper_values(self, coll_amount, debt_amount):
-        nicr = self.hint_helpers.computeNominalCR(coll_amount, debt_amount)
+        nicr = nominal_cr(coll_amount, debt_amount)
 
-        total_cdps = self.sorted_cdps.getSize()
-        hint, _, _ = self.hint_helpers.getApproxHint(
-            nicr, total_cdps, 42
-        )  # random seed 42
+        # exact hints from the local copy of the list, see `SortedCdpsMirror`
+        self.sorted_cdps_mirror.sync()
+        upper_hint, lower_hint = self.sorted_cdps_mirror.hints(nicr)
 
-        upper_hint, lower_hint = self.sorted_cdps.findInsertPosition(nicr, hint, hint)
+        if self.VERIFY_HINTS:
+            onchain_hints = self.sorted_cdps_mirror.verify(
+                nicr, (upper_hint, lower_hint)
+            )
+            if onchain_hints != (upper_hint, lower_hint):
+                C.print(
+                    f"[yellow]Mirror out of sync, using on-chain hints {onchain_hints}[/yellow]"
+                )
+                upper_hint, lower_hint = onchain_hints
+                self.sorted_cdps_mirror.load()
 
         C.print(f"[green]upper_hint={upper_hint}\n[/green]")
         C.print(f"[green]lower_hint={lower_hint}\n[/green]")
@@ -0,0 +1,65 @@
+from brownie import multicall
+from hexbytes import HexBytes
+
+# roles are uint8, the authority keeps them as a bytes32 bitmap where role `n` is bit `n`
+MAX_ROLES = 256
+
+# set bits of every possible byte, so a bitmap decodes with 32 lookups instead of 256 shifts
+_BYTE_ROLES = [[bit for bit in range(8) if value >> bit & 1] for value in range(256)]
+
+
+def roles_from_bitmask(bitmask):
+    roles = []
+    for position, byte in enumerate(reversed(bytes(HexBytes(bitmask)))):
+        if byte:
+            roles.extend(8 * position + bit for bit in _BYTE_ROLES[byte])
+    return roles
+
+
+def read_authority_state(authority, targets, block=None, calls=None):
+    """
+    @dev Reads the whole state of a RolesAuthority in two multicall rounds:
+         role names, role members and enabled functions per target first,
+         then the roles and public flag of every enabled (target, function).
+    @param authority The authority contract.
+    @param targets The addresses whose capabilities are read.
+    @param block Block number to read the state at, defaults to the latest one.
+    @param calls Optional mapping of names to argless view calls read in the first
+                 round, so values the caller compares against come from the same block.
+    @return dict with the `owner`, the `roles` that have a name or members,
+            keyed by role number, the `capabilities` keyed by (target, selector)
+            and the results of `calls` under the same names.
+    """
+    # brownie's multicall reuses the previous block of the thread if none is given
+    block = block or "latest"
+    with multicall(block_identifier=block):
+        owner = authority.owner()
+        names = [authority.getRoleName(role) for role in range(MAX_ROLES)]
+        users = [authority.getUsersByRole(role) for role in range(MAX_ROLES)]
+        functions = [
+            authority.getEnabledFunctionsInTarget(target) for target in targets
+        ]
+        extra = {name: call() for name, call in (calls or {}).items()}
+
+    pairs = [
+        (target, HexBytes(function).hex())
+        for target, target_functions in zip(targets, functions)
+        for function in target_functions
+    ]
+    with multicall(block_identifier=block):
+        bitmasks = [authority.getRolesWithCapability(*pair) for pair in pairs]
+        public = [authority.isPublicCapability(*pair) for pair in pairs]
+
+    return {
+        "owner": str(owner),
+        "roles": {
+            role: {"name": str(name or ""), "users": [str(user) for user in role_users]}
+            for role, (name, role_users) in enumerate(zip(names, users))
+            if name or len(role_users)
+        },
+        "capabilities": {
+            pair: {"roles": roles_from_bitmask(bitmask), "public": bool(is_public)}
+            for pair, bitmask, is_public in zip(pairs, bitmasks, public)
+        },
+        "calls": {name: str(value) for name, value in extra.items()},
+    }
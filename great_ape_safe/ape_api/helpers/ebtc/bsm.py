@@ -0,0 +1,293 @@
+from brownie import chain, interface, multicall, web3
+
+BPS = 10_000
+# `maxDistributionPerSecondPerAsset` precision in StakedEbtc
+STEBTC_PRECISION = 10 ** 18
+
+
+def minting_cap(config, system_debt):
+    """
+    @dev Mirrors the cap of `RateLimitingConstraint.canMint` for a minter config.
+    @param config (relativeCapBPS, absoluteCap, useAbsoluteCap) as returned by `getMintingConfig`.
+    @param system_debt `ActivePool.getSystemDebt()`, the base of relative caps.
+    """
+    relative_cap_bps, absolute_cap, use_absolute_cap = config
+    if use_absolute_cap:
+        return int(absolute_cap)
+    return int(system_debt) * int(relative_cap_bps) // BPS
+
+
+def stebtc_rewards_per_cycle(
+    reward_cycle_amount, cycle_end, last_sync, stored_total_assets, max_distribution
+):
+    # StakedEbtc caps the distribution to `maxDistributionPerSecondPerAsset` over the cycle
+    duration = max(int(cycle_end) - int(last_sync), 0)
+    cap = (
+        int(max_distribution) * duration * int(stored_total_assets) // STEBTC_PRECISION
+    )
+    return min(int(reward_cycle_amount), cap)
+
+
+class BsmLens:
+    """
+    Reads the state of the BSM, its escrow and constraints, and of stEBTC.
+
+    The addresses the BSM contracts hold as immutables (external vault and
+    asset feed) are read once, then every block is a single multicall.
+    """
+
+    def __init__(self, ebtc):
+        self.ebtc = ebtc
+        with multicall(block_identifier=web3.eth.block_number):
+            vault = ebtc.bsm_escrow.EXTERNAL_VAULT()
+            feed = ebtc.bsm_oracle_price_constraint.ASSET_FEED()
+        self.external_vault = ebtc.safe.contract(vault, interface.IERC4626)
+        self.asset_feed = ebtc.safe.contract(feed, interface.IAggregatorV3)
+
+    def read(self, block=None):
+        """
+        @dev Reads the state at `block` in one multicall, derived values are computed locally.
+        @param block Block number to read at, defaults to the latest one.
+        @return dict of flat values, ready for a table, csv or json row. Values of contracts
+                not deployed yet at `block` are None.
+        """
+        ebtc = self.ebtc
+        bsm, escrow, staked = ebtc.bsm, ebtc.bsm_escrow, ebtc.staked_ebtc
+        oracle = ebtc.bsm_oracle_price_constraint
+        block = block or web3.eth.block_number
+        with multicall(block_identifier=block):
+            values = {
+                "fee_to_buy_bps": bsm.feeToBuyBPS(),
+                "fee_to_sell_bps": bsm.feeToSellBPS(),
+                "paused": bsm.paused(),
+                "total_minted": bsm.totalMinted(),
+                "escrow_total_balance": escrow.totalBalance(),
+                "escrow_total_assets_deposited": escrow.totalAssetsDeposited(),
+                "escrow_fee_profit": escrow.feeProfit(),
+                "vault_shares": self.external_vault.balanceOf(escrow),
+                "vault_total_assets": self.external_vault.totalAssets(),
+                "vault_total_supply": self.external_vault.totalSupply(),
+                "oracle_min_price_bps": oracle.minPriceBPS(),
+                "oracle_freshness_seconds": oracle.oracleFreshnessSeconds(),
+                "feed_decimals": self.asset_feed.decimals(),
+                "feed_round": self.asset_feed.latestRoundData(),
+                "minting_config": ebtc.bsm_rate_limiting_constraint.getMintingConfig(
+                    bsm
+                ),
+                "system_debt": ebtc.active_pool.getSystemDebt(),
+                "stebtc_minting_fee": staked.mintingFee(),
+                "stebtc_total_assets": staked.totalAssets(),
+                "stebtc_stored_total_assets": staked.storedTotalAssets(),
+                "stebtc_total_supply": staked.totalSupply(),
+                "stebtc_rewards_cycle_length": staked.REWARDS_CYCLE_LENGTH(),
+                "stebtc_rewards_cycle": staked.rewardsCycleData(),
+                "stebtc_max_distribution": staked.maxDistributionPerSecondPerAsset(),
+            }
+        timestamp = chain[block].timestamp
+
+        # calls to contracts not deployed yet at `block` come back as None
+        feed_round = values.pop("feed_round")
+        minting_config = values.pop("minting_config")
+        rewards_cycle = values.pop("stebtc_rewards_cycle")
+        state = {
+            "block": block,
+            "timestamp": timestamp,
+            **{
+                key: value if value is None or isinstance(value, bool) else int(value)
+                for key, value in values.items()
+            },
+        }
+
+        def known(*keys):
+            return all(state[key] is not None for key in keys)
+
+        vault_supply = state.pop("vault_total_supply")
+        vault_assets = state.pop("vault_total_assets")
+        state["vault_assets"] = None
+        if None not in [state["vault_shares"], vault_assets, vault_supply]:
+            state["vault_assets"] = (
+                state["vault_shares"] * vault_assets // vault_supply
+                if vault_supply
+                else 0
+            )
+
+        state["oracle_price"] = state["oracle_age"] = state["oracle_fresh"] = None
+        if feed_round is not None:
+            _, answer, _, updated_at, _ = feed_round
+            state["oracle_price"] = int(answer)
+            state["oracle_age"] = timestamp - int(updated_at)
+            if known("oracle_freshness_seconds"):
+                state["oracle_fresh"] = (
+                    state["oracle_age"] <= state["oracle_freshness_seconds"]
+                )
+
+        for key in [
+            "relative_cap_bps",
+            "absolute_cap",
+            "use_absolute_cap",
+            "minting_cap",
+            "minting_headroom",
+        ]:
+            state[key] = None
+        if minting_config is not None:
+            relative_cap_bps, absolute_cap, use_absolute_cap = minting_config
+            state["relative_cap_bps"] = int(relative_cap_bps)
+            state["absolute_cap"] = int(absolute_cap)
+            state["use_absolute_cap"] = bool(use_absolute_cap)
+            if known("system_debt"):
+                state["minting_cap"] = minting_cap(
+                    (relative_cap_bps, absolute_cap, use_absolute_cap),
+                    state["system_debt"],
+                )
+            if known("minting_cap", "total_minted"):
+                state["minting_headroom"] = max(
+                    state["minting_cap"] - state["total_minted"], 0
+                )
+
+        for key in [
+            "stebtc_cycle_end",
+            "stebtc_last_sync",
+            "stebtc_reward_cycle_amount",
+            "stebtc_rewards_per_cycle",
+        ]:
+            state[key] = None
+        if rewards_cycle is not None:
+            cycle_end, last_sync, reward_cycle_amount = rewards_cycle
+            state["stebtc_cycle_end"] = int(cycle_end)
+            state["stebtc_last_sync"] = int(last_sync)
+            state["stebtc_reward_cycle_amount"] = int(reward_cycle_amount)
+            if known("stebtc_stored_total_assets", "stebtc_max_distribution"):
+                state["stebtc_rewards_per_cycle"] = stebtc_rewards_per_cycle(
+                    reward_cycle_amount,
+                    cycle_end,
+                    last_sync,
+                    state["stebtc_stored_total_assets"],
+                    state["stebtc_max_distribution"],
+                )
+        return state
+
+    def series(self, blocks):
+        """
+        @dev Samples the state over `blocks`, one multicall per block.
+        """
+        return [self.read(int(block)) for block in blocks]
+
+
+class RateLimitModel:
+    """
+    Offline model of the BSM minting config in `RateLimitingConstraint`.
+
+    Selling assets mints eBTC and must keep `totalMinted` within the cap,
+    buying assets burns eBTC and can't take `totalMinted` below zero. Amounts
+    are signed eBTC amounts, positive for sells and negative for buys. Relative
+    caps follow the system debt, pass a projected path of it as a list with
+    one value per step, the last value holds for the steps after it.
+    """
+
+    def __init__(self, config, total_minted, system_debt):
+        relative_cap_bps, absolute_cap, use_absolute_cap = config
+        self.config = (int(relative_cap_bps), int(absolute_cap), bool(use_absolute_cap))
+        self.total_minted = int(total_minted)
+        self.system_debt = int(system_debt)
+
+    @classmethod
+    def from_chain(cls, ebtc, block=None):
+        """
+        @dev Loads the BSM config, its total minted and the system debt in one multicall.
+        """
+        with multicall(block_identifier=block or web3.eth.block_number):
+            config = ebtc.bsm_rate_limiting_constraint.getMintingConfig(ebtc.bsm)
+            total_minted = ebtc.bsm.totalMinted()
+            system_debt = ebtc.active_pool.getSystemDebt()
+        return cls(config, total_minted, system_debt)
+
+    def _debt_at(self, system_debt, step):
+        if system_debt is None or len(system_debt) == 0:
+            return self.system_debt
+        return int(system_debt[min(step, len(system_debt) - 1)])
+
+    def headroom(self, system_debt=None, total_minted=None):
+        """
+        @dev eBTC that can still be minted by a sell, see `minting_cap`.
+        """
+        system_debt = self.system_debt if system_debt is None else system_debt
+        total_minted = self.total_minted if total_minted is None else total_minted
+        return max(minting_cap(self.config, system_debt) - total_minted, 0)
+
+    def project(self, amounts, system_debt=None):
+        """
+        @dev Applies one signed amount per step and tracks the headroom left after each.
+        @param amounts Net eBTC minted at each step, positive for sells and negative for buys.
+        @param system_debt Projected system debt per step, defaults to the current one.
+        @return list of dicts per step. `valid` is false where the operation would revert,
+                in which case it is not applied.
+        """
+        total_minted = self.total_minted
+        projection = []
+        for step, amount in enumerate(amounts):
+            cap = minting_cap(self.config, self._debt_at(system_debt, step))
+            after = total_minted + int(amount)
+            valid = after <= cap if amount > 0 else after >= 0
+            if valid:
+                total_minted = after
+            projection.append(
+                {
+                    "step": step,
+                    "amount": int(amount),
+                    "valid": valid,
+                    "total_minted": total_minted,
+                    "cap": cap,
+                    "headroom": max(cap - total_minted, 0),
+                }
+            )
+        return projection
+
+    def plan(self, orders, system_debt=None, max_chunk=None):
+        """
+        @dev Splits orders into chunks executable one per step without hitting the limits.
+             Orders are served first in first out, a sell waiting for headroom doesn't
+             block the orders after it, so buys queued behind it can free capacity.
+        @param orders Signed eBTC amounts, positive for sells and negative for buys.
+        @param system_debt Projected system debt per step, defaults to the current one.
+        @param max_chunk Upper bound of a chunk, e.g. to limit slippage or the escrow withdrawal.
+        @return dict with the `chunks` to execute and the `unfilled` amount per order index.
+        """
+        remaining = {index: int(amount) for index, amount in enumerate(orders)}
+        total_minted = self.total_minted
+        chunks = []
+        step = 0
+        while any(remaining.values()):
+            cap = minting_cap(self.config, self._debt_at(system_debt, step))
+            for index, amount in remaining.items():
+                available = cap - total_minted if amount > 0 else total_minted
+                size = min(abs(amount), max(available, 0))
+                if max_chunk is not None:
+                    size = min(size, int(max_chunk))
+                if size > 0:
+                    break
+            else:
+                # nothing fits: wait for the system debt path, or give up past its end
+                if system_debt is None or step >= len(system_debt) - 1:
+                    break
+                step += 1
+                continue
+
+            chunk = size if amount > 0 else -size
+            remaining[index] -= chunk
+            total_minted += chunk
+            chunks.append(
+                {
+                    "step": step,
+                    "order": index,
+                    "amount": chunk,
+                    "total_minted": total_minted,
+                    "headroom": max(cap - total_minted, 0),
+                }
+            )
+            step += 1
+        return {
+            "chunks": chunks,
+            "unfilled": {
+                index: amount for index, amount in remaining.items() if amount
+            },
+        }
@@ -0,0 +1,305 @@
+import numpy as np
+from brownie import chain, multicall, web3
+from hexbytes import HexBytes
+
+from great_ape_safe.ape_api.helpers.ebtc.sorted_cdps import NICR_PRECISION, PAGE_SIZE
+from helpers.cache import dump_json, load_json
+from helpers.constants import DECIMAL_PRECISION, MAX_REWARD_SPLIT
+
+SECONDS_IN_ONE_MINUTE = 60
+# LiquityMath._decPow caps the exponent to 1000 years of minutes
+MAX_DECAY_MINUTES = 525_600_000
+UNSET_TIMESTAMP = 2 ** 128 - 1
+
+# fields of the system snapshot, all read in the same multicall
+SYSTEM_FIELDS = [
+    "stEthIndex",
+    "stakingRewardSplit",
+    "systemStEthFeePerUnitIndex",
+    "systemStEthFeePerUnitIndexError",
+    "systemDebtRedistributionIndex",
+    "totalStakes",
+    "getSystemCollShares",
+    "getSystemDebt",
+    "baseRate",
+    "lastRedemptionTimestamp",
+    "redemptionFeeFloor",
+    "minuteDecayFactor",
+    "beta",
+    "recoveryModeGracePeriodDuration",
+    "lastGracePeriodStartTimestamp",
+    "MCR",
+    "CCR",
+    "LICR",
+    "LIQUIDATOR_REWARD",
+]
+
+# per CDP arrays of the snapshot, in constructor order
+CDP_FIELDS = ["debt", "coll", "stake", "fee_index", "debt_index"]
+
+
+class CdpManagerModel:
+    """
+    NumPy model of the CdpManager math over a snapshot of every CDP.
+
+    Global values are plain integers, per CDP values are float64 arrays
+    aligned with `ids`, so parameter grids broadcast against all CDPs at
+    once. Integer rounding of the contracts is not replicated on the
+    vectors, results match the chain up to float precision: float64 holds
+    about 16 significant digits, so wei amounts above ~1e16 (0.01 eBTC or
+    stETH) lose their lowest wei, don't use them where exact wei matter.
+    """
+
+    def __init__(self, system, ids, debt, coll, stake, fee_index, debt_index):
+        self.system = {key: int(value) for key, value in system.items()}
+        self.ids = list(ids)
+        self.debt = np.asarray(debt, dtype=float)
+        self.coll = np.asarray(coll, dtype=float)
+        self.stake = np.asarray(stake, dtype=float)
+        self.fee_index = np.asarray(fee_index, dtype=float)
+        self.debt_index = np.asarray(debt_index, dtype=float)
+
+    @classmethod
+    def from_chain(cls, ebtc, block=None):
+        """
+        @dev Snapshots the CdpManager, the collateral index and every CDP at `block`:
+             system values first, then the sorted list pages, then the CDP indexes.
+        @param ebtc The `eBTC` instance to read from.
+        @param block Block number to read at, defaults to the latest one.
+        """
+        block = block or web3.eth.block_number
+        cdp_manager = ebtc.cdp_manager
+
+        with multicall(block_identifier=block):
+            values = {field: getattr(cdp_manager, field)() for field in SYSTEM_FIELDS}
+            current_index = ebtc.collateral.getPooledEthByShares(DECIMAL_PRECISION)
+            total_supply = ebtc.ebtc_token.totalSupply()
+            size = ebtc.sorted_cdps.getSize()
+        system = {
+            **values,
+            "currentStEthIndex": current_index,
+            "totalSupply": total_supply,
+            "price": ebtc.price_feed.fetchPrice.call(block_identifier=block),
+            "timestamp": chain[block].timestamp,
+        }
+
+        with multicall(block_identifier=block):
+            pages = [
+                ebtc.multi_cdp_getter.getMultipleSortedCdps(start, PAGE_SIZE)
+                for start in range(0, int(size), PAGE_SIZE)
+            ]
+        cdps = [cdp for page in pages for cdp in page]
+        ids = [HexBytes(cdp[0]).hex() for cdp in cdps]
+
+        with multicall(block_identifier=block):
+            fee_index = [cdp_manager.cdpStEthFeePerUnitIndex(id) for id in ids]
+            debt_index = [cdp_manager.cdpDebtRedistributionIndex(id) for id in ids]
+
+        return cls(
+            system,
+            ids,
+            debt=[int(cdp[1]) for cdp in cdps],
+            coll=[int(cdp[2]) for cdp in cdps],
+            stake=[int(cdp[3]) for cdp in cdps],
+            fee_index=[int(index) for index in fee_index],
+            debt_index=[int(index) for index in debt_index],
+        )
+
+    def save(self, path):
+        """
+        @dev Records the snapshot as json, see `load`.
+        """
+        dump_json(
+            path,
+            {
+                "system": self.system,
+                "ids": self.ids,
+                **{field: getattr(self, field).tolist() for field in CDP_FIELDS},
+            },
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        @dev Rebuilds a model from a snapshot recorded with `save`, without network access.
+        """
+        snapshot = load_json(path)
+        assert snapshot, f"Error: No snapshot at {path}"
+        return cls(
+            snapshot["system"], snapshot["ids"], *[snapshot[f] for f in CDP_FIELDS]
+        )
+
+    ## stETH index and fee split
+
+    def pooled(self, shares, index=None):
+        index = self.system["currentStEthIndex"] if index is None else index
+        return shares * index / DECIMAL_PRECISION
+
+    def fee_split(self, staking_reward_split=None):
+        """
+        @dev Mirrors `calcFeeUponStakingReward` for the index growth since the last sync.
+        @return (fee taken in shares, new systemStEthFeePerUnitIndex, new error per unit).
+        """
+        s = self.system
+        split = (
+            s["stakingRewardSplit"]
+            if staking_reward_split is None
+            else staking_reward_split
+        )
+        if s["currentStEthIndex"] <= s["stEthIndex"]:
+            return (
+                0,
+                s["systemStEthFeePerUnitIndex"],
+                s["systemStEthFeePerUnitIndexError"],
+            )
+        delta_index_fees = (
+            (s["currentStEthIndex"] - s["stEthIndex"]) * split // MAX_REWARD_SPLIT
+        )
+        delta_fee_split = delta_index_fees * s["getSystemCollShares"]
+        fee_taken = (
+            delta_fee_split * DECIMAL_PRECISION // s["currentStEthIndex"]
+        ) // DECIMAL_PRECISION
+        delta_fee_split_share = (
+            fee_taken * DECIMAL_PRECISION + s["systemStEthFeePerUnitIndexError"]
+        )
+        delta_per_unit = delta_fee_split_share // s["totalStakes"]
+        error = delta_fee_split_share - delta_per_unit * s["totalStakes"]
+        return fee_taken, s["systemStEthFeePerUnitIndex"] + delta_per_unit, error
+
+    def synced_coll(self, staking_reward_split=None):
+        # mirrors `getAccumulatedFeeSplitApplied` against the synced global index, in
+        # float64 so not to the wei. a cdp whose coll doesn't cover its fee split
+        # skips it and keeps its full coll, like the contract does to avoid a revert
+        _, system_index, _ = self.fee_split(staking_reward_split)
+        distributed = self.stake * np.maximum(system_index - self.fee_index, 0)
+        distributed[self.fee_index == 0] = 0
+        scaled = self.coll * DECIMAL_PRECISION
+        return np.where(
+            scaled > distributed, (scaled - distributed) / DECIMAL_PRECISION, self.coll
+        )
+
+    def synced_debt(self):
+        # float64 as well, see `CdpManagerModel`
+        pending = self.stake * np.maximum(
+            self.system["systemDebtRedistributionIndex"] - self.debt_index, 0
+        )
+        return self.debt + pending / DECIMAL_PRECISION
+
+    def synced_system_coll(self, staking_reward_split=None):
+        fee_taken, _, _ = self.fee_split(staking_reward_split)
+        return self.system["getSystemCollShares"] - fee_taken
+
+    ## collateral ratios
+
+    def icr(self, price=None, staking_reward_split=None):
+        price = self.system["price"] if price is None else np.asarray(price)[..., None]
+        return (
+            self.pooled(self.synced_coll(staking_reward_split))
+            * price
+            / self.synced_debt()
+        )
+
+    def nicr(self, staking_reward_split=None):
+        return (
+            self.synced_coll(staking_reward_split) * NICR_PRECISION / self.synced_debt()
+        )
+
+    def tcr(self, price=None, staking_reward_split=None):
+        price = self.system["price"] if price is None else np.asarray(price)
+        return (
+            self.pooled(self.synced_system_coll(staking_reward_split))
+            * price
+            / self.system["getSystemDebt"]
+        )
+
+    def liquidatable(self, grace_period=None, timestamp=None):
+        """
+        @dev CDPs that can be liquidated for each grace period duration: below MCR,
+             or below the TCR in recovery mode once the grace period elapsed.
+        @param grace_period Scalar or array of `recoveryModeGracePeriodDuration` values.
+        @return bool array of shape (len(grace_period), len(ids)).
+        """
+        s = self.system
+        grace_period = np.atleast_1d(
+            s["recoveryModeGracePeriodDuration"]
+            if grace_period is None
+            else grace_period
+        )[:, None]
+        timestamp = s["timestamp"] if timestamp is None else timestamp
+        icr, tcr = self.icr(), self.tcr()
+        started = s["lastGracePeriodStartTimestamp"] != UNSET_TIMESTAMP
+        elapsed = started & (
+            timestamp > s["lastGracePeriodStartTimestamp"] + grace_period
+        )
+        recovery = elapsed & (tcr < s["CCR"]) & (icr < tcr)
+        return (icr < s["MCR"]) | recovery
+
+    ## redemptions
+
+    def decayed_base_rate(self, minute_decay_factor=None, timestamp=None):
+        # mirrors `_calcDecayedBaseRate`, broadcasting over the decay factors
+        s = self.system
+        decay = np.asarray(
+            s["minuteDecayFactor"]
+            if minute_decay_factor is None
+            else minute_decay_factor,
+            dtype=float,
+        )
+        timestamp = s["timestamp"] if timestamp is None else timestamp
+        minutes = min(
+            (timestamp - s["lastRedemptionTimestamp"]) // SECONDS_IN_ONE_MINUTE,
+            MAX_DECAY_MINUTES,
+        )
+        return s["baseRate"] * (decay / DECIMAL_PRECISION) ** minutes
+
+    def redemption_rate(
+        self, redemption_fee_floor=None, minute_decay_factor=None, timestamp=None
+    ):
+        floor = np.asarray(
+            self.system["redemptionFeeFloor"]
+            if redemption_fee_floor is None
+            else redemption_fee_floor,
+            dtype=float,
+        )
+        return np.minimum(
+            floor + self.decayed_base_rate(minute_decay_factor, timestamp),
+            DECIMAL_PRECISION,
+        )
+
+    def redemption(
+        self,
+        debt_redeemed,
+        redemption_fee_floor=None,
+        minute_decay_factor=None,
+        beta=None,
+        timestamp=None,
+    ):
+        """
+        @dev Fee curve of a redemption: the base rate is bumped by the redeemed
+             fraction of the supply over `beta` before the fee is charged.
+             All arguments broadcast, e.g. pass a column of amounts and a row of betas.
+        @param debt_redeemed eBTC amount(s) redeemed.
+        @return (fee in collateral shares, base rate after the redemption).
+        """
+        s = self.system
+        beta = np.asarray(s["beta"] if beta is None else beta, dtype=float)
+        debt_redeemed = np.asarray(debt_redeemed, dtype=float)
+        coll_drawn = (
+            (debt_redeemed * DECIMAL_PRECISION / s["price"])
+            * DECIMAL_PRECISION
+            / s["currentStEthIndex"]
+        )
+        redeemed_fraction = self.pooled(coll_drawn) * s["price"] / s["totalSupply"]
+        base_rate = np.minimum(
+            self.decayed_base_rate(minute_decay_factor, timestamp)
+            + redeemed_fraction / beta,
+            DECIMAL_PRECISION,
+        )
+        floor = np.asarray(
+            s["redemptionFeeFloor"]
+            if redemption_fee_floor is None
+            else redemption_fee_floor,
+            dtype=float,
+        )
+        rate = np.minimum(floor + base_rate, DECIMAL_PRECISION)
+        return rate * coll_drawn / DECIMAL_PRECISION, base_rate
@@ -0,0 +1,70 @@
+from brownie import multicall, web3
+from eth_utils import to_checksum_address
+
+from great_ape_safe.ape_api.helpers.ebtc.sorted_cdps import nominal_cr
+from helpers.constants import DECIMAL_PRECISION
+
+
+def owner_of(cdp_id):
+    # mirrors SortedCdps.getOwnerAddress, the owner is packed in the top 20 bytes of the id
+    return to_checksum_address(str(cdp_id)[2:42])
+
+
+def read_cdp_portfolio(ebtc, owners, block=None):
+    """
+    @dev Reads every CDP of `owners` with a fixed number of round trips: one
+         multicall for the CDP ids of each owner (`getCdpsOf`) and the system
+         totals, one `fetchPrice` and one multicall for the synced CDP values.
+         Ratios and shares of the system are computed locally.
+    @param ebtc The `eBTC` instance to read from.
+    @param owners The addresses whose CDPs are read.
+    @param block Block number to read at, defaults to the latest one.
+    @return dict with the `price`, the `system` totals and one row per CDP in `cdps`, ordered by ICR.
+    """
+    block = block or web3.eth.block_number
+    owners = {to_checksum_address(str(owner)) for owner in owners}
+
+    price = ebtc.price_feed.fetchPrice.call(block_identifier=block)
+    with multicall(block_identifier=block):
+        cdps_of = [ebtc.sorted_cdps.getCdpsOf(owner) for owner in sorted(owners)]
+        # same index the CdpManager uses to convert shares
+        steth_index = ebtc.collateral.getPooledEthByShares(DECIMAL_PRECISION)
+        system_coll_shares = ebtc.cdp_manager.getSyncedSystemCollShares()
+        system_debt = ebtc.active_pool.getSystemDebt()
+    cdp_ids = [str(id) for ids in cdps_of for id in ids]
+    with multicall(block_identifier=block):
+        synced = [ebtc.cdp_manager.getSyncedDebtAndCollShares(id) for id in cdp_ids]
+
+    def pooled(shares):
+        return int(shares) * int(steth_index) // DECIMAL_PRECISION
+
+    def ratio(coll_shares, debt):
+        return pooled(coll_shares) * int(price) // int(debt) if debt else None
+
+    cdps = [
+        {
+            "owner": owner_of(id),
+            "cdp_id": id,
+            "coll_shares": int(coll),
+            "coll": pooled(coll),
+            "debt": int(debt),
+            "icr": ratio(coll, debt),
+            "nicr": nominal_cr(coll, debt),
+            "share_of_system_coll": int(coll) / int(system_coll_shares),
+            "share_of_system_debt": int(debt) / int(system_debt),
+        }
+        for id, (debt, coll) in zip(cdp_ids, synced)
+    ]
+    cdps.sort(key=lambda cdp: cdp["icr"])
+
+    return {
+        "block": block,
+        "price": int(price),
+        "system": {
+            "coll_shares": int(system_coll_shares),
+            "coll": pooled(system_coll_shares),
+            "debt": int(system_debt),
+            "tcr": ratio(system_coll_shares, system_debt),
+        },
+        "cdps": cdps,
+    }
@@ -0,0 +1,51 @@
+# Generated from the governable function signatures used in the authority contract,
+# precomputed so that `eBTC` does not hash them on every instantiation.
+# Regenerate with `encode_signature(<signature>)` from `helpers.utils` when adding entries.
+GOVERNANCE_SIGNATURES = {
+    "SET_STAKING_REWARD_SPLIT_SIG": "0xb6fe918a",  # setStakingRewardSplit(uint256)
+    "SET_REDEMPTION_FEE_FLOOR_SIG": "0x6030cc8c",  # setRedemptionFeeFloor(uint256)
+    "SET_MINUTE_DECAY_FACTOR_SIG": "0xb835f032",  # setMinuteDecayFactor(uint256)
+    "SET_BETA_SIG": "0xd3a0b810",  # setBeta(uint256)
+    "SET_REDEMPTIONS_PAUSED_SIG": "0x0da254b4",  # setRedemptionsPaused(bool)
+    "SET_GRACE_PERIOD_SIG": "0x1776165b",  # setGracePeriod(uint128)
+    "MINT_SIG": "0x40c10f19",  # mint(address,uint256)
+    "BURN_SIG": "0x9dc29fac",  # burn(address,uint256)
+    "BURN2_SIG": "0x42966c68",  # burn(uint256)
+    "SET_FALLBACK_CALLER_SIG": "0xb6f0e8ce",  # setFallbackCaller(address)
+    "SET_PRIMARY_ORACLE_SIG": "0xf2188066",  # setPrimaryOracle(address)
+    "SET_SECONDARY_ORACLE_SIG": "0xd6e0c3b1",  # setSecondaryOracle(address)
+    "SET_FEE_BPS_SIG": "0x72c27b62",  # setFeeBps(uint256)
+    "SET_FLASH_LOANS_PAUSED_SIG": "0x970c297f",  # setFlashLoansPaused(bool)
+    "SWEEP_TOKEN_SIG": "0xe90a182f",  # sweepToken(address,uint256)
+    "CLAIM_FEE_RECIPIENT_COLL_SIG": "0xd3e0947a",  # claimFeeRecipientCollShares(uint256)
+    "SET_ROLE_NAME_SIG": "0xbd516bed",  # setRoleName(uint8,string)
+    "SET_USER_ROLE_SIG": "0x67aff484",  # setUserRole(address,uint8,bool)
+    "SET_ROLE_CAPABILITY_SIG": "0x7d40583d",  # setRoleCapability(uint8,address,bytes4,bool)
+    "SET_PUBLIC_CAPABILITY_SIG": "0xc6b0263e",  # setPublicCapability(address,bytes4,bool)
+    "BURN_CAPABILITY_SIG": "0x08e4489c",  # burnCapability(address,bytes4)
+    "TRANSFER_OWNERSHIP_SIG": "0xf2fde38b",  # transferOwnership(address)
+    "SET_AUTHORITY_SIG": "0x7a9e5e4b",  # setAuthority(address)
+    "SET_COLLATERAL_FEED_SOURCE_SIG": "0x9a60bfe3",  # setCollateralFeedSource(bool)
+    "STEBTC_SET_MIN_REWARDS_PER_PERIOD_SIG": "0x7343e989",  # setMinRewardsPerPeriod(uint256)
+    "STEBTC_DONATE": "0xf14faf6f",  # donate(uint256)
+    "STEBTC_SWEEP": "0x01681a62",  # sweep(address)
+    "STEBTC_SET_MINTING_FEE": "0x238a4709",  # setMintingFee(uint256)
+    "STEBTC_SET_MAX_DISTRIBUTION_PER_SECOND_PER_ASSET": "0x48f76e0f",  # setMaxDistributionPerSecondPerAsset(uint256)
+    "BSM_UPDATE_ESCROW": "0x8b6a101a",  # updateEscrow(address)
+    "BSM_SET_ORACLE_PRICE_CONSTRAINT": "0x037ba2ab",  # setOraclePriceConstraint(address)
+    "BSM_SET_RATE_LIMITING_CONSTRAINT": "0xe19e50d4",  # setRateLimitingConstraint(address)
+    "BSM_SET_BUY_ASSET_CONSTRAINT": "0x6045bfc5",  # setBuyAssetConstraint(address)
+    "BSM_SET_FEE_TO_BUY": "0x9a24ceb8",  # setFeeToBuy(uint256)
+    "BSM_SET_FEE_TO_SELL": "0x9154cff2",  # setFeeToSell(uint256)
+    "BSM_PAUSE": "0x8456cb59",  # pause()
+    "BSM_UNPAUSE": "0x3f4ba83a",  # unpause()
+    "BSM_CLAIM_PROFIT": "0xf011a7af",  # claimProfit()
+    "BSM_CLAIM_TOKENS": "0xfe417fa5",  # claimTokens(address,uint256)
+    "BSM_DEPOSIT_TO_EXTERNAL_VAULT": "0xc180b3b1",  # depositToExternalVault(uint256,uint256)
+    "BSM_REDEEM_FROM_EXTERNAL_VAULT": "0xf5d73ca9",  # redeemFromExternalVault(uint256,uint256)
+    "BSM_SET_MIN_PRICE": "0x5ea8cd12",  # setMinPrice(uint256)
+    "BSM_SET_ORACLE_FRESHNESS": "0xb6b2d4a6",  # setOracleFreshness(uint256)
+    "BSM_SET_MINTING_CONFIG": "0x0439e932",  # setMintingConfig(address,(uint256,uint256,bool))
+    "BSM_SELL_ASSET_NO_FEE": "0xf00e8600",  # sellAssetNoFee(uint256,address,uint256)
+    "BSM_BUY_ASSET_NO_FEE": "0xc2a538e6",  # buyAssetNoFee(uint256,address,uint256)
+}
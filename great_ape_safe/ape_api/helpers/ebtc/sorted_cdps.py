@@ -0,0 +1,167 @@
+from bisect import bisect_left, insort
+
+from brownie import multicall, web3
+from eth_abi import decode_abi
+from hexbytes import HexBytes
+
+from helpers.constants import EmptyBytes32
+
+# LiquityMath.NICR_PRECISION, nominal ratios ignore the price
+NICR_PRECISION = 10 ** 20
+MAX_NICR = 2 ** 256 - 1
+PAGE_SIZE = 500
+
+CDP_UPDATED = web3.keccak(
+    text="CdpUpdated(bytes32,address,address,uint256,uint256,uint256,uint256,uint256,uint8)"
+).hex()
+CDP_LIQUIDATED = web3.keccak(
+    text="CdpLiquidated(bytes32,address,uint256,uint256,uint8,address,uint256)"
+).hex()
+CDP_FEE_SPLIT_APPLIED = web3.keccak(
+    text="CdpFeeSplitApplied(bytes32,uint256,uint256,uint256,uint256)"
+).hex()
+
+
+def nominal_cr(coll, debt):
+    # mirrors LiquityMath._computeNominalCR
+    if debt > 0:
+        return int(coll) * NICR_PRECISION // int(debt)
+    return MAX_NICR
+
+
+class SortedCdpsMirror:
+    """
+    In-memory copy of the SortedCdps list, ordered by cached nominal ICR.
+
+    The list is loaded from `MultiCdpGetter` pages (batched in one multicall)
+    and kept up to date from the CdpManager logs, so upper/lower hints for a
+    new NICR come from a binary search instead of `getApproxHint` plus
+    `findInsertPosition`. CDPs sharing the exact same NICR may be ordered
+    differently than on chain, the hints are then off by a few nodes, which
+    `findInsertPosition` on chain walks through anyway.
+    """
+
+    def __init__(self, sorted_cdps, cdp_manager, multi_cdp_getter, get_logs=None):
+        self.sorted_cdps = sorted_cdps
+        self.cdp_manager = cdp_manager
+        self.multi_cdp_getter = multi_cdp_getter
+        self.get_logs = get_logs or web3.eth.get_logs
+        self.last_block = None
+        self.coll = {}
+        self.debt = {}
+        # (-nicr, id) ascending is the list order, highest nicr first
+        self._keys = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def ids(self):
+        return [id for _, id in self._keys]
+
+    def nicr(self, id):
+        return nominal_cr(self.coll[id], self.debt[id])
+
+    def load(self, block=None):
+        """
+        @dev Rebuilds the mirror from `getMultipleSortedCdps` pages read at `block`.
+        """
+        block = block or web3.eth.block_number
+        size = self.sorted_cdps.getSize(block_identifier=block)
+        with multicall(block_identifier=block):
+            pages = [
+                self.multi_cdp_getter.getMultipleSortedCdps(start, PAGE_SIZE)
+                for start in range(0, size, PAGE_SIZE)
+            ]
+        self.coll, self.debt, self._keys = {}, {}, []
+        for page in pages:
+            for cdp in page:
+                id = HexBytes(cdp[0]).hex()
+                self.coll[id], self.debt[id] = int(cdp[2]), int(cdp[1])
+                self._keys.append((-self.nicr(id), id))
+        self._keys.sort()
+        self.last_block = block
+
+    def sync(self, to_block=None):
+        """
+        @dev Applies the CdpManager logs emitted since the last load or sync.
+        """
+        if self.last_block is None:
+            return self.load(to_block)
+        to_block = to_block or web3.eth.block_number
+        if to_block <= self.last_block:
+            return
+        logs = self.get_logs(
+            {
+                "address": self.cdp_manager.address,
+                "fromBlock": self.last_block + 1,
+                "toBlock": to_block,
+                "topics": [
+                    [
+                        CDP_UPDATED,
+                        CDP_LIQUIDATED,
+                        CDP_FEE_SPLIT_APPLIED,
+                    ]
+                ],
+            }
+        )
+        for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"])):
+            self._apply(log)
+        self.last_block = to_block
+
+    def _apply(self, log):
+        topics = [HexBytes(topic) for topic in log["topics"]]
+        topic0 = topics[0].hex()
+        data = HexBytes(log["data"])
+
+        # partial liquidations are covered by the CdpUpdated emitted with the
+        # remaining debt and coll, CdpPartiallyLiquidated only has the amounts taken
+        if topic0 == CDP_UPDATED:
+            _, _, debt, coll, _, _ = decode_abi(
+                ["uint256", "uint256", "uint256", "uint256", "uint256", "uint8"], data
+            )
+            self._set(topics[1].hex(), coll, debt)
+        elif topic0 == CDP_LIQUIDATED:
+            self._remove(topics[1].hex())
+        elif topic0 == CDP_FEE_SPLIT_APPLIED:
+            id, _, _, _, coll = decode_abi(
+                ["bytes32", "uint256", "uint256", "uint256", "uint256"], data
+            )
+            id = HexBytes(id).hex()
+            if id in self.debt:
+                self._set(id, coll, self.debt[id])
+
+    def _remove(self, id):
+        if id not in self.debt:
+            return
+        self._keys.pop(bisect_left(self._keys, (-self.nicr(id), id)))
+        del self.coll[id], self.debt[id]
+
+    def _set(self, id, coll, debt):
+        self._remove(id)
+        # closed and fully redeemed cdps are updated to zero debt
+        if debt == 0:
+            return
+        self.coll[id], self.debt[id] = int(coll), int(debt)
+        insort(self._keys, (-self.nicr(id), id))
+
+    def hints(self, nicr):
+        """
+        @dev Exact insert position of `nicr`: the first node with a lower or
+             equal NICR and its predecessor, `EmptyBytes32` at the list ends.
+        @return (upper_hint, lower_hint) as expected by `openCdp`/`adjustCdp`.
+        """
+        # `(-nicr, "")` sorts before every id with the same nicr
+        index = bisect_left(self._keys, (-int(nicr), ""))
+        upper = self._keys[index - 1][1] if index > 0 else EmptyBytes32
+        lower = self._keys[index][1] if index < len(self._keys) else EmptyBytes32
+        return upper, lower
+
+    def verify(self, nicr, hints):
+        """
+        @dev Checks local hints against `findInsertPosition` on the mirrored block.
+        @return The on-chain (upper_hint, lower_hint), equal to `hints` when the mirror is in sync.
+        """
+        upper, lower = self.sorted_cdps.findInsertPosition(
+            nicr, hints[0], hints[1], block_identifier=self.last_block
+        )
+        return HexBytes(upper).hex(), HexBytes(lower).hex()
@@ -0,0 +1,195 @@
+import numpy as np
+
+from great_ape_safe.ape_api.helpers.ebtc.model import UNSET_TIMESTAMP
+
+
+def linear_paths(price, shocks, steps):
+    """
+    @dev Price paths moving linearly from `price` to `price * (1 + shock)` in `steps` steps.
+    @return array of shape (len(shocks), steps).
+    """
+    shocks = np.asarray(shocks, dtype=float)[:, None]
+    return price * (1 + shocks * np.arange(1, steps + 1) / steps)
+
+
+def _icr(coll, debt, stake, price, redistributed):
+    # per scenario and cdp, with the bad debt redistributed by stake so far
+    debt = debt + redistributed[:, None] * stake
+    return coll * price[:, None] / debt, debt
+
+
+def stress_test(model, prices, step_duration=3600, grace_period=None, max_rounds=10):
+    """
+    @dev Replays price paths over every CDP of a `CdpManagerModel` snapshot, all
+         scenarios at once as (scenarios, cdps) arrays. At every step, CDPs below
+         MCR are liquidated, and in recovery mode (TCR < CCR) those below the TCR
+         once the grace period has elapsed. Collateral seized is capped at LICR,
+         the debt not covered (bad debt) is redistributed by stake, which can
+         trigger more liquidations within the same step, up to `max_rounds`
+         rounds. Each round ranks the remaining CDPs by their ICR after the
+         redistributions so far and checks recovery mode against the TCR left
+         by the previous rounds. Only the scenarios that liquidated in a round
+         go through the next one, and ICRs are only recomputed where bad debt
+         got redistributed. Every step still makes a few passes over the whole
+         (scenarios, cdps) arrays: 2000 scenarios x 5000 cdps x 50 steps take
+         ~10 s and ~0.5 GB, 100 scenarios well under a second.
+    @param model `CdpManagerModel`, loaded from chain or from a recorded snapshot.
+    @param prices Prices per step, array of shape (scenarios, steps), see `linear_paths`.
+    @param step_duration Seconds between two steps, used for the grace period.
+    @param grace_period Recovery mode grace period duration, defaults to the snapshot's.
+    @return dict of arrays of shape (scenarios, steps), plus `order` (cdp ids, weakest
+            first at the snapshot), `mcr_step`/`ccr_step` (per scenario, the first step
+            each cdp of `order` went below MCR/CCR, -1 if never) and
+            `recovery_mode_step` (first step in recovery mode per scenario, -1 if never).
+    """
+    s = model.system
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    scenarios, steps = prices.shape
+    grace_period = (
+        s["recoveryModeGracePeriodDuration"] if grace_period is None else grace_period
+    )
+
+    # weakest first, the reverse of the sorted list
+    order = np.argsort(model.nicr(), kind="stable")
+    coll = model.pooled(model.synced_coll())[order]
+    debt = model.synced_debt()[order]
+    stake = model.stake[order]
+    n = len(order)
+
+    # per scenario state: live cdps, debt redistributed per unit of stake, system totals
+    alive = np.ones((scenarios, n), dtype=bool)
+    alive_count = np.full(scenarios, n)
+    alive_stake = np.full(scenarios, stake.sum())
+    redistributed = np.zeros(scenarios)
+    system_coll = np.full(scenarios, float(model.pooled(model.synced_system_coll())))
+    system_debt = np.full(scenarios, float(s["getSystemDebt"]))
+    if s["lastGracePeriodStartTimestamp"] == UNSET_TIMESTAMP:
+        rm_elapsed = np.full(scenarios, np.nan)
+    else:
+        rm_elapsed = np.full(
+            scenarios, float(s["timestamp"] - s["lastGracePeriodStartTimestamp"])
+        )
+
+    result = {
+        key: np.zeros((scenarios, steps))
+        for key in ["tcr", "liquidated_coll", "liquidated_debt", "bad_debt"]
+    }
+    result.update(
+        {
+            key: np.zeros((scenarios, steps), dtype=int)
+            for key in ["liquidated_count", "mcr_count", "ccr_count"]
+        }
+    )
+    result["recovery_mode"] = np.zeros((scenarios, steps), dtype=bool)
+    result["mcr_step"] = np.full((scenarios, n), -1)
+    result["ccr_step"] = np.full((scenarios, n), -1)
+
+    def system_tcr(price):
+        # once every cdp is gone only float residue is left, the TCR is unbounded
+        return np.divide(
+            system_coll * price,
+            system_debt,
+            out=np.full(scenarios, np.inf),
+            where=(system_debt > 0) & (alive_count > 0),
+        )
+
+    # icr over price until bad debt gets redistributed
+    ratio = coll / debt
+    per_cdp = np.stack([coll, debt, stake, np.ones(n)], axis=1)
+    crossed_count = {level: np.zeros(scenarios, dtype=int) for level in ["mcr", "ccr"]}
+
+    for step in range(steps):
+        price = prices[:, step]
+
+        icr = ratio * price[:, None]
+        spread = np.flatnonzero(redistributed > 0)
+        if len(spread):
+            icr[spread], _ = _icr(
+                coll, debt, stake, price[spread], redistributed[spread]
+            )
+
+        # cdps that crossed MCR and CCR so far, before this step's liquidations
+        for level in ["mcr", "ccr"]:
+            first = result[f"{level}_step"]
+            new = icr < s[level.upper()]
+            new &= alive
+            new &= first < 0
+            first[new] = step
+            crossed_count[level] += new.sum(axis=1)
+            result[f"{level}_count"][:, step] = crossed_count[level]
+
+        # grace period: starts when entering recovery mode, resets when leaving it
+        rm_elapsed = np.where(np.isnan(rm_elapsed), np.nan, rm_elapsed + step_duration)
+        # scenarios still liquidating, `icr` only holds their rows
+        rows = np.arange(scenarios)
+        for _ in range(max_rounds):
+            tcr = system_tcr(price)
+            recovery = tcr < s["CCR"]
+            rm_elapsed = np.where(
+                recovery, np.where(np.isnan(rm_elapsed), 0.0, rm_elapsed), np.nan
+            )
+            result["recovery_mode"][:, step] |= recovery
+
+            rm_liquidations = recovery & (rm_elapsed > grace_period)
+            threshold = np.where(rm_liquidations, np.maximum(s["MCR"], tcr), s["MCR"])
+            liquidate = alive[rows] & (icr < threshold[rows, None])
+            hit = liquidate.any(axis=1)
+            if not hit.any():
+                break
+            rows, liquidate, icr = rows[hit], liquidate[hit], icr[hit]
+            row_price = price[rows]
+
+            # cdps under LICR give all their collateral and leave bad debt behind,
+            # the totals come from mask @ (coll, debt, stake, 1) products
+            bad = liquidate & (icr < s["LICR"])
+            coll_all, debt_all, stake_all, count = (liquidate.astype(float) @ per_cdp).T
+            coll_bad, debt_bad, stake_bad, _ = (bad.astype(float) @ per_cdp).T
+            debt_all += redistributed[rows] * stake_all
+            debt_bad += redistributed[rows] * stake_bad
+            covered = coll_bad * row_price / s["LICR"]
+            bad_debt = np.maximum(debt_bad - covered, 0)
+            seized = coll_bad + (debt_all - debt_bad) * s["LICR"] / row_price
+
+            result["liquidated_coll"][rows, step] += seized
+            result["liquidated_debt"][rows, step] += debt_all
+            result["bad_debt"][rows, step] += bad_debt
+            result["liquidated_count"][rows, step] += count.astype(int)
+
+            system_coll[rows] -= coll_all
+            system_debt[rows] -= debt_all - bad_debt
+            alive[rows] &= ~liquidate
+            alive_count[rows] -= count.astype(int)
+            alive_stake[rows] -= stake_all
+
+            # only the bad debt moves the ICRs of the cdps left
+            spread = np.flatnonzero(bad_debt > 0)
+            if len(spread):
+                redistributed[rows[spread]] += np.divide(
+                    bad_debt[spread],
+                    alive_stake[rows[spread]],
+                    out=np.zeros(len(spread)),
+                    where=alive_count[rows[spread]] > 0,
+                )
+                icr[spread], _ = _icr(
+                    coll, debt, stake, row_price[spread], redistributed[rows[spread]]
+                )
+
+        result["tcr"][:, step] = system_tcr(price)
+
+    result["liquidator_reward"] = result["liquidated_count"] * float(
+        s["LIQUIDATOR_REWARD"]
+    )
+    result["order"] = [model.ids[i] for i in order]
+    in_recovery = result["recovery_mode"].any(axis=1)
+    result["recovery_mode_step"] = np.where(
+        in_recovery, result["recovery_mode"].argmax(axis=1), -1
+    )
+    return result
+
+
+def crossed(result, scenario, step, level="mcr"):
+    """
+    @dev Ids of the CDPs that went below MCR (or CCR) by `step` of `scenario`.
+    """
+    first = result[f"{level}_step"][scenario]
+    return [result["order"][i] for i in np.flatnonzero((first >= 0) & (first <= step))]
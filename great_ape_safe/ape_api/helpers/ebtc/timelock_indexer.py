@@ -0,0 +1,325 @@
+import os
+import sqlite3
+
+from brownie import chain, web3
+from brownie._config import CONFIG
+from eth_abi import decode_abi
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+
+from great_ape_safe.ape_api.helpers.ebtc.signatures import GOVERNANCE_SIGNATURES
+from helpers.cache import cache_path
+from helpers.constants import EmptyBytes32
+
+CALL_SCHEDULED = web3.keccak(
+    text="CallScheduled(bytes32,uint256,address,uint256,bytes,bytes32,uint256)"
+).hex()
+CALL_EXECUTED = web3.keccak(
+    text="CallExecuted(bytes32,uint256,address,uint256,bytes)"
+).hex()
+CANCELLED = web3.keccak(text="Cancelled(bytes32)").hex()
+# only emitted for a non zero salt
+CALL_SALT = web3.keccak(text="CallSalt(bytes32,bytes32)").hex()
+MIN_DELAY_CHANGE = web3.keccak(text="MinDelayChange(uint256,uint256)").hex()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    timelock TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS operations (
+    timelock TEXT NOT NULL,
+    id TEXT NOT NULL,
+    predecessor TEXT,
+    delay INTEGER,
+    scheduled_block INTEGER,
+    scheduled_tx TEXT,
+    ready_at INTEGER,
+    executed_block INTEGER,
+    cancelled_block INTEGER,
+    PRIMARY KEY (timelock, id)
+);
+CREATE TABLE IF NOT EXISTS calls (
+    timelock TEXT NOT NULL,
+    id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    target TEXT,
+    value TEXT,
+    data TEXT,
+    selector TEXT,
+    signature TEXT,
+    executed_block INTEGER,
+    PRIMARY KEY (timelock, id, idx)
+);
+CREATE TABLE IF NOT EXISTS salts (
+    timelock TEXT NOT NULL,
+    id TEXT NOT NULL,
+    salt TEXT NOT NULL,
+    PRIMARY KEY (timelock, id)
+);
+CREATE TABLE IF NOT EXISTS min_delay_changes (
+    timelock TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    old_delay INTEGER,
+    new_delay INTEGER,
+    PRIMARY KEY (timelock, tx)
+);
+CREATE INDEX IF NOT EXISTS operations_ready_at ON operations (ready_at);
+CREATE INDEX IF NOT EXISTS calls_target ON calls (target);
+CREATE INDEX IF NOT EXISTS calls_selector ON calls (selector);
+"""
+
+# mirrors TimelockController's view of an operation, `now` is bound at query time
+STATE = """
+CASE
+    WHEN o.cancelled_block IS NOT NULL THEN 'cancelled'
+    WHEN o.executed_block IS NOT NULL THEN 'done'
+    WHEN o.ready_at <= :now THEN 'ready'
+    ELSE 'pending'
+END
+"""
+
+
+class TimelockIndexer:
+    """
+    Event sourced index of the operations going through a set of timelocks.
+
+    `CallScheduled`, `CallSalt`, `CallExecuted`, `Cancelled` and `MinDelayChange` logs are
+    ingested in block range chunks into a local sqlite database, which by default
+    is only stored on disk for live networks. Every chunk is committed together
+    with the per timelock cursor, so an interrupted sync resumes where it stopped. `get_logs` and `get_timestamp` can be swapped for
+    recorded data, by default they query the connected node.
+    """
+
+    def __init__(
+        self,
+        timelocks,
+        db_path=None,
+        start_block=0,
+        chunk_size=50_000,
+        confirmations=0,
+        get_logs=None,
+        get_timestamp=None,
+    ):
+        self.timelocks = {
+            name: to_checksum_address(str(getattr(timelock, "address", timelock)))
+            for name, timelock in timelocks.items()
+        }
+        self.start_block = start_block
+        self.chunk_size = chunk_size
+        self.confirmations = confirmations
+        self.get_logs = get_logs or web3.eth.get_logs
+        self.get_timestamp = get_timestamp or (
+            lambda block: web3.eth.get_block(block).timestamp
+        )
+        self.selectors = {v: k for k, v in GOVERNANCE_SIGNATURES.items()}
+
+        if db_path is None:
+            # forks share the chain id of mainnet, keep their logs off the store
+            db_path = (
+                cache_path("timelocks", f"{chain.id}.sqlite")
+                if CONFIG.network_type == "live"
+                else ":memory:"
+            )
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def cursor(self, name):
+        row = self.db.execute(
+            "SELECT last_block FROM cursors WHERE timelock = ?", (name,)
+        ).fetchone()
+        return row["last_block"] if row else self.start_block - 1
+
+    def sync(self, to_block=None):
+        """
+        @dev Ingests all the logs between each timelock's cursor and `to_block`.
+        @param to_block Last block to index, defaults to the head minus `confirmations`.
+        """
+        if to_block is None:
+            to_block = web3.eth.block_number - self.confirmations
+        for name, address in self.timelocks.items():
+            from_block = self.cursor(name) + 1
+            chunk_size = self.chunk_size
+            while from_block <= to_block:
+                end_block = min(from_block + chunk_size - 1, to_block)
+                try:
+                    logs = self.get_logs(
+                        {
+                            "address": address,
+                            "fromBlock": from_block,
+                            "toBlock": end_block,
+                            "topics": [
+                                [
+                                    CALL_SCHEDULED,
+                                    CALL_EXECUTED,
+                                    CANCELLED,
+                                    CALL_SALT,
+                                    MIN_DELAY_CHANGE,
+                                ]
+                            ],
+                        }
+                    )
+                except ValueError:
+                    # node refused the range (too many results or range too wide)
+                    if chunk_size == 1:
+                        raise
+                    chunk_size = max(1, chunk_size // 2)
+                    continue
+                with self.db:
+                    for log in sorted(
+                        logs, key=lambda log: (log["blockNumber"], log["logIndex"])
+                    ):
+                        self._apply(name, log)
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO cursors VALUES (?, ?)",
+                        (name, end_block),
+                    )
+                from_block = end_block + 1
+
+    def _apply(self, name, log):
+        topics = [HexBytes(topic) for topic in log["topics"]]
+        topic0 = topics[0].hex()
+        data = HexBytes(log["data"])
+        block = log["blockNumber"]
+        tx = HexBytes(log["transactionHash"]).hex()
+
+        if topic0 == MIN_DELAY_CHANGE:
+            old_delay, new_delay = decode_abi(["uint256", "uint256"], data)
+            self.db.execute(
+                "INSERT OR REPLACE INTO min_delay_changes VALUES (?, ?, ?, ?, ?)",
+                (name, block, tx, old_delay, new_delay),
+            )
+            return
+
+        id = topics[1].hex()
+        if topic0 == CALL_SALT:
+            (salt,) = decode_abi(["bytes32"], data)
+            self.db.execute(
+                "INSERT OR REPLACE INTO salts VALUES (?, ?, ?)",
+                (name, id, HexBytes(salt).hex()),
+            )
+        elif topic0 == CANCELLED:
+            self.db.execute(
+                "UPDATE operations SET cancelled_block = ? WHERE timelock = ? AND id = ?",
+                (block, name, id),
+            )
+        elif topic0 == CALL_SCHEDULED:
+            index = int(topics[2].hex(), 16)
+            target, value, payload, predecessor, delay = decode_abi(
+                ["address", "uint256", "bytes", "bytes32", "uint256"], data
+            )
+            # an id can be rescheduled after a cancellation
+            self.db.execute(
+                """
+                INSERT INTO operations VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL)
+                ON CONFLICT (timelock, id) DO UPDATE SET
+                    predecessor = excluded.predecessor,
+                    delay = excluded.delay,
+                    scheduled_block = excluded.scheduled_block,
+                    scheduled_tx = excluded.scheduled_tx,
+                    ready_at = excluded.ready_at,
+                    executed_block = NULL,
+                    cancelled_block = NULL
+                """,
+                (
+                    name,
+                    id,
+                    HexBytes(predecessor).hex(),
+                    delay,
+                    block,
+                    tx,
+                    self.get_timestamp(block) + delay,
+                ),
+            )
+            selector = HexBytes(payload[:4]).hex()
+            self.db.execute(
+                "INSERT OR REPLACE INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                (
+                    name,
+                    id,
+                    index,
+                    to_checksum_address(target),
+                    str(value),
+                    HexBytes(payload).hex(),
+                    selector,
+                    self.selectors.get(selector),
+                ),
+            )
+        elif topic0 == CALL_EXECUTED:
+            index = int(topics[2].hex(), 16)
+            self.db.execute(
+                "UPDATE calls SET executed_block = ? WHERE timelock = ? AND id = ? AND idx = ?",
+                (block, name, id, index),
+            )
+            # batches execute atomically, one executed call means a done operation
+            self.db.execute(
+                "UPDATE operations SET executed_block = ? WHERE timelock = ? AND id = ?",
+                (block, name, id),
+            )
+
+    def operations(
+        self,
+        state=None,
+        timelock=None,
+        target=None,
+        selector=None,
+        ready_before=None,
+        now=None,
+    ):
+        """
+        @dev Queries the indexed operations, one row per call of each operation.
+        @param state One of "pending", "ready", "done" or "cancelled".
+        @param timelock Name of the timelock as passed to the constructor.
+        @param target Address (or contract) called by the operation.
+        @param selector 4 bytes selector, or key of `GOVERNANCE_SIGNATURES`.
+        @param ready_before Only operations executable before this timestamp.
+        @param now Timestamp the pending/ready split is evaluated at, defaults to `chain.time()`.
+        """
+        clauses, params = [], {
+            "now": chain.time() if now is None else now,
+            "empty": EmptyBytes32,
+        }
+        if state:
+            clauses.append(f"({STATE}) = :state")
+            params["state"] = state
+        if timelock:
+            clauses.append("o.timelock = :timelock")
+            params["timelock"] = timelock
+        if target:
+            clauses.append("c.target = :target")
+            params["target"] = to_checksum_address(
+                str(getattr(target, "address", target))
+            )
+        if selector:
+            clauses.append("c.selector = :selector")
+            params["selector"] = GOVERNANCE_SIGNATURES.get(selector, selector)
+        if ready_before:
+            clauses.append("o.ready_at <= :ready_before")
+            params["ready_before"] = ready_before
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.db.execute(
+            f"""
+            SELECT o.timelock, o.id, ({STATE}) AS state, o.ready_at, o.delay,
+                   o.predecessor, o.scheduled_block, o.scheduled_tx,
+                   o.executed_block, o.cancelled_block,
+                   COALESCE(s.salt, :empty) AS salt,
+                   c.idx, c.target, c.value, c.data, c.selector, c.signature
+            FROM operations o JOIN calls c ON c.timelock = o.timelock AND c.id = o.id
+            LEFT JOIN salts s ON s.timelock = o.timelock AND s.id = o.id
+            {where}
+            ORDER BY o.ready_at, o.id, c.idx
+            """,
+            params,
+        )
+        return [dict(row) for row in rows]
+
+    def min_delay_changes(self, timelock=None):
+        rows = self.db.execute(
+            "SELECT * FROM min_delay_changes WHERE :timelock IS NULL OR timelock = :timelock ORDER BY block",
+            {"timelock": timelock},
+        )
+        return [dict(row) for row in rows]
@@ -0,0 +1,188 @@
+import time
+from collections import defaultdict
+
+from brownie import chain, multicall
+from rich.console import Console
+
+from great_ape_safe.ape_api.helpers.ebtc.timelock_indexer import TimelockIndexer
+from helpers.constants import AddressZero, EmptyBytes32, DONE_TIMESTAMP, EXECUTOR_ROLE
+from helpers.utils import hash_operation, hash_operation_batch
+
+C = Console()
+
+TIMELOCKS = ["lowsec_timelock", "highsec_timelock", "treasury_timelock"]
+
+
+class TimelockScheduler:
+    """
+    Executes the operations of the eBTC timelocks as soon as they are ready.
+
+    Pending operations, with their salts, come from a `TimelockIndexer` and
+    their state is confirmed on chain with one multicall before acting. Each
+    ready operation is executed by the first of `safes` holding EXECUTOR_ROLE
+    on its timelock, and every safe's executions are packed into one multisend
+    with `multisend_from_receipts`. `sleep` and `now` default to wall clock
+    time; on a fork pass `chain.sleep` based ones to fast forward instead.
+    """
+
+    def __init__(self, safes, indexer=None, sleep=None, now=None, max_sleep=3600):
+        self.safes = safes
+        for safe in safes:
+            if not hasattr(safe, "ebtc"):
+                safe.init_ebtc()
+        ebtc = safes[0].ebtc
+        self.indexer = indexer or TimelockIndexer(
+            {name: getattr(ebtc, name) for name in TIMELOCKS}
+        )
+        self.sleep = sleep or time.sleep
+        self.now = now or chain.time
+        self.max_sleep = max_sleep
+
+    def pending(self):
+        """
+        @dev Syncs the index and returns the operations not executed nor cancelled yet.
+        @return list of operations (dicts) ordered by the time they become ready.
+        """
+        self.indexer.sync()
+        operations = {}
+        for row in self.indexer.operations(now=self.now()):
+            if row["state"] not in ["pending", "ready"]:
+                continue
+            operation = operations.setdefault(
+                (row["timelock"], row["id"]),
+                {
+                    "timelock": row["timelock"],
+                    "id": row["id"],
+                    "ready_at": row["ready_at"],
+                    "predecessor": row["predecessor"],
+                    "salt": row["salt"],
+                    "targets": [],
+                    "values": [],
+                    "payloads": [],
+                },
+            )
+            operation["targets"].append(row["target"])
+            operation["values"].append(int(row["value"]))
+            operation["payloads"].append(row["data"])
+        return sorted(operations.values(), key=lambda operation: operation["ready_at"])
+
+    def wait(self):
+        """
+        @dev Sleeps until the earliest pending operation is ready. Sleeps are capped to
+             `max_sleep`, so that new and cancelled operations are picked up meanwhile.
+        @return The pending operations, the first one being ready. Empty if there are none.
+        """
+        while True:
+            operations = self.pending()
+            if not operations:
+                return []
+            delay = operations[0]["ready_at"] - self.now()
+            if delay <= 0:
+                return operations
+            self.sleep(min(delay + 1, self.max_sleep))
+
+    def _is_batch(self, operation):
+        args = (operation["predecessor"], operation["salt"])
+        if len(operation["targets"]) == 1:
+            single = hash_operation(
+                operation["targets"][0],
+                operation["values"][0],
+                operation["payloads"][0],
+                *args,
+            )
+            if single == operation["id"]:
+                return False
+        batch = hash_operation_batch(
+            operation["targets"], operation["values"], operation["payloads"], *args
+        )
+        # indexes built before salts were tracked can't rebuild non zero salt ids
+        return True if batch == operation["id"] else None
+
+    def ready(self, operations):
+        """
+        @dev Filters the operations executable now and assigns them an executor, reading
+             the timestamps and the EXECUTOR_ROLE holders of all of them in one multicall.
+        @return list of (operation, safe), in a valid execution order.
+        """
+        timelocks = {name: getattr(self.safes[0].ebtc, name) for name in TIMELOCKS}
+        with multicall(block_identifier="latest"):
+            timestamps = {
+                (op["timelock"], id): timelocks[op["timelock"]].getTimestamp(id)
+                for op in operations
+                for id in [op["id"], op["predecessor"]]
+                if id != EmptyBytes32
+            }
+            # OZ timelocks open a role to everyone by granting it to the zero address
+            executors = {
+                (name, account): timelock.hasRole(EXECUTOR_ROLE, account)
+                for name, timelock in timelocks.items()
+                for account in [AddressZero] + [safe.address for safe in self.safes]
+            }
+
+        now = self.now()
+        done = {
+            key for key, timestamp in timestamps.items() if timestamp == DONE_TIMESTAMP
+        }
+        ready = []
+        for operation in operations:
+            key = (operation["timelock"], operation["id"])
+            if not DONE_TIMESTAMP < timestamps[key] <= now:
+                continue
+            predecessor = (operation["timelock"], operation["predecessor"])
+            if operation["predecessor"] != EmptyBytes32 and predecessor not in done:
+                continue
+            safe = next(
+                (
+                    safe
+                    for safe in self.safes
+                    if executors[(operation["timelock"], safe.address)]
+                    or executors[(operation["timelock"], AddressZero)]
+                ),
+                None,
+            )
+            if safe is None:
+                C.print(f"[red]No safe can execute operation {operation['id']}[/red]")
+                continue
+            operation["batch"] = self._is_batch(operation)
+            if operation["batch"] is None:
+                C.print(
+                    f"[red]Salt of operation {operation['id']} unknown, rebuild the index[/red]"
+                )
+                continue
+            ready.append((operation, safe))
+            done.add(key)
+        return ready
+
+    def prepare(self, wait=True):
+        """
+        @dev Executes every ready operation from its executor safe and packs them per safe.
+        @param wait If true, sleeps until at least one operation is ready first.
+        @return list of (safe, safe_tx), ready for `safe.post_safe_tx(safe_tx=safe_tx)`.
+        """
+        operations = self.wait() if wait else self.pending()
+        receipts = defaultdict(list)
+        safes = {}
+        for operation, safe in self.ready(operations):
+            timelock = getattr(safe.ebtc, operation["timelock"])
+            args = (operation["predecessor"], operation["salt"])
+            if operation["batch"]:
+                tx = timelock.executeBatch(
+                    operation["targets"],
+                    operation["values"],
+                    operation["payloads"],
+                    *args,
+                )
+            else:
+                tx = timelock.execute(
+                    operation["targets"][0],
+                    operation["values"][0],
+                    operation["payloads"][0],
+                    *args,
+                )
+            C.print(f"[green]Operation {operation['id']} has been executed![/green]")
+            receipts[safe.address].append(tx)
+            safes[safe.address] = safe
+        return [
+            (safes[address], safes[address].multisend_from_receipts(txs))
+            for address, txs in receipts.items()
+        ]
@@ -0,0 +1,259 @@
+from brownie import multicall, web3
+
+from great_ape_safe.ape_api.helpers.uni_v3.uni_v3_sdk import (
+    MAX_SQRT_RATIO,
+    MAX_TICK,
+    MIN_SQRT_RATIO,
+    MIN_TICK,
+    computeSwapStep,
+    getSqrtRatioAtTick,
+    getTickAtSqrtRatio,
+)
+
+# bitmap words read on each side of the current one by `from_pool`
+DEFAULT_WORDS = 8
+# largest exact input, to swap until the price limit is reached
+MAX_INT256 = 2 ** 255 - 1
+
+
+class PoolSimulator:
+    """
+    Local copy of a Uniswap V3 pool state that replays `UniswapV3Pool.swap`.
+
+    The tick walk and every step go through the integer SwapMath port of
+    `uni_v3_sdk`, so amounts match the pool (and the quoter) to the wei.
+    Only the bitmap words in `words` are known, a swap walking out of them
+    raises instead of silently skipping liquidity.
+    """
+
+    def __init__(
+        self,
+        sqrt_price_x96,
+        tick,
+        liquidity,
+        fee,
+        tick_spacing,
+        liquidity_net,
+        words,
+        token0=None,
+        token1=None,
+    ):
+        self.sqrt_price_x96 = int(sqrt_price_x96)
+        self.tick = int(tick)
+        self.liquidity = int(liquidity)
+        self.fee = int(fee)
+        self.tick_spacing = int(tick_spacing)
+        self.liquidity_net = {int(t): int(net) for t, net in liquidity_net.items()}
+        self.words = set(words)
+        self.token0, self.token1 = token0, token1
+
+        self.bitmap = {}
+        for t in self.liquidity_net:
+            compressed = t // self.tick_spacing
+            word = compressed >> 8
+            self.bitmap[word] = self.bitmap.get(word, 0) | (1 << (compressed % 256))
+
+    @classmethod
+    def from_pool(cls, pool, block=None, words=DEFAULT_WORDS):
+        """
+        @dev Reads the pool state in three multicalls: slot0 and liquidity, then the
+             bitmap words around the current tick, then the `ticks` of every
+             initialized tick found in them.
+        @param words Number of bitmap words read on each side of the current one.
+        """
+        block = block or web3.eth.block_number
+        with multicall(block_identifier=block):
+            slot0 = pool.slot0()
+            liquidity = pool.liquidity()
+            fee = pool.fee()
+            tick_spacing = pool.tickSpacing()
+            token0 = pool.token0()
+            token1 = pool.token1()
+        center = (int(slot0[1]) // int(tick_spacing)) >> 8
+        positions = range(center - words, center + words + 1)
+        with multicall(block_identifier=block):
+            bitmap = {position: pool.tickBitmap(position) for position in positions}
+
+        ticks = [
+            ((position << 8) + bit) * int(tick_spacing)
+            for position, word in bitmap.items()
+            for bit in range(256)
+            if int(word) >> bit & 1
+        ]
+        with multicall(block_identifier=block):
+            info = [pool.ticks(t) for t in ticks]
+
+        return cls(
+            slot0[0],
+            slot0[1],
+            liquidity,
+            fee,
+            tick_spacing,
+            {t: data[1] for t, data in zip(ticks, info)},
+            positions,
+            str(token0),
+            str(token1),
+        )
+
+    def _next_initialized_tick(self, tick, lte):
+        # mirrors TickBitmap.nextInitializedTickWithinOneWord
+        spacing = self.tick_spacing
+        compressed = tick // spacing
+        if not lte:
+            compressed += 1
+        word, bit = compressed >> 8, compressed % 256
+        if word not in self.words:
+            raise ValueError(
+                f"Error: Tick {tick} is outside the bitmap words read, widen `words`"
+            )
+        if lte:
+            masked = self.bitmap.get(word, 0) & ((1 << bit) - 1 + (1 << bit))
+            if masked:
+                return (compressed - (bit - (masked.bit_length() - 1))) * spacing, True
+            return (compressed - bit) * spacing, False
+        masked = self.bitmap.get(word, 0) & ~((1 << bit) - 1)
+        if masked:
+            lsb = (masked & -masked).bit_length() - 1
+            return (compressed + (lsb - bit)) * spacing, True
+        return (compressed + (255 - bit)) * spacing, False
+
+    def swap(
+        self, zero_for_one, amount_specified, sqrt_price_limit_x96=None, trace=False
+    ):
+        """
+        @dev Replays `UniswapV3Pool.swap` without changing the simulator state.
+        @param zero_for_one True to swap token0 for token1.
+        @param amount_specified Positive for an exact input, negative for an exact output.
+        @param sqrt_price_limit_x96 Price the swap stops at, defaults to no limit.
+        @param trace If true, also returns the `steps` of the walk, one per price range.
+        @return dict with the signed `amount0`/`amount1` deltas of the pool, like the
+                contract returns them, and the `sqrt_price_x96`, `tick` and `liquidity` after.
+        """
+        if sqrt_price_limit_x96 is None:
+            sqrt_price_limit_x96 = (
+                MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+            )
+        if zero_for_one:
+            assert (
+                MIN_SQRT_RATIO < sqrt_price_limit_x96 < self.sqrt_price_x96
+            ), "Error: SPL"
+        else:
+            assert (
+                self.sqrt_price_x96 < sqrt_price_limit_x96 < MAX_SQRT_RATIO
+            ), "Error: SPL"
+
+        exact_input = amount_specified > 0
+        remaining, calculated = amount_specified, 0
+        sqrt_price, tick, liquidity = self.sqrt_price_x96, self.tick, self.liquidity
+        steps = []
+
+        while remaining != 0 and sqrt_price != sqrt_price_limit_x96:
+            sqrt_price_start = sqrt_price
+            tick_next, initialized = self._next_initialized_tick(tick, zero_for_one)
+            tick_next = max(min(tick_next, MAX_TICK), MIN_TICK)
+            sqrt_price_next = getSqrtRatioAtTick(tick_next)
+
+            if zero_for_one:
+                target = max(sqrt_price_next, sqrt_price_limit_x96)
+            else:
+                target = min(sqrt_price_next, sqrt_price_limit_x96)
+            sqrt_price, amount_in, amount_out, fee_amount = computeSwapStep(
+                sqrt_price, target, liquidity, remaining, self.fee
+            )
+
+            if trace and sqrt_price != sqrt_price_start:
+                steps.append(
+                    {
+                        "sqrt_price_start": sqrt_price_start,
+                        "sqrt_price_end": sqrt_price,
+                        "liquidity": liquidity,
+                        "amount_in": amount_in,
+                        "amount_out": amount_out,
+                        "fee": fee_amount,
+                    }
+                )
+
+            if exact_input:
+                remaining -= amount_in + fee_amount
+                calculated -= amount_out
+            else:
+                remaining += amount_out
+                calculated += amount_in + fee_amount
+
+            if sqrt_price == sqrt_price_next:
+                if initialized:
+                    net = self.liquidity_net[tick_next]
+                    liquidity += -net if zero_for_one else net
+                tick = tick_next - 1 if zero_for_one else tick_next
+            elif sqrt_price != sqrt_price_start:
+                tick = getTickAtSqrtRatio(sqrt_price)
+
+        if zero_for_one == exact_input:
+            amount0, amount1 = amount_specified - remaining, calculated
+        else:
+            amount0, amount1 = calculated, amount_specified - remaining
+        result = {
+            "amount0": amount0,
+            "amount1": amount1,
+            "sqrt_price_x96": sqrt_price,
+            "tick": tick,
+            "liquidity": liquidity,
+        }
+        if trace:
+            result["steps"] = steps
+        return result
+
+    def _zero_for_one(self, token_in):
+        assert str(token_in).lower() in [
+            str(self.token0).lower(),
+            str(self.token1).lower(),
+        ], f"Error: {token_in} is not a token of the pool"
+        return str(token_in).lower() == str(self.token0).lower()
+
+    def amount_out(self, token_in, amount_in):
+        """
+        @dev Output of an exact input swap, what `quoteExactInputSingle` returns.
+        """
+        zero_for_one = self._zero_for_one(token_in)
+        result = self.swap(zero_for_one, int(amount_in))
+        return -(result["amount1"] if zero_for_one else result["amount0"])
+
+    def amount_in(self, token_in, amount_out):
+        """
+        @dev Input of an exact output swap, what `quoteExactOutputSingle` returns.
+        """
+        zero_for_one = self._zero_for_one(token_in)
+        result = self.swap(zero_for_one, -int(amount_out))
+        return result["amount0"] if zero_for_one else result["amount1"]
+
+    def price_after(self, token_in, amount_in):
+        """
+        @dev `sqrtPriceX96` and tick of the pool after an exact input swap.
+        """
+        result = self.swap(self._zero_for_one(token_in), int(amount_in))
+        return result["sqrt_price_x96"], result["tick"]
+
+    def to_tick(self, target_tick, trace=False):
+        """
+        @dev Smallest exact input moving the price to the sqrt price of `target_tick`, and
+             the output it gives. Within each range between initialized ticks the
+             amounts are closed form, the walk just sums them range by range.
+        @param trace If true, the swap result holds the amounts of each range in `steps`.
+        @return dict with `token_in`, `amount_in`, `amount_out` and the swap result.
+        """
+        target = getSqrtRatioAtTick(int(target_tick))
+        zero_for_one = target < self.sqrt_price_x96
+        if target == self.sqrt_price_x96:
+            return {"token_in": None, "amount_in": 0, "amount_out": 0, "swap": None}
+        result = self.swap(zero_for_one, MAX_INT256, target, trace)
+        amount_in, amount_out = (
+            (result["amount0"], -result["amount1"])
+            if zero_for_one
+            else (result["amount1"], -result["amount0"])
+        )
+        return {
+            "token_in": self.token0 if zero_for_one else self.token1,
+            "amount_in": amount_in,
+            "amount_out": amount_out,
+            "swap": result,
+        }
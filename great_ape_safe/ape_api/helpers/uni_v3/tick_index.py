@@ -0,0 +1,253 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from brownie import multicall, web3
+from eth_abi import decode_abi
+from hexbytes import HexBytes
+
+from great_ape_safe.ape_api.helpers.uni_v3.simulator import PoolSimulator
+from great_ape_safe.ape_api.helpers.uni_v3.uni_v3 import calc_fee_growth_inside
+from great_ape_safe.ape_api.helpers.uni_v3.uni_v3_sdk import MAX_TICK, MIN_TICK
+
+# calls per multicall when reading bitmap words and ticks
+BATCH_SIZE = 500
+
+MINT = web3.keccak(
+    text="Mint(address,address,int24,int24,uint128,uint256,uint256)"
+).hex()
+BURN = web3.keccak(text="Burn(address,int24,int24,uint128,uint256,uint256)").hex()
+SWAP = web3.keccak(
+    text="Swap(address,address,int256,int256,uint160,uint128,int24)"
+).hex()
+
+
+def _batched(calls, block):
+    # reads `calls` (zero argument callables) BATCH_SIZE at a time, one multicall each
+    results = []
+    for start in range(0, len(calls), BATCH_SIZE):
+        with multicall(block_identifier=block):
+            results += [call() for call in calls[start : start + BATCH_SIZE]]
+    return results
+
+
+class TickIndex:
+    """
+    Array-backed copy of every initialized tick of a Uniswap V3 pool.
+
+    Loading reads all the `tickBitmap` words of the pool, then the `ticks` of
+    every initialized one, both in batched multicalls. Ticks are kept sorted
+    in an `array` with their values in parallel lists, and refreshed from the
+    Mint, Burn and Swap logs: only the ticks those touch are read again.
+    """
+
+    def __init__(self, pool, get_logs=None, chunk_size=2_000):
+        self.pool = pool
+        self.get_logs = get_logs or web3.eth.get_logs
+        self.chunk_size = chunk_size
+        self.last_block = None
+        self.ticks = array("i")
+        self.liquidity_gross = []
+        self.liquidity_net = []
+        self.fee_growth_outside0 = []
+        self.fee_growth_outside1 = []
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def _read_state(self, block, ticks):
+        # slot0, liquidity and fee growth globals, plus the `ticks` of `ticks`
+        state = _batched(
+            [
+                self.pool.slot0,
+                self.pool.liquidity,
+                self.pool.feeGrowthGlobal0X128,
+                self.pool.feeGrowthGlobal1X128,
+            ],
+            block,
+        )
+        self.sqrt_price_x96, self.tick = int(state[0][0]), int(state[0][1])
+        self.liquidity = int(state[1])
+        self.fee_growth_global0, self.fee_growth_global1 = map(int, state[2:])
+        return _batched([lambda t=t: self.pool.ticks(t) for t in ticks], block)
+
+    def load(self, block=None):
+        """
+        @dev Rebuilds the index from every bitmap word of the pool at `block`.
+        """
+        block = block or web3.eth.block_number
+        fee, tick_spacing, token0, token1 = _batched(
+            [self.pool.fee, self.pool.tickSpacing, self.pool.token0, self.pool.token1],
+            block,
+        )
+        self.fee, self.tick_spacing = int(fee), int(tick_spacing)
+        self.token0, self.token1 = str(token0), str(token1)
+        positions = self.word_positions()
+        words = _batched(
+            [lambda p=p: self.pool.tickBitmap(p) for p in positions], block
+        )
+        ticks = [
+            ((position << 8) + bit) * self.tick_spacing
+            for position, word in zip(positions, words)
+            for bit in range(256)
+            if int(word) >> bit & 1
+        ]
+        info = self._read_state(block, ticks)
+
+        self.ticks = array("i", ticks)
+        self.liquidity_gross = [int(data[0]) for data in info]
+        self.liquidity_net = [int(data[1]) for data in info]
+        self.fee_growth_outside0 = [int(data[2]) for data in info]
+        self.fee_growth_outside1 = [int(data[3]) for data in info]
+        self.last_block = block
+
+    def word_positions(self):
+        return range(
+            (MIN_TICK // self.tick_spacing) >> 8,
+            ((MAX_TICK // self.tick_spacing) >> 8) + 1,
+        )
+
+    def sync(self, to_block=None):
+        """
+        @dev Reads again the pool state and only the ticks touched by the Mint, Burn and
+             Swap logs since the last load or sync. Logs only move the index forward,
+             a `to_block` older than the last one read reloads it at that block.
+        """
+        if self.last_block is None:
+            return self.load(to_block)
+        to_block = to_block or web3.eth.block_number
+        if to_block < self.last_block:
+            return self.load(to_block)
+        if to_block == self.last_block:
+            return
+        logs = self._get_logs(self.last_block + 1, to_block)
+        touched = set()
+        tick = self.tick
+        for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"])):
+            topics = [HexBytes(topic) for topic in log["topics"]]
+            if topics[0].hex() == SWAP:
+                new_tick = decode_abi(
+                    ["int256", "int256", "uint160", "uint128", "int24"],
+                    HexBytes(log["data"]),
+                )[4]
+                # crossed ticks had their fee growth outside flipped
+                low, high = sorted([tick, new_tick])
+                touched.update(
+                    self.ticks[
+                        bisect_left(self.ticks, low) : bisect_right(self.ticks, high)
+                    ]
+                )
+                tick = new_tick
+            else:
+                # tickLower and tickUpper are the last two indexed topics
+                touched.update(decode_abi(["int24"], topic)[0] for topic in topics[-2:])
+
+        touched = sorted(touched)
+        info = self._read_state(to_block, touched)
+        for t, data in zip(touched, info):
+            self._set(t, data)
+        self.last_block = to_block
+
+    def _get_logs(self, from_block, to_block):
+        # in block range chunks, halved whenever the node refuses one
+        logs, chunk_size = [], self.chunk_size
+        while from_block <= to_block:
+            end_block = min(from_block + chunk_size - 1, to_block)
+            try:
+                logs += self.get_logs(
+                    {
+                        "address": self.pool.address,
+                        "fromBlock": from_block,
+                        "toBlock": end_block,
+                        "topics": [[MINT, BURN, SWAP]],
+                    }
+                )
+            except ValueError:
+                # node refused the range (too many results or range too wide)
+                if chunk_size == 1:
+                    raise
+                chunk_size = max(1, chunk_size // 2)
+                continue
+            from_block = end_block + 1
+        return logs
+
+    def _set(self, tick, data):
+        index = bisect_left(self.ticks, tick)
+        found = index < len(self.ticks) and self.ticks[index] == tick
+        values = [int(value) for value in data[:4]]
+        if not data[7]:
+            # uninitialized once all its liquidity is burnt
+            if found:
+                del self.ticks[index]
+                for column in self._columns():
+                    del column[index]
+            return
+        if not found:
+            self.ticks.insert(index, tick)
+            for column in self._columns():
+                column.insert(index, 0)
+        for column, value in zip(self._columns(), values):
+            column[index] = value
+
+    def _columns(self):
+        return [
+            self.liquidity_gross,
+            self.liquidity_net,
+            self.fee_growth_outside0,
+            self.fee_growth_outside1,
+        ]
+
+    def distribution(self):
+        """
+        @dev Active liquidity between consecutive initialized ticks, for liquidity charts.
+        @return list of (tick_lower, tick_upper, liquidity).
+        """
+        ranges, liquidity = [], 0
+        for i in range(len(self.ticks) - 1):
+            liquidity += self.liquidity_net[i]
+            ranges.append((self.ticks[i], self.ticks[i + 1], liquidity))
+        return ranges
+
+    def fee_growth_inside(self, tick_lower, tick_upper):
+        """
+        @dev Mirrors `Tick.getFeeGrowthInside` for initialized ticks, modulo 2**256 like the contract.
+        """
+        outside = {}
+        for t in [tick_lower, tick_upper]:
+            index = bisect_left(self.ticks, t)
+            assert (
+                index < len(self.ticks) and self.ticks[index] == t
+            ), f"Error: Tick {t} is not initialized"
+            outside[t] = (
+                self.fee_growth_outside0[index],
+                self.fee_growth_outside1[index],
+            )
+
+        return tuple(
+            calc_fee_growth_inside(
+                self.tick,
+                tick_lower,
+                tick_upper,
+                growth_global,
+                outside[tick_lower][i],
+                outside[tick_upper][i],
+            )
+            for i, growth_global in enumerate(
+                [self.fee_growth_global0, self.fee_growth_global1]
+            )
+        )
+
+    def simulator(self):
+        """
+        @dev Swap simulator over every initialized tick of the pool, see `PoolSimulator`.
+        """
+        return PoolSimulator(
+            self.sqrt_price_x96,
+            self.tick,
+            self.liquidity,
+            self.fee,
+            self.tick_spacing,
+            dict(zip(self.ticks, self.liquidity_net)),
+            self.word_positions(),
+            self.token0,
+            self.token1,
+        )
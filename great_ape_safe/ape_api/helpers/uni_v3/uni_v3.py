@@ -1,4 +1,3 @@
-from math import floor
 from rich.pretty import pprint
 
 
@@ -50,7 +49,19 @@ def print_position(nfp, position_id):
 
 def calc_accum_fees(feeGrowthInsideX128, feeGrowthInsideLastX128, liquidity):
     # https://github.com/Uniswap/v3-core/blob/c05a0e2c8c08c460fb4d05cfdda30b3ad8deeaac/contracts/libraries/Position.sol#L60-L76
-    return floor((feeGrowthInsideX128 - feeGrowthInsideLastX128) * liquidity / Q128)
+    # fee growths underflow on purpose, the difference is taken modulo 2**256
+    return (
+        (feeGrowthInsideX128 - feeGrowthInsideLastX128) % 2 ** 256 * liquidity // Q128
+    )
+
+
+def calc_fee_growth_inside(
+    tick, tick_lower, tick_upper, global_growth, outside_lower, outside_upper
+):
+    # https://github.com/Uniswap/v3-core/blob/c05a0e2c8c08c460fb4d05cfdda30b3ad8deeaac/contracts/libraries/Tick.sol#L60-L95
+    below = outside_lower if tick >= tick_lower else global_growth - outside_lower
+    above = outside_upper if tick < tick_upper else global_growth - outside_upper
+    return (global_growth - below - above) % 2 ** 256
 
 
 def calc_all_accum_fees(nfp, v3_pool_obj, position_id):
@@ -65,17 +76,26 @@ def calc_all_accum_fees(nfp, v3_pool_obj, position_id):
     ticks_lower = dict(zip(LABELS["ticks"], v3_pool_obj.ticks(lower)))
     ticks_upper = dict(zip(LABELS["ticks"], v3_pool_obj.ticks(upper)))
 
+    tick = v3_pool_obj.slot0()[1]
     global0 = v3_pool_obj.feeGrowthGlobal0X128()
     global1 = v3_pool_obj.feeGrowthGlobal1X128()
 
-    outside_lower0 = ticks_lower["feeGrowthOutside0X128"]
-    outside_lower1 = ticks_lower["feeGrowthOutside1X128"]
-
-    outside_upper0 = ticks_upper["feeGrowthOutside0X128"]
-    outside_upper1 = ticks_upper["feeGrowthOutside1X128"]
-
-    inside0 = global0 - outside_lower0 - outside_upper0
-    inside1 = global1 - outside_lower1 - outside_upper1
+    inside0 = calc_fee_growth_inside(
+        tick,
+        lower,
+        upper,
+        global0,
+        ticks_lower["feeGrowthOutside0X128"],
+        ticks_upper["feeGrowthOutside0X128"],
+    )
+    inside1 = calc_fee_growth_inside(
+        tick,
+        lower,
+        upper,
+        global1,
+        ticks_lower["feeGrowthOutside1X128"],
+        ticks_upper["feeGrowthOutside1X128"],
+    )
 
     last0 = position["feeGrowthInside0LastX128"]
     last1 = position["feeGrowthInside1LastX128"]
@@ -1,3 +1,4 @@
+import math
 from math import ceil
 
 BASE = 1.0001
@@ -6,6 +7,14 @@ Q96 = 2 ** 96
 Q32 = 2 ** 32
 MAXUINT256 = 2 ** 256 - 1
 
+# https://github.com/Uniswap/v3-core/blob/main/contracts/libraries/TickMath.sol
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+# fees are expressed in hundredths of a bip
+FEE_PIPS = 10 ** 6
+
 
 def maxLiquidityForAmount0(sqrtA, sqrtB, amount):
     # https://github.com/Uniswap/v3-sdk/blob/d139f73823145a5ba5d90ef2f61ff33ff02b6a92/src/utils/maxLiquidityForAmounts.ts#L32-L41
@@ -140,9 +149,167 @@ def getSqrtRatioAtTick(tick):
         ratio = mulShift(ratio, 0x48A170391F7DC42444E8FA2)
 
     if tick > 0:
-        ratio = MAXUINT256 / ratio
+        ratio = MAXUINT256 // ratio
 
+    # integer division, so the result matches TickMath.getSqrtRatioAtTick exactly
     if ratio % Q32 > 0:
-        return ratio / Q32 + 1
+        return ratio // Q32 + 1
+    else:
+        return ratio // Q32
+
+
+def getTickAtSqrtRatio(sqrtPriceX96):
+    # greatest tick whose ratio is lower or equal, like TickMath.getTickAtSqrtRatio.
+    # the float estimate is off by one tick at most and corrected with the exact ratios
+    tick = math.floor(math.log((sqrtPriceX96 / Q96) ** 2, BASE))
+    tick = max(min(tick, MAX_TICK), MIN_TICK)
+    while tick < MAX_TICK and getSqrtRatioAtTick(tick + 1) <= sqrtPriceX96:
+        tick += 1
+    while tick > MIN_TICK and getSqrtRatioAtTick(tick) > sqrtPriceX96:
+        tick -= 1
+    return tick
+
+
+# integer versions of the v3-core libraries, matching the contracts to the wei
+# https://github.com/Uniswap/v3-core/blob/main/contracts/libraries/SqrtPriceMath.sol
+# https://github.com/Uniswap/v3-core/blob/main/contracts/libraries/SwapMath.sol
+def mulDiv(a, b, denominator):
+    return a * b // denominator
+
+
+def mulDivRoundingUp(a, b, denominator):
+    return -(-a * b // denominator)
+
+
+def divRoundingUp(a, b):
+    return -(-a // b)
+
+
+def amount0Delta(sqrtA, sqrtB, liquidity, roundUp):
+    if sqrtA > sqrtB:
+        sqrtA, sqrtB = sqrtB, sqrtA
+
+    numerator1 = liquidity << 96
+    numerator2 = sqrtB - sqrtA
+
+    if roundUp:
+        return divRoundingUp(mulDivRoundingUp(numerator1, numerator2, sqrtB), sqrtA)
+    return mulDiv(numerator1, numerator2, sqrtB) // sqrtA
+
+
+def amount1Delta(sqrtA, sqrtB, liquidity, roundUp):
+    if sqrtA > sqrtB:
+        sqrtA, sqrtB = sqrtB, sqrtA
+
+    if roundUp:
+        return mulDivRoundingUp(liquidity, sqrtB - sqrtA, Q96)
+    return mulDiv(liquidity, sqrtB - sqrtA, Q96)
+
+
+def amountsForLiquidity(tick, sqrtPX96, tickLower, tickUpper, liquidity):
+    # mirrors UniswapV3Pool._modifyPosition for a burn, amounts rounded down
+    sqrtA, sqrtB = getSqrtRatioAtTick(tickLower), getSqrtRatioAtTick(tickUpper)
+    if tick < tickLower:
+        return amount0Delta(sqrtA, sqrtB, liquidity, False), 0
+    if tick < tickUpper:
+        return (
+            amount0Delta(sqrtPX96, sqrtB, liquidity, False),
+            amount1Delta(sqrtA, sqrtPX96, liquidity, False),
+        )
+    return 0, amount1Delta(sqrtA, sqrtB, liquidity, False)
+
+
+def getNextSqrtPriceFromAmount0RoundingUp(sqrtPX96, liquidity, amount, add):
+    if amount == 0:
+        return sqrtPX96
+    numerator1 = liquidity << 96
+
+    product = amount * sqrtPX96
+    if add:
+        # the contract falls back to a less precise formula when the product overflows
+        if product <= MAXUINT256 and numerator1 + product <= MAXUINT256:
+            return mulDivRoundingUp(numerator1, sqrtPX96, numerator1 + product)
+        return divRoundingUp(numerator1, numerator1 // sqrtPX96 + amount)
+
+    assert product <= MAXUINT256 and numerator1 > product, "Error: Not enough liquidity"
+    return mulDivRoundingUp(numerator1, sqrtPX96, numerator1 - product)
+
+
+def getNextSqrtPriceFromAmount1RoundingDown(sqrtPX96, liquidity, amount, add):
+    if add:
+        return sqrtPX96 + mulDiv(amount, Q96, liquidity)
+
+    quotient = mulDivRoundingUp(amount, Q96, liquidity)
+    assert sqrtPX96 > quotient, "Error: Not enough liquidity"
+    return sqrtPX96 - quotient
+
+
+def getNextSqrtPriceFromInput(sqrtPX96, liquidity, amountIn, zeroForOne):
+    if zeroForOne:
+        return getNextSqrtPriceFromAmount0RoundingUp(
+            sqrtPX96, liquidity, amountIn, True
+        )
+    return getNextSqrtPriceFromAmount1RoundingDown(sqrtPX96, liquidity, amountIn, True)
+
+
+def getNextSqrtPriceFromOutput(sqrtPX96, liquidity, amountOut, zeroForOne):
+    if zeroForOne:
+        return getNextSqrtPriceFromAmount1RoundingDown(
+            sqrtPX96, liquidity, amountOut, False
+        )
+    return getNextSqrtPriceFromAmount0RoundingUp(sqrtPX96, liquidity, amountOut, False)
+
+
+def computeSwapStep(sqrtCurrent, sqrtTarget, liquidity, amountRemaining, feePips):
+    # amountRemaining is positive for exact input and negative for exact output swaps
+    zeroForOne = sqrtCurrent >= sqrtTarget
+    exactIn = amountRemaining >= 0
+    amountIn = amountOut = 0
+
+    if exactIn:
+        amountRemainingLessFee = mulDiv(amountRemaining, FEE_PIPS - feePips, FEE_PIPS)
+        amountIn = (
+            amount0Delta(sqrtTarget, sqrtCurrent, liquidity, True)
+            if zeroForOne
+            else amount1Delta(sqrtCurrent, sqrtTarget, liquidity, True)
+        )
+        if amountRemainingLessFee >= amountIn:
+            sqrtNext = sqrtTarget
+        else:
+            sqrtNext = getNextSqrtPriceFromInput(
+                sqrtCurrent, liquidity, amountRemainingLessFee, zeroForOne
+            )
+    else:
+        amountOut = (
+            amount1Delta(sqrtTarget, sqrtCurrent, liquidity, False)
+            if zeroForOne
+            else amount0Delta(sqrtCurrent, sqrtTarget, liquidity, False)
+        )
+        if -amountRemaining >= amountOut:
+            sqrtNext = sqrtTarget
+        else:
+            sqrtNext = getNextSqrtPriceFromOutput(
+                sqrtCurrent, liquidity, -amountRemaining, zeroForOne
+            )
+
+    reached = sqrtTarget == sqrtNext
+    if zeroForOne:
+        if not (reached and exactIn):
+            amountIn = amount0Delta(sqrtNext, sqrtCurrent, liquidity, True)
+        if not (reached and not exactIn):
+            amountOut = amount1Delta(sqrtNext, sqrtCurrent, liquidity, False)
+    else:
+        if not (reached and exactIn):
+            amountIn = amount1Delta(sqrtCurrent, sqrtNext, liquidity, True)
+        if not (reached and not exactIn):
+            amountOut = amount0Delta(sqrtCurrent, sqrtNext, liquidity, False)
+
+    if not exactIn and amountOut > -amountRemaining:
+        amountOut = -amountRemaining
+
+    if exactIn and sqrtNext != sqrtTarget:
+        feeAmount = amountRemaining - amountIn
     else:
-        return ratio / Q32
+        feeAmount = mulDivRoundingUp(amountIn, feePips, FEE_PIPS - feePips)
+
+    return sqrtNext, amountIn, amountOut, feeAmount
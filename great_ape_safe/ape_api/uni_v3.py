@@ -5,17 +5,26 @@ import math
 from pathlib import Path
 
 from brownie import interface, chain, multicall, web3, ZERO_ADDRESS
+from brownie._config import CONFIG
+from rich.pretty import pprint
 
 from helpers.addresses import registry
+from helpers.cache import cache_path, dump_json, load_json
 
 # general helpers and sdk
 from great_ape_safe.ape_api.helpers.uni_v3.uni_v3 import (
+    LABELS,
     print_position,
-    calc_all_accum_fees,
+    calc_accum_fees,
+    calc_fee_growth_inside,
 )
+from great_ape_safe.ape_api.helpers.uni_v3.simulator import PoolSimulator
+from great_ape_safe.ape_api.helpers.uni_v3.tick_index import TickIndex
 from great_ape_safe.ape_api.helpers.uni_v3.uni_v3_sdk import (
+    amountsForLiquidity,
     getAmountsForLiquidity,
     getSqrtRatioAtTick,
+    getTickAtSqrtRatio,
     getAmount1Delta,
     getAmount0Delta,
     maxLiquidityForAmounts,
@@ -45,29 +54,76 @@ class UniV3:
         self.Q128 = 2 ** 128
         self.deadline = 60 * 180
         self.slippage = 0.98
+        self.fee_tiers = [100, 500, 3000, 10000]
+        self.simulators_cache_size = 32
+
+        # pool addresses of `_pool_addresses`, loaded from disk on first use
+        self._pools = None
+        # pool copies of `simulator`, per (pool, block hash)
+        self._simulators = {}
+        self._tick_indexes = {}
 
     def _get_pool(self, position):
         return interface.IUniswapV3Pool(
-            self.factory.getPool(
-                position["token0"], position["token1"], position["fee"]
-            ),
+            self._pool_addresses(
+                [(position["token0"], position["token1"], position["fee"])]
+            )[0],
             owner=self.safe.account,
         )
 
-    def _build_multihop_path(self, path):
+    def _pool_addresses(self, pools, refresh=False):
+        # pool addresses never change, so they are read once per (token0, token1, fee)
+        # (in a single multicall) and kept on disk across runs. pools which don't exist
+        # yet are read again on every call, `refresh` reads the requested ones again.
+        # pools created on development and fork networks are kept in memory only,
+        # forks share their chain id with the network they fork
+        path = cache_path("univ3_pools", f"{chain.id}.json")
+        if self._pools is None:
+            self._pools = load_json(path, default={})
+        keys = [
+            "-".join(sorted([str(a), str(b)], key=str.lower) + [str(int(fee))])
+            for a, b, fee in pools
+        ]
+        missing = sorted({key for key in keys if refresh or key not in self._pools})
+        if missing:
+            with multicall(block_identifier="latest"):
+                fetched = [
+                    self.factory.getPool(*key.split("-")[:2], int(key.split("-")[2]))
+                    for key in missing
+                ]
+            found = {
+                key: str(addr)
+                for key, addr in zip(missing, fetched)
+                if str(addr) != ZERO_ADDRESS
+            }
+            if found:
+                self._pools.update(found)
+                if CONFIG.network_type == "live":
+                    dump_json(path, {**load_json(path, default={}), **found})
+        return [self._pools.get(key, ZERO_ADDRESS) for key in keys]
+
+    def _build_multihop_path(self, path, refresh=False):
         # given a token path, construct a multihop swap path by adding token pair pools with highest liquidity
         # https://docs.uniswap.org/protocol/guides/swaps/multihop-swaps#input-parameters
-        multihop = [path[0].address]
-        for i in range(len(path) - 1):
-            fee_tiers = {100: 0, 500: 0, 3000: 0, 10000: 0}
-            for tier in fee_tiers.keys():
-                pool_addr = self.factory.getPool(path[i], path[i + 1], tier)
-
-                if pool_addr == ZERO_ADDRESS:
-                    continue
+        hops = [(path[i].address, path[i + 1].address) for i in range(len(path) - 1)]
+        pools = self._pool_addresses(
+            [(a, b, tier) for a, b in hops for tier in self.fee_tiers], refresh
+        )
+        # liquidity of every tier of every hop in one round trip
+        with multicall(block_identifier="latest"):
+            liquidity = {
+                addr: interface.IUniswapV3Pool(addr).liquidity()
+                for addr in set(pools)
+                if addr != ZERO_ADDRESS
+            }
 
-                pool = interface.IUniswapV3Pool(pool_addr)
-                fee_tiers[tier] = pool.liquidity()
+        multihop = [path[0].address]
+        for i in range(len(hops)):
+            tier_pools = pools[i * len(self.fee_tiers) : (i + 1) * len(self.fee_tiers)]
+            fee_tiers = {
+                tier: int(liquidity.get(addr) or 0)
+                for tier, addr in zip(self.fee_tiers, tier_pools)
+            }
 
             if list(fee_tiers.values()).count(0) == len(fee_tiers):
                 raise Exception(
@@ -80,6 +136,92 @@ class UniV3:
 
         return multihop
 
+    def simulator(self, pool, block=None):
+        """
+        Local copy of the pool state to quote swaps without rpc calls, see `PoolSimulator`.
+        Copies are kept per block hash, so repeated quotes in a block read the pool once
+        and a reverted fork mining the same block number again isn't served stale state
+        """
+        block = block or web3.eth.block_number
+        key = (str(pool), web3.eth.get_block(block).hash.hex())
+        if key not in self._simulators:
+            self._simulators[key] = PoolSimulator.from_pool(
+                interface.IUniswapV3Pool(pool, owner=self.safe.account), block
+            )
+            # oldest copies go first
+            while len(self._simulators) > self.simulators_cache_size:
+                del self._simulators[next(iter(self._simulators))]
+        return self._simulators[key]
+
+    def tick_index(self, pool, block=None):
+        """
+        Every initialized tick of `pool`, see `TickIndex`. The index is loaded once per
+        pool, later calls only refresh it from the pool logs up to `block`. A `block`
+        older than the last one read reloads the index at that block
+        """
+        if str(pool) not in self._tick_indexes:
+            self._tick_indexes[str(pool)] = TickIndex(
+                interface.IUniswapV3Pool(pool, owner=self.safe.account)
+            )
+        index = self._tick_indexes[str(pool)]
+        index.sync(block)
+        return index
+
+    def amount_to_tick(self, pool, target_tick, block=None):
+        """
+        Exact input needed to move the price of `pool` to `target_tick`, solved range by
+        range over its initialized ticks, and the output it gives. The pool ends at
+        `target_tick`, or right below it when crossing an initialized tick downwards.
+        Targets beyond the bitmap words read by `simulator` are solved over `tick_index`
+        """
+        try:
+            sim = self.simulator(pool, block)
+            solution = sim.to_tick(target_tick, trace=True)
+        except ValueError:
+            sim = self.tick_index(pool, block).simulator()
+            solution = sim.to_tick(target_tick, trace=True)
+        if solution["token_in"] is None:
+            return {**solution, "token_out": None, "fee": 0, "ranges": []}
+
+        steps = solution["swap"]["steps"]
+        token_out = sim.token1 if solution["token_in"] == sim.token0 else sim.token0
+        return {
+            "token_in": solution["token_in"],
+            "token_out": token_out,
+            "amount_in": solution["amount_in"],
+            "amount_out": solution["amount_out"],
+            "fee": sum(step["fee"] for step in steps),
+            "tick_after": solution["swap"]["tick"],
+            "ranges": [
+                {
+                    "tick_start": getTickAtSqrtRatio(step["sqrt_price_start"]),
+                    "tick_end": getTickAtSqrtRatio(step["sqrt_price_end"]),
+                    "liquidity": step["liquidity"],
+                    "amount_in": step["amount_in"] + step["fee"],
+                    "amount_out": step["amount_out"],
+                }
+                for step in steps
+            ],
+        }
+
+    def _quote_exact_input(self, multihop_path, mantissa_in):
+        # walks each hop on a local copy of its pool, the quoter is only used
+        # if a swap goes further than the ticks read by the simulator
+        hops = [
+            (multihop_path[i], multihop_path[i + 2], multihop_path[i + 1])
+            for i in range(0, len(multihop_path) - 1, 2)
+        ]
+        pools = self._pool_addresses(hops)
+        amount = int(mantissa_in)
+        try:
+            for (token_in, _, _), pool in zip(hops, pools):
+                amount = self.simulator(pool).amount_out(token_in, amount)
+        except ValueError:
+            return self.quoter.quoteExactInput.call(
+                self._encode_path(multihop_path), mantissa_in
+            )
+        return amount
+
     def _encode_path(self, multihop_path):
         path_encoded = b""
         for item in multihop_path:
@@ -221,15 +363,9 @@ class UniV3:
         loop over all token ids owned by the safe
         to allow us to claim the fees earned on each range over time
         """
-        nfts_owned = self.nonfungible_position_manager.balanceOf(self.safe) - 1
-
-        if nfts_owned >= 0:
-            with multicall:
-                token_ids = [
-                    self.nonfungible_position_manager.tokenOfOwnerByIndex(self.safe, i)
-                    for i in range(nfts_owned)
-                ]
+        token_ids = self._token_ids()
 
+        if token_ids:
             for token_id in token_ids:
                 self.collect_fee(token_id)
         else:
@@ -409,34 +545,111 @@ class UniV3:
 
         return token_id
 
-    def positions_info(self):
-        nfts_owned = self.nonfungible_position_manager.balanceOf(self.safe) - 1
-
-        if nfts_owned >= 0:
-            with multicall:
-                token_ids = [
-                    self.nonfungible_position_manager.tokenOfOwnerByIndex(self.safe, i)
-                    for i in range(nfts_owned)
-                ]
-
-            for token_id in token_ids:
-                print("owner:", self.nonfungible_position_manager.ownerOf(token_id))
-                print_position(self.nonfungible_position_manager, token_id)
+    def _token_ids(self, owner=None, block=None):
+        owner = owner or self.safe.address
+        block = block or web3.eth.block_number
+        nfp = self.nonfungible_position_manager
+        nfts_owned = nfp.balanceOf(owner, block_identifier=block)
+        with multicall(block_identifier=block):
+            token_ids = [nfp.tokenOfOwnerByIndex(owner, i) for i in range(nfts_owned)]
+        return [int(token_id) for token_id in token_ids]
 
-                position = self.nonfungible_position_manager.positions(token_id)
-
-                pool = self._get_pool(position)
+    def positions(self, owner=None, block=None):
+        """
+        Every position owned by `owner` (the safe by default), read in three multicalls:
+        the token ids, their `positions`, then the state of their pools, ticks and
+        tokens. Uncollected fees and the underlying amounts are computed locally
+        """
+        block = block or web3.eth.block_number
+        nfp = self.nonfungible_position_manager
+        token_ids = self._token_ids(owner, block)
+        with multicall(block_identifier=block):
+            positions = [nfp.positions(token_id) for token_id in token_ids]
+        positions = [dict(zip(LABELS["positions"], p)) for p in positions]
+        if not positions:
+            return []
+
+        pools = self._pool_addresses(
+            [(p["token0"], p["token1"], p["fee"]) for p in positions]
+        )
+        pool_contracts = {addr: interface.IUniswapV3Pool(addr) for addr in set(pools)}
+        tokens = {p[key] for p in positions for key in ["token0", "token1"]}
+        with multicall(block_identifier=block):
+            slot0 = {addr: pool.slot0() for addr, pool in pool_contracts.items()}
+            growth = {
+                addr: (pool.feeGrowthGlobal0X128(), pool.feeGrowthGlobal1X128())
+                for addr, pool in pool_contracts.items()
+            }
+            ticks = {
+                (addr, t): pool_contracts[addr].ticks(t)
+                for addr, p in zip(pools, positions)
+                for t in [p["tickLower"], p["tickUpper"]]
+            }
+            token_info = {
+                token: (
+                    interface.IERC20(token).symbol(),
+                    interface.IERC20(token).decimals(),
+                )
+                for token in tokens
+            }
 
-                fees = calc_all_accum_fees(
-                    self.nonfungible_position_manager, pool, token_id
+        records = []
+        for token_id, position, addr in zip(token_ids, positions, pools):
+            sqrt_price_x96, tick = int(slot0[addr][0]), int(slot0[addr][1])
+            lower, upper = position["tickLower"], position["tickUpper"]
+            liquidity = int(position["liquidity"])
+            amount0, amount1 = amountsForLiquidity(
+                tick, sqrt_price_x96, lower, upper, liquidity
+            )
+            fees = []
+            for i in range(2):
+                inside = calc_fee_growth_inside(
+                    tick,
+                    lower,
+                    upper,
+                    int(growth[addr][i]),
+                    int(ticks[(addr, lower)][2 + i]),
+                    int(ticks[(addr, upper)][2 + i]),
                 )
+                last = int(position[f"feeGrowthInside{i}LastX128"])
+                owed = int(position[f"tokensOwed{i}"])
+                fees.append(owed + calc_accum_fees(inside, last, liquidity))
+
+            symbol0, decimals0 = token_info[position["token0"]]
+            symbol1, decimals1 = token_info[position["token1"]]
+            records.append(
+                {
+                    "token_id": token_id,
+                    "pool": addr,
+                    "token0": str(position["token0"]),
+                    "token1": str(position["token1"]),
+                    "symbol0": symbol0,
+                    "symbol1": symbol1,
+                    "decimals0": int(decimals0),
+                    "decimals1": int(decimals1),
+                    "fee": int(position["fee"]),
+                    "tick_lower": lower,
+                    "tick_upper": upper,
+                    "tick": tick,
+                    "in_range": lower <= tick < upper,
+                    "liquidity": liquidity,
+                    "amount0": amount0,
+                    "amount1": amount1,
+                    "fees0": fees[0],
+                    "fees1": fees[1],
+                }
+            )
+        return records
 
-                token0 = self.safe.contract(position["token0"])
-                token1 = self.safe.contract(position["token1"])
+    def positions_info(self):
+        records = self.positions()
 
+        if records:
+            for record in records:
+                pprint(record)
                 print("accumulated fees:")
-                print(fees[0] / 10 ** token0.decimals(), token0.symbol())
-                print(fees[1] / 10 ** token1.decimals(), token1.symbol())
+                print(record["fees0"] / 10 ** record["decimals0"], record["symbol0"])
+                print(record["fees1"] / 10 ** record["decimals1"], record["symbol1"])
         else:
             print(f" === Safe ({self.safe.address}) does not own any NFT === ")
 
@@ -464,9 +677,7 @@ class UniV3:
         multihop_path = self._build_multihop_path(path)
         path_encoded = self._encode_path(multihop_path)
 
-        min_out = self.quoter.quoteExactInput.call(path_encoded, mantissa) * (
-            self.slippage
-        )
+        min_out = self._quote_exact_input(multihop_path, mantissa) * (self.slippage)
 
         params = (
             path_encoded,
@@ -488,11 +699,6 @@ class UniV3:
         if not multihop_path:
             multihop_path = self._build_multihop_path(path)
 
-        path_encoded = self._encode_path(multihop_path)
-
-        out = self.quoter.quoteExactInput.call(
-            path_encoded,
-            mantissa_in,
-        )
+        out = self._quote_exact_input(multihop_path, mantissa_in)
 
         return int(out * 10_000 // (10_000 + ((1 - self.slippage) * 1000)))
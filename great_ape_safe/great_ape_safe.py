@@ -9,20 +9,22 @@ from decimal import Decimal
 from io import StringIO
 
 import pandas as pd
-from ape_safe import ApeSafe
-from brownie import Contract, ETH_ADDRESS, chain, interface, network, web3
+from ape_safe import ApeSafe, ApiError
+from brownie import ETH_ADDRESS, chain, interface, multicall, network
 from brownie.exceptions import VirtualMachineError
 from eth_account import Account
 from eth_account.messages import encode_defunct
-from eth_utils import is_address, to_checksum_address
+from eth_utils import to_checksum_address
 from gnosis.safe.signatures import signature_split
 from rich.console import Console
-from tqdm import tqdm
+from rich.table import Table
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 
 from great_ape_safe.ape_api import ApeApis
+from helpers.cache import cache_path, dump_json, load_json
 from helpers.chaindata import labels
+from helpers.contracts import get_contract
 
 
 C = Console()
@@ -40,32 +42,80 @@ class GreatApeSafe(ApeSafe, ApeApis):
       versions before and after v1.3.0) and post tx to gnosis api
     """
 
-    def __init__(self, address, base_url=None, multisend=None):
-        super().__init__(address, base_url, multisend)
+    def __init__(self, address, base_url=None, multisend=None, client=None):
+        super().__init__(address, base_url, multisend, client)
+
+    def _token_metadata(self, addresses):
+        # symbol and decimals never change, so they are read once per token
+        # (in a single multicall) and kept on disk across runs
+        path = cache_path("token_metadata", f"{chain.id}.json")
+        metadata = load_json(path, default={})
+        missing = [address for address in addresses if address not in metadata]
+        if missing:
+            with multicall(block_identifier="latest"):
+                calls = [
+                    (
+                        interface.IERC20(address).symbol(),
+                        interface.IERC20(address).decimals(),
+                    )
+                    for address in missing
+                ]
+            for address, (symbol, decimals) in zip(missing, calls):
+                if symbol is None or decimals is None:
+                    # reverted within the multicall (e.g. bytes32 symbol), retry on
+                    # its own so only a token that really can't be read is skipped
+                    try:
+                        token = interface.IERC20(address)
+                        symbol, decimals = token.symbol(), token.decimals()
+                    except Exception as e:
+                        print(address, e)
+                        continue
+                metadata[address] = (str(symbol), int(decimals))
+            dump_json(path, metadata)
+        return {
+            address: metadata[address] for address in addresses if address in metadata
+        }
 
-    def take_snapshot(self, tokens):
-        C.print(f"snapshotting {self.address}...")
-        df = {"address": [], "symbol": [], "mantissa_before": [], "decimals": []}
-        df["address"].append(ETH_ADDRESS)
-        df["symbol"].append(labels[network.chain.id])
-        df["mantissa_before"].append(Decimal(self.account.balance()))
-        df["decimals"].append(Decimal(18))
-        for token in tqdm(tokens):
-            try:
-                token = Contract(token) if type(token) != Contract else token
-            except:
-                token = (
-                    Contract.from_explorer(token) if type(token) != Contract else token
-                )
-            if token.address not in df["address"]:
+    def _balances(self, addresses):
+        # erc20 balances of the safe in one aggregated call, plus the native balance.
+        # tokens whose balance can't be read at all are returned as None
+        tokens = [address for address in addresses if address != ETH_ADDRESS]
+        with multicall(block_identifier="latest"):
+            calls = [
+                interface.IERC20(token).balanceOf(self.address) for token in tokens
+            ]
+        balances = {}
+        for token, balance in zip(tokens, calls):
+            if balance is None:
+                # reverted within the multicall, retry on its own
                 try:
-                    df["address"].append(token.address)
-                    df["symbol"].append(token.symbol())
-                    df["mantissa_before"].append(Decimal(token.balanceOf(self.address)))
-                    df["decimals"].append(Decimal(token.decimals()))
+                    balance = interface.IERC20(token).balanceOf(self.address)
                 except Exception as e:
                     print(token, e)
-        self.snapshot = pd.DataFrame(df)
+            balances[token] = None if balance is None else int(balance)
+        balances[ETH_ADDRESS] = int(self.account.balance())
+        return [balances[address] for address in addresses]
+
+    def take_snapshot(self, tokens):
+        C.print(f"snapshotting {self.address}...")
+        addresses = []
+        for token in tokens:
+            address = to_checksum_address(str(getattr(token, "address", token)))
+            if address not in addresses:
+                addresses.append(address)
+        metadata = self._token_metadata(addresses)
+        addresses = [ETH_ADDRESS] + [a for a in addresses if a in metadata]
+        df = pd.DataFrame(
+            {
+                "address": addresses,
+                "symbol": [labels[network.chain.id]]
+                + [metadata[a][0] for a in addresses[1:]],
+                "decimals": [18] + [metadata[a][1] for a in addresses[1:]],
+            }
+        )
+        # mantissas are kept as python ints (object dtype), they overflow int64
+        df["mantissa_before"] = pd.Series(self._balances(addresses), dtype=object)
+        self.snapshot = df[df["mantissa_before"].notna()].reset_index(drop=True)
 
     def print_snapshot(self, csv_destination=None):
         if not isinstance(self.snapshot, pd.DataFrame):
@@ -73,26 +123,18 @@ class GreatApeSafe(ApeSafe, ApeApis):
         if self.snapshot is None:
             raise
         df = self.snapshot.set_index("address")
-        for token in df.index.to_list():
-            if token == ETH_ADDRESS:
-                df.at[token, "mantissa_after"] = Decimal(self.account.balance())
-            else:
-                try:
-                    token = Contract(token) if type(token) != Contract else token
-                except:
-                    token = (
-                        Contract.from_explorer(token)
-                        if type(token) != Contract
-                        else token
-                    )
-                df.at[token.address, "mantissa_after"] = Decimal(token.balanceOf(self))
+        df["mantissa_after"] = pd.Series(
+            self._balances(df.index.to_list()), index=df.index, dtype=object
+        )
+        df = df[df["mantissa_after"].notna()]
 
         # calc deltas
-        df["balance_before"] = df["mantissa_before"] / 10 ** df["decimals"]
-        df["balance_after"] = df["mantissa_after"] / 10 ** df["decimals"]
-        df["balance_delta"] = (df["mantissa_after"] - df["mantissa_before"]) / 10 ** df[
-            "decimals"
-        ]
+        scale = df["decimals"].map(lambda decimals: Decimal(10) ** int(decimals))
+        df["balance_before"] = df["mantissa_before"].map(Decimal) / scale
+        df["balance_after"] = df["mantissa_after"].map(Decimal) / scale
+        df["balance_delta"] = (df["mantissa_after"] - df["mantissa_before"]).map(
+            Decimal
+        ) / scale
 
         # narrow down to columns of interest
         df = df.set_index("symbol")[
@@ -121,19 +163,38 @@ class GreatApeSafe(ApeSafe, ApeApis):
             "\n",
         )
 
-    def _set_safe_tx_gas(self, safe_tx, events, call_trace, reset, log_name, gas_coef):
+    def _preview(self, safe_tx, events, call_trace, reset, preview_engine):
+        # "fork": mines approveHash + execTransaction on the fork (state persists)
+        # "override": single debug_traceCall with state overrides (state untouched)
+        if preview_engine == "override":
+            return self.preview_with_overrides(safe_tx, events, call_trace)
+        assert (
+            preview_engine == "fork"
+        ), f"Error: unknown preview engine {preview_engine}"
+        return self.preview(safe_tx, events, call_trace, reset)
+
+    def _set_safe_tx_gas(
+        self,
+        safe_tx,
+        events,
+        call_trace,
+        reset,
+        log_name,
+        gas_coef,
+        preview_engine="fork",
+    ):
         versions = safe_tx._safe_version.split(".")
         # safe_tx_gas is a hack for getting correct gas estimation in end user wallet's ui
         # but it is only needed on older versions of gnosis safes (<1.3.0)
         if int(versions[0]) <= 1 and int(versions[1]) < 3:
-            receipt = self.preview(safe_tx, events, call_trace, reset)
+            receipt = self._preview(safe_tx, events, call_trace, reset, preview_engine)
             gas_used = receipt.gas_used
             safe_tx_gas = max(gas_used * 64 // 63, gas_used + 2500) + 500
             safe_tx.safe_tx_gas = 35_000 + int(gas_coef * safe_tx_gas)
             # as we are modifying the tx, previous signatures are not valid anymore
             safe_tx.signatures = b""
         else:
-            receipt = self.preview(safe_tx, events, call_trace, reset)
+            receipt = self._preview(safe_tx, events, call_trace, reset, preview_engine)
             safe_tx.safe_tx_gas = 0
         if log_name:
             self._dump_log(safe_tx, receipt, log_name)
@@ -174,19 +235,24 @@ class GreatApeSafe(ApeSafe, ApeApis):
         safe_tx=None,
         tenderly=True,
         debank=False,
+        preview_engine="fork",
     ):
         # build a gnosis-py SafeTx object which can then be posted
         # skip_preview=True: skip preview **and with that also setting the gas**
         # events, call_trace and reset are params passed to .preview
         # silent=True: prevent printing of safe_tx attributes at end of run
         # post=True: make the actual live posting of the tx to the gnosis api
+        # preview_engine="override": preview through a state overridden debug_traceCall
+        # instead of mining on the fork; faster, but the fork state (and thus the
+        # snapshot's balances) is not updated by the tx. needs a geth, anvil or
+        # erigon node, ganache-cli does not implement debug_traceCall
         if not safe_tx and replace_nonce:
             safe_tx = self.multisend_from_receipts(safe_nonce=replace_nonce)
         elif not safe_tx:
             safe_tx = self.multisend_from_receipts()
         if not skip_preview:
             safe_tx, receipt = self._set_safe_tx_gas(
-                safe_tx, events, call_trace, reset, log_name, gas_coef
+                safe_tx, events, call_trace, reset, log_name, gas_coef, preview_engine
             )
         if debank:
             self._debank_pre_execution(receipt, safe_tx.safe_tx_gas)
@@ -202,13 +268,58 @@ class GreatApeSafe(ApeSafe, ApeApis):
             self.post_transaction(safe_tx)
         return safe_tx
 
+    def preview_queue(self, isolated=True, workers=0, fork_block=None):
+        # simulates the whole pending queue from one fork snapshot and prints
+        # per tx status, gas and balance deltas, both applied in nonce order
+        # ("queue") and each on its own against the same snapshot ("isolated").
+        # with `workers` the isolated previews fork upstream at `fork_block`,
+        # so they are only run on a fork without local transactions
+        results = self.simulate_pending(isolated, workers, fork_block)
+        modes = [mode for mode in ["queue", "isolated"] if mode in results]
+
+        token_info = {}
+
+        def format_deltas(result):
+            deltas = []
+            if result["eth_delta"]:
+                deltas.append(f"{result['eth_delta'] / 1e18:,.6f} ETH")
+            for token, delta in result["token_deltas"].items():
+                if token not in token_info:
+                    erc20 = interface.IERC20(token)
+                    token_info[token] = (erc20.symbol(), erc20.decimals())
+                symbol, decimals = token_info[token]
+                deltas.append(f"{delta / 10 ** decimals:,.6f} {symbol}")
+            return "\n".join(deltas) or "-"
+
+        table = Table(title=f"Pending queue simulation for {self.address}")
+        table.add_column("Nonce", justify="right")
+        table.add_column("SafeTx hash")
+        for mode in modes:
+            table.add_column(f"{mode} status")
+            table.add_column(f"{mode} gas", justify="right")
+            table.add_column(f"{mode} deltas", justify="right")
+
+        for rows in zip(*[results[mode] for mode in modes]):
+            cells = [str(rows[0]["nonce"]), rows[0]["safe_tx_hash"][:10]]
+            for result in rows:
+                status = (
+                    "[green]success[/green]"
+                    if result["success"]
+                    else f"[red]failed[/red] {result['error']}"
+                )
+                gas = f"{result['gas_used']:,}" if result["gas_used"] else "-"
+                cells += [status, gas, format_deltas(result)]
+            table.add_row(*cells)
+
+        C.print(table)
+        return results
+
     def _get_safe_tx_by_nonce(self, safe_nonce):
-        # retrieve SafeTx obj from pending transactions based on nonce
-        pending = self.pending_transactions
-        for safe_tx in pending:
-            if safe_tx.safe_nonce == safe_nonce:
-                return safe_tx
-        raise  # didnt find safe_tx with corresponding nonce
+        # retrieve SafeTx obj from the pending transactions cache based on nonce
+        safe_tx = self.pending_transaction_by_nonce(safe_nonce)
+        if safe_tx is None:
+            raise ApiError(f"No pending transaction found with nonce {safe_nonce}")
+        return safe_tx
 
     def sign_with_frame_hardware_wallet(self, safe_tx_nonce=None):
         # allows signing a SafeTx object with hardware wallet
@@ -235,16 +346,13 @@ class GreatApeSafe(ApeSafe, ApeApis):
         Add the possibilty to instantiate a contract from a given interface or
         from the explorer. Else revert to ApeSafe's default behaviour.
         """
-        if address:
-            address = (
-                to_checksum_address(address)
-                if is_address(address)
-                else web3.ens.resolve(address)
+        if address and (Interface or from_explorer):
+            return get_contract(
+                address,
+                Interface=Interface,
+                owner=self.account,
+                from_explorer=from_explorer,
             )
-            if Interface:
-                return Interface(address, owner=self.account)
-            if from_explorer:
-                return Contract.from_explorer(address, owner=self.account)
         return super().contract(address)
 
     def post_safe_tx_manually(self):
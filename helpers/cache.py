@@ -0,0 +1,26 @@
+import json
+import os
+
+# on-disk caches live next to `logs/`, relative to the repo root scripts run from
+CACHE_DIR = os.getenv("CACHE_DIR", "cache/")
+
+
+def cache_path(*parts):
+    return os.path.join(CACHE_DIR, *[str(part) for part in parts])
+
+
+def load_json(path, default=None):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def dump_json(path, obj):
+    # write to a temp file first so an interrupted run never leaves a half written cache
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
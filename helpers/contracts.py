@@ -0,0 +1,110 @@
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from brownie import Contract, chain, network, web3
+from brownie._config import CONFIG
+from eth_utils import is_address, to_checksum_address
+
+from helpers.cache import cache_path, dump_json, load_json
+
+# refetch stored abis after a week, even if the implementation did not change
+ABI_TTL = int(os.getenv("ABI_CACHE_TTL", 7 * 24 * 60 * 60))
+CONTRACT_CACHE_SIZE = 256
+
+# https://eips.ethereum.org/EIPS/eip-1967 and https://eips.ethereum.org/EIPS/eip-1822
+EIP1967_IMPLEMENTATION_SLOT = (
+    int(web3.keccak(text="eip1967.proxy.implementation").hex(), 16) - 1
+)
+EIP1822_IMPLEMENTATION_SLOT = web3.keccak(text="PROXIABLE")
+
+_contracts = OrderedDict()
+
+
+@lru_cache(maxsize=None)
+def _resolve_ens(name, network_id):
+    return web3.ens.resolve(name)
+
+
+# Takes an address or an ens name and returns a checksummed address
+def resolve_address(address):
+    if is_address(address):
+        return to_checksum_address(address)
+    return _resolve_ens(address, network.show_active())
+
+
+# Returns the implementation behind an eip1967/eip1822 proxy, or None
+def implementation_of(address):
+    for slot in [EIP1967_IMPLEMENTATION_SLOT, EIP1822_IMPLEMENTATION_SLOT]:
+        value = web3.eth.get_storage_at(address, slot)
+        if int(value.hex(), 16):
+            return to_checksum_address(value[-20:])
+    return None
+
+
+def _abi_path(address, implementation):
+    return cache_path("abis", chain.id, f"{address}_{implementation or 'self'}.json")
+
+
+def _load_abi(address, implementation):
+    entry = load_json(_abi_path(address, implementation))
+    if entry and time.time() - entry["timestamp"] < ABI_TTL:
+        return entry
+    return None
+
+
+def _store_abi(address, implementation, contract):
+    # forks share the chain id of the network they fork, only live abis are stored
+    if CONFIG.network_type != "live":
+        return
+    dump_json(
+        _abi_path(address, implementation),
+        {"name": contract._name, "abi": contract.abi, "timestamp": time.time()},
+    )
+
+
+def get_contract(address, Interface=None, owner=None, from_explorer=False):
+    """
+    @dev returns a (memoized) contract object for `address`.
+         interface bound contracts are only memoized, abi based ones are
+         backed by an on-disk abi store keyed by address and current proxy
+         implementation, so an upgrade or an expired entry triggers a refetch.
+         the store is only written on live networks, memoized objects are kept
+         per network
+    @param Interface brownie interface to bind the address to, optional
+    @param owner account set as default sender on the contract, optional
+    @param from_explorer fetch the abi from the explorer on a cache miss
+           instead of relying on brownie's local deployments
+    """
+    address = resolve_address(address)
+    key = (
+        network.show_active(),
+        address,
+        Interface._name if Interface else None,
+        owner.address if owner else None,
+    )
+    if key in _contracts:
+        _contracts.move_to_end(key)
+        return _contracts[key]
+
+    if Interface:
+        contract = Interface(address, owner=owner)
+    else:
+        implementation = implementation_of(address)
+        entry = _load_abi(address, implementation)
+        if entry:
+            contract = Contract.from_abi(
+                entry["name"], address, entry["abi"], owner=owner
+            )
+        else:
+            if from_explorer:
+                contract = Contract.from_explorer(address, owner=owner)
+            else:
+                contract = Contract(address, owner=owner)
+            _store_abi(address, implementation, contract)
+
+    _contracts[key] = contract
+    if len(_contracts) > CONTRACT_CACHE_SIZE:
+        _contracts.popitem(last=False)
+    return contract
@@ -1,4 +1,6 @@
 from brownie import web3
+from eth_abi import encode_abi
+from hexbytes import HexBytes
 
 # Takes a string with a function signature and returns a 4 bytes hex string
 def encode_signature(signature: str) -> str:
@@ -28,3 +30,38 @@ def str_to_bool(s):
 # Takes a decimal number and returns a 32 bytes hex string
 def dec_to_hex(dec: int) -> str:
     return "0x" + hex(dec)[2:].zfill(64)
+
+
+def _address(target):
+    # accepts both contract instances and plain addresses
+    return str(getattr(target, "address", target))
+
+
+# Mirrors TimelockController.hashOperation, returns the operation id as a 32 bytes hex string
+def hash_operation(target, value, data, predecessor, salt) -> str:
+    encoded = encode_abi(
+        ["address", "uint256", "bytes", "bytes32", "bytes32"],
+        [
+            _address(target),
+            value,
+            HexBytes(data),
+            HexBytes(predecessor),
+            HexBytes(salt),
+        ],
+    )
+    return web3.keccak(encoded).hex()
+
+
+# Mirrors TimelockController.hashOperationBatch, returns the operation id as a 32 bytes hex string
+def hash_operation_batch(targets, values, payloads, predecessor, salt) -> str:
+    encoded = encode_abi(
+        ["address[]", "uint256[]", "bytes[]", "bytes32", "bytes32"],
+        [
+            [_address(target) for target in targets],
+            values,
+            [HexBytes(payload) for payload in payloads],
+            HexBytes(predecessor),
+            HexBytes(salt),
+        ],
+    )
+    return web3.keccak(encoded).hex()
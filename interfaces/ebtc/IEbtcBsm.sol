@@ -2,6 +2,16 @@
 pragma solidity ^0.8.17;
 
 interface IEbtcBsm {
+    function ASSET_TOKEN() external view returns (address);
+    function EBTC_TOKEN() external view returns (address);
+    function escrow() external view returns (address);
+    function oraclePriceConstraint() external view returns (address);
+    function rateLimitingConstraint() external view returns (address);
+    function buyAssetConstraint() external view returns (address);
+    function feeToSellBPS() external view returns (uint256);
+    function feeToBuyBPS() external view returns (uint256);
+    function totalMinted() external view returns (uint256);
+    function paused() external view returns (bool);
     function updateEscrow(address _newEscrow) external;
     function setOraclePriceConstraint(address _newOraclePriceConstraint) external;
     function setRateLimitingConstraint(address _newRateLimitingConstraint) external;
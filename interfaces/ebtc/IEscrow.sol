@@ -2,6 +2,10 @@
 pragma solidity ^0.8.17;
 
 interface IEscrow {
+    function EXTERNAL_VAULT() external view returns (address);
+    function totalAssetsDeposited() external view returns (uint256);
+    function totalBalance() external view returns (uint256);
+    function feeProfit() external view returns (uint256);
     function claimProfit() external;
     function claimTokens(address token, uint256 amount) external;
 }
@@ -2,6 +2,9 @@
 pragma solidity ^0.8.17;
 
 interface IOraclePriceConstraint {
+    function ASSET_FEED() external view returns (address);
+    function minPriceBPS() external view returns (uint256);
+    function oracleFreshnessSeconds() external view returns (uint256);
     function setMinPrice(uint256 _minPriceBPS) external;
     function setOracleFreshness(uint256 _oracleFreshnessSeconds) external;
 }
@@ -8,5 +8,7 @@ interface IRateLimitingConstraint {
         bool useAbsoluteCap;     // Flag to determine if absolute cap is used
     }
 
+    function ACTIVE_POOL() external view returns (address);
+    function getMintingConfig(address _minter) external view returns (MintingConfig memory);
     function setMintingConfig(address _minter, MintingConfig calldata _newMintingConfig) external;
 }
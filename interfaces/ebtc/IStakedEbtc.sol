@@ -14,6 +14,10 @@ interface IStakedEbtc {
     function donate(uint256 amount) external;
     function syncRewardsAndDistribution() external;
     function rewardsCycleData() external view returns (RewardsCycleData memory);
+    function totalAssets() external view returns (uint256);
+    function totalSupply() external view returns (uint256);
+    function mintingFee() external view returns (uint256);
+    function maxDistributionPerSecondPerAsset() external view returns (uint256);
     function storedTotalAssets() external view returns (uint256);
     function totalBalance() external view returns (uint256);
     function setMintingFee(uint256 _mintingFee) external;
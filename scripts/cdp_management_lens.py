@@ -1,73 +1,101 @@
+import json
+import os
+import time
+
+import pandas as pd
+from brownie import network
 from great_ape_safe import GreatApeSafe
-from helpers.addresses import r
+from great_ape_safe.ape_api.helpers.ebtc.portfolio import read_cdp_portfolio
+from helpers.addresses import r, reverse
 from rich.console import Console
 from rich.table import Table
 
 C = Console()
 
 """
-The following methods are meant to provide insight of cdp's owned by specific msig:
-    - cdp id
+The following methods are meant to provide insight of cdp's owned by specific msigs:
+    - cdp id and owner
     - collateral and debt amounts
-    - ICR and TCR
-    - % of total collateral of the cdp's and system
-    - $ of total debt of the cdp's and system
+    - ICR, NICR and TCR
+    - % of total collateral and debt of the cdp's owned and of the system
     - cdp list ordered by ICR
+
+All the cdps of all the owners are read in a fixed number of round trips, see `read_cdp_portfolio`.
 """
 
+DEFAULT_OWNERS = [
+    r.badger_wallets.treasury_vault_multisig,
+    r.ebtc_wallets.techops_multisig,
+    r.ebtc_wallets.fee_recipient_multisig,
+]
 
-def main(msig_address=r.badger_wallets.treasury_vault_multisig):
-    # table generation
-    table = Table(title=f"CDPs owned by {msig_address} ordered by ICR")
 
-    table.add_column("Cdp ID", justify="right")
-    table.add_column("Collateral", justify="right")
-    table.add_column("Debt", justify="right")
-    table.add_column("ICR", justify="right")
-    table.add_column("cdp collateral vs total cdp's owned (%)", justify="right")
-    table.add_column("cdp debt vs total cdp's owned (%)", justify="right")
+def main(owners=None, output="table", block=None):
+    """
+    @param owners Comma separated addresses, defaults to the treasury vault, techops and fee recipient msigs.
+    @param output One of "table", "csv" or "json", files are written to `data/cdp_portfolio/`.
+    @param block Block number to read at, defaults to the latest one.
+    e.g. `brownie run scripts/cdp_management_lens.py main "0xabc...,0xdef..." csv --network mainnet`
+    """
+    owners = owners.split(",") if owners else DEFAULT_OWNERS
 
-    safe = GreatApeSafe(msig_address)
+    safe = GreatApeSafe(owners[0])
     safe.init_ebtc()
-
-    # helpers vars
-    cdps_info = []
-    total_collateral = 0
-    total_debt = 0
+    portfolio = read_cdp_portfolio(safe.ebtc, owners, int(block) if block else None)
 
     # general TCR info of the system at current oracle price w/ all elements sync
-    feed_price = safe.ebtc.price_feed.fetchPrice.call()
-    current_tcr = safe.ebtc.cdp_manager.getSyncedTCR(feed_price)
     C.print(
-        f"[cyan]System's TCR: {(current_tcr/1e16):.3f}%. Oracle price: {(feed_price/1e18):.3f}.\n[/cyan]"
+        f"[cyan]System's TCR: {(portfolio['system']['tcr']/1e16):.3f}%. Oracle price: {(portfolio['price']/1e18):.3f}.\n[/cyan]"
     )
 
-    cdps_safe_owned = safe.ebtc.sorted_cdps.getCdpsOf(safe)
-    for cdp_id in cdps_safe_owned:
-        C.print(f"[green]Inspecting cdp id: {cdp_id}\n[/green]")
-        cdp_id_coll = safe.ebtc.cdp_manager.getSyncedCdpCollShares(cdp_id)
-        cdp_id_debt = safe.ebtc.cdp_manager.getSyncedCdpDebt(cdp_id)
-        icr = safe.ebtc.cdp_manager.getSyncedICR(cdp_id, feed_price)
+    if output == "table":
+        print_portfolio(portfolio)
+        return
 
-        # increase global vars
-        total_collateral += cdp_id_coll
-        total_debt += cdp_id_debt
+    os.makedirs("data/cdp_portfolio/", exist_ok=True)
+    path = f"data/cdp_portfolio/cdp_portfolio_{network.show_active()}_{int(time.time())}.{output}"
+    if output == "csv":
+        pd.DataFrame(portfolio["cdps"]).to_csv(path, index=False)
+    elif output == "json":
+        with open(path, "w") as f:
+            json.dump(portfolio, f, indent=4)
+    else:
+        raise ValueError(f"unknown output {output}, expected table, csv or json")
+    C.print(f"[green]Portfolio written to {path}[/green]")
 
-        cdps_info.append((cdp_id, cdp_id_coll, cdp_id_debt, icr))
 
-    # reordering cdps by ICR
-    ICR_INDEX = 3
-    cdps_info.sort(key=lambda x: x[ICR_INDEX])
+def print_portfolio(portfolio):
+    cdps = portfolio["cdps"]
+    total_collateral = sum(cdp["coll_shares"] for cdp in cdps)
+    total_debt = sum(cdp["debt"] for cdp in cdps)
+
+    # table generation
+    table = Table(title=f"{len(cdps)} CDPs ordered by ICR")
+
+    table.add_column("Owner", justify="right")
+    table.add_column("Cdp ID", justify="right")
+    table.add_column("Collateral", justify="right")
+    table.add_column("Debt", justify="right")
+    table.add_column("ICR", justify="right")
+    table.add_column("NICR", justify="right")
+    table.add_column("cdp collateral vs total cdp's owned (%)", justify="right")
+    table.add_column("cdp debt vs total cdp's owned (%)", justify="right")
+    table.add_column("cdp collateral vs system (%)", justify="right")
+    table.add_column("cdp debt vs system (%)", justify="right")
 
     # fill up table rows
-    for cdp_info in cdps_info:
+    for cdp in cdps:
         table.add_row(
-            f"{str(cdp_info[0])[:7]}...{str(cdp_info[0])[-7:]}",
-            f"{(cdp_info[1] / 10 ** 18):.3f}",
-            f"{(cdp_info[2] / 10 ** 18):.3f}",
-            f"{(cdp_info[3] / 1e16):.3f}%",
-            f"{(cdp_info[1] / total_collateral * 100):.3f}%",
-            f"{(cdp_info[2] / total_debt * 100):.3f}%",
+            reverse.get(cdp["owner"], cdp["owner"]),
+            f"{cdp['cdp_id'][:7]}...{cdp['cdp_id'][-7:]}",
+            f"{(cdp['coll'] / 10 ** 18):.3f}",
+            f"{(cdp['debt'] / 10 ** 18):.3f}",
+            f"{(cdp['icr'] / 1e16):.3f}%",
+            f"{(cdp['nicr'] / 1e20):.3f}",
+            f"{(cdp['coll_shares'] / total_collateral * 100):.3f}%",
+            f"{(cdp['debt'] / total_debt * 100):.3f}%",
+            f"{(cdp['share_of_system_coll'] * 100):.3f}%",
+            f"{(cdp['share_of_system_debt'] * 100):.3f}%",
         )
 
     # table printout
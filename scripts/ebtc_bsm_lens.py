@@ -0,0 +1,117 @@
+import json
+import os
+import time
+
+import pandas as pd
+from brownie import network
+from great_ape_safe import GreatApeSafe
+from great_ape_safe.ape_api.helpers.ebtc.bsm import BsmLens, RateLimitModel
+from helpers.addresses import r
+from rich.console import Console
+from rich.table import Table
+
+C = Console()
+
+"""
+The following methods are meant to provide insight of the BSM and stEBTC state:
+    - fees to buy/sell and pause state of the BSM
+    - escrow total balance, deposits in the external vault and fee profit
+    - oracle min price and freshness of the asset feed
+    - minting config and remaining headroom of the rate limiting constraint
+    - stEBTC rewards per cycle and minting fee
+
+Every block is read in one multicall, see `BsmLens`. `plan` splits BSM sells and
+buys into chunks that fit the rate limiting constraint, see `RateLimitModel`.
+"""
+
+
+def parse_blocks(blocks):
+    """
+    @dev Either comma separated block numbers or a `start:end:step` range, end included.
+    """
+    if ":" in str(blocks):
+        start, end, step = [int(value) for value in str(blocks).split(":")]
+        return list(range(start, end + 1, step))
+    return [int(block) for block in str(blocks).split(",")]
+
+
+def main(output="table", blocks=None):
+    """
+    @param output One of "table", "csv" or "json", files are written to `data/bsm_state/`.
+    @param blocks Blocks to sample, see `parse_blocks`. Defaults to the latest one.
+    e.g. `brownie run scripts/ebtc_bsm_lens.py main csv 21000000:21100000:10000 --network mainnet`
+    """
+    safe = GreatApeSafe(r.ebtc_wallets.techops_multisig)
+    safe.init_ebtc()
+    lens = BsmLens(safe.ebtc)
+    series = lens.series(parse_blocks(blocks)) if blocks else [lens.read()]
+
+    if output == "table":
+        print_series(series)
+        return
+
+    os.makedirs("data/bsm_state/", exist_ok=True)
+    path = (
+        f"data/bsm_state/bsm_state_{network.show_active()}_{int(time.time())}.{output}"
+    )
+    if output == "csv":
+        pd.DataFrame(series).to_csv(path, index=False)
+    elif output == "json":
+        with open(path, "w") as f:
+            json.dump(series, f, indent=4)
+    else:
+        raise ValueError(f"unknown output {output}, expected table, csv or json")
+    C.print(f"[green]BSM state written to {path}[/green]")
+
+
+def print_series(series):
+    # one column per sampled block
+    table = Table(title="BSM and stEBTC state")
+    table.add_column("Field", justify="left")
+    for state in series:
+        table.add_column(str(state["block"]), justify="right")
+
+    for field in series[0]:
+        if field == "block":
+            continue
+        table.add_row(field, *[str(state[field]) for state in series])
+
+    C.print(table)
+
+
+def plan(orders, max_chunk=None):
+    """
+    @param orders Comma separated eBTC amounts, positive to sell assets and negative to buy them.
+    @param max_chunk Largest eBTC amount of a single operation.
+    e.g. `brownie run scripts/ebtc_bsm_lens.py plan "25,-5,10" 5 --network mainnet`
+    """
+    safe = GreatApeSafe(r.ebtc_wallets.techops_multisig)
+    safe.init_ebtc()
+    model = RateLimitModel.from_chain(safe.ebtc)
+    C.print(f"[cyan]Minting headroom: {model.headroom() / 1e18:.4f} eBTC[/cyan]")
+
+    amounts = [int(float(amount) * 1e18) for amount in str(orders).split(",")]
+    result = model.plan(
+        amounts, max_chunk=int(float(max_chunk) * 1e18) if max_chunk else None
+    )
+
+    table = Table(title=f"{len(result['chunks'])} BSM operations")
+    table.add_column("Step", justify="right")
+    table.add_column("Order", justify="right")
+    table.add_column("Operation", justify="left")
+    table.add_column("eBTC", justify="right")
+    table.add_column("Total minted", justify="right")
+    table.add_column("Headroom", justify="right")
+    for chunk in result["chunks"]:
+        table.add_row(
+            str(chunk["step"]),
+            str(chunk["order"]),
+            "sellAsset" if chunk["amount"] > 0 else "buyAsset",
+            f"{abs(chunk['amount']) / 1e18:.4f}",
+            f"{chunk['total_minted'] / 1e18:.4f}",
+            f"{chunk['headroom'] / 1e18:.4f}",
+        )
+    C.print(table)
+
+    for index, amount in result["unfilled"].items():
+        C.print(f"[red]Order {index}: {amount / 1e18:.4f} eBTC can't be filled[/red]")
@@ -1,4 +1,5 @@
 from great_ape_safe import GreatApeSafe
+from great_ape_safe.ape_api.helpers.ebtc.authority import read_authority_state
 from brownie import network
 from rich.console import Console
 from helpers.addresses import reverse, r
@@ -10,96 +11,73 @@ import time
 C = Console()
 
 
-def main(export_csv=False):
+def main(export_csv=False, block=None):
     """
     The following script iterates through the different pieces that make up the Authority's state and outputs it to the console.
     This includes al exisiting roles, their names, the users they are assigned to, as well as the target and capabilities for each.
+    Pass a block number as second argument to audit the state at that block (requires an archive node), e.g.
+    `brownie run scripts/ebtc_governance_lens.py main False 19500000 --network mainnet`
     """
 
     safe = GreatApeSafe(r.ebtc_wallets.security_multisig)
     safe.init_ebtc()
     authority = safe.ebtc.authority
 
+    # all reads are batched in multicalls, see `read_authority_state`
+    targets = [
+        address for key, address in r.ebtc.items() if key != "test_contracts"
+    ]  # test_contracts only exists on testnets
+    state = read_authority_state(authority, targets, int(block) if block else None)
+
     # Print the state of the Authority
     C.print(f"[cyan]Authority's state[/cyan]")
+    if block:
+        C.print(f"[yellow]At block: {block}[/yellow]")
     C.print(f"[yellow]Authority address: {authority.address}[/yellow]")
-    C.print(f"[yellow]Authority's Owner: {authority.owner()}[/yellow]")
-
-    ## Get DF for roles, their names and the users they are assigned to
-    roles_data = []
-    roles = 0
-    while True:
-        try:
-            name = authority.getRoleName(roles)
-            if name == "":
-                break
-            users = authority.getUsersByRole(roles)
-            user_addresses = "\n".join(users)  # Replace comma with new line
-            user_ids = "\n".join(
-                reverse[user] if user in reverse else "Unknown" for user in users
-            )  # Replace comma with new line
-            roles_data.append([roles, name, user_addresses, user_ids])
-            roles += 1
-        except:
-            break
-
-    roles_df = pd.DataFrame(
-        roles_data, columns=["Role", "Name", "User Addresses", "User IDs"]
-    )
-
-    ## Gets df for roles, their targets and capabilities
-    enabled_data = []
-    ebtc_section = r.ebtc
-    ebtc_section.pop("test_contracts", None)  # For testnets
-    targets = list(ebtc_section.values())
+    C.print(f"[yellow]Authority's Owner: {state['owner']}[/yellow]")
 
     # Get function signatures mapping of IDs
-    governance_signatures = safe.ebtc.governance_signatures
-    reversed_signatures = {v: k for k, v in governance_signatures.items()}
-
-    for target in targets:
-        target_id = reverse[target]
-        functions = authority.getEnabledFunctionsInTarget(target)
-        for function in functions:
-            function_id = reversed_signatures.get(f"{function}")
-            roles = extract_roles(authority.getRolesWithCapability(target, function))
-            for role in roles:
-                enabled_data.append([role, target, target_id, function_id])
-
-    # Group all values in single rows for each role
+    reversed_signatures = {v: k for k, v in safe.ebtc.governance_signatures.items()}
+
+    # Group targets and capabilities for each role
     grouped_data = {}
-    for row in enabled_data:
-        role = row[0]
-        target = row[1]
-        target_id = row[2]
-        function_id = row[3]
-        if role not in grouped_data:
-            grouped_data[role] = {"Target": [], "Target ID": [], "Function": []}
-        grouped_data[role]["Target"].append(target)
-        grouped_data[role]["Target ID"].append(target_id)
-        grouped_data[role]["Function"].append(function_id)
-
-    # Create a new dataframe with grouped data
-    grouped_df = pd.DataFrame(columns=["Role", "Target", "Target ID", "Function"])
-    for role, values in grouped_data.items():
-        target_str = "\n".join(values["Target"])
-        target_id_str = "\n".join(values["Target ID"])
-        function_str = "\n".join(values["Function"])
-        grouped_df = grouped_df.append(
+    for (target, function), capability in state["capabilities"].items():
+        for role in capability["roles"]:
+            grouped = grouped_data.setdefault(
+                role, {"Target": [], "Target ID": [], "Function": []}
+            )
+            grouped["Target"].append(target)
+            grouped["Target ID"].append(reverse[target])
+            grouped["Function"].append(reversed_signatures.get(function))
+
+    # Build the whole frame in one pass, one row per role with capabilities
+    merged_df = pd.DataFrame(
+        [
             {
                 "Role": role,
-                "Target": target_str,
-                "Target ID": target_id_str,
-                "Function": function_str,
-            },
-            ignore_index=True,
-        )
-
-    # Sort the dataframe by the "Role" column
-    grouped_df = grouped_df.sort_values(by="Role")
-
-    # Merge all data for each role and print final table
-    merged_df = pd.merge(roles_df, grouped_df, on="Role")
+                "Name": state["roles"][role]["name"],
+                "User Addresses": "\n".join(state["roles"][role]["users"]),
+                "User IDs": "\n".join(
+                    reverse.get(user, "Unknown")
+                    for user in state["roles"][role]["users"]
+                ),
+                "Target": "\n".join(grouped_data[role]["Target"]),
+                "Target ID": "\n".join(grouped_data[role]["Target ID"]),
+                "Function": "\n".join(map(str, grouped_data[role]["Function"])),
+            }
+            for role in sorted(grouped_data)
+            if role in state["roles"]
+        ],
+        columns=[
+            "Role",
+            "Name",
+            "User Addresses",
+            "User IDs",
+            "Target",
+            "Target ID",
+            "Function",
+        ],
+    )
     merged_table = tabulate(
         merged_df,
         headers=[
@@ -119,27 +97,57 @@ def main(export_csv=False):
         # Dump result
         os.makedirs("data/authority_audit/", exist_ok=True)
         timestamp = int(time.time())  # Get current Unix timestamp
+        suffix = f"block_{block}" if block else timestamp
         merged_df.to_csv(
-            f"data/authority_audit/authority_audit_{network.show_active()}_{timestamp}.csv",
+            f"data/authority_audit/authority_audit_{network.show_active()}_{suffix}.csv",
             index=False,
         )
 
 
-def extract_roles(bitmask):
-    # Convert bytes32 bitmask to integer
-    bitmask_int = int.from_bytes(bitmask, byteorder="big")
-
-    # Initialize an empty list to store the roles
-    roles = []
-
-    # Iterate over each bit in the bitmask
-    for role in range(256):  # A bytes32 value is 256 bits
-        # Shift the integer to the right by the number of positions specified by the role
-        shifted = bitmask_int >> role
+def drift(block=None):
+    """
+    Compares the intended governance configuration (`eBTC.governance_configuration` and
+    `eBTC.users_roles_configuration`) against the Authority's state and prints the differences,
+    together with the calldata of the batch fixing them, e.g.
+    `brownie run scripts/ebtc_governance_lens.py drift --network mainnet`
+    """
 
-        # Perform a bitwise AND operation with 1 to check if the bit at the position is set
-        if (shifted & 1) != 0:
-            # If the bit is set, add the role to the list
-            roles.append(role)
+    safe = GreatApeSafe(r.ebtc_wallets.security_multisig)
+    safe.init_ebtc()
+    report = safe.ebtc.governance_drift(int(block) if block else None)
+    reversed_signatures = {v: k for k, v in safe.ebtc.governance_signatures.items()}
+
+    rows = [["Missing role name", role, "", ""] for role in report["missing_roles"]] + [
+        ["Extra role", role, "", ""] for role in report["extra_roles"]
+    ]
+    for kind, key in [
+        ("Missing capability", "missing_capabilities"),
+        ("Extra capability", "extra_capabilities"),
+    ]:
+        rows += [
+            [kind, role, reverse.get(target, target), reversed_signatures.get(sig, sig)]
+            for role, target, sig in report[key]
+        ]
+    for kind, key in [("Missing user", "missing_users"), ("Extra user", "extra_users")]:
+        rows += [
+            [kind, role, reverse.get(user, user), ""] for user, role in report[key]
+        ]
+
+    if not rows:
+        C.print(
+            "[green]No drift, the Authority matches the intended configuration[/green]"
+        )
+        return
 
-    return roles
+    C.print(
+        tabulate(
+            rows,
+            headers=["Drift", "Role", "Address", "Function"],
+            tablefmt="fancy_grid",
+        )
+    )
+    C.print(
+        f"[yellow]Fix batch ({len(report['data'])} calls on the Authority):[/yellow]"
+    )
+    for data in report["data"]:
+        C.print(data)
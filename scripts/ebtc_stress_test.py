@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+from brownie import web3
+from great_ape_safe import GreatApeSafe
+from great_ape_safe.ape_api.helpers.ebtc.model import CdpManagerModel
+from great_ape_safe.ape_api.helpers.ebtc.stress import linear_paths, stress_test
+from helpers.addresses import r
+from rich.console import Console
+from rich.table import Table
+
+C = Console()
+
+"""
+Price shock stress test of the whole CDP set, see `stress_test`.
+    1. record a snapshot of the system (requires a node):
+       `brownie run scripts/ebtc_stress_test.py record --network mainnet`
+    2. replay price paths over it, no rpc calls are made:
+       `brownie run scripts/ebtc_stress_test.py main data/stress_test/snapshot_<block>.json "-0.1,-0.3,-0.5" 24`
+"""
+
+
+def record(block=None):
+    safe = GreatApeSafe(r.ebtc_wallets.techops_multisig)
+    safe.init_ebtc()
+    block = int(block) if block else web3.eth.block_number
+    model = CdpManagerModel.from_chain(safe.ebtc, block)
+
+    os.makedirs("data/stress_test/", exist_ok=True)
+    path = f"data/stress_test/snapshot_{block}.json"
+    model.save(path)
+    C.print(f"[green]Snapshot of {len(model.ids)} CDPs written to {path}[/green]")
+
+
+def main(snapshot, shocks="-0.1,-0.2,-0.3,-0.4,-0.5", steps=24, step_duration=3600):
+    """
+    @param snapshot Path of a snapshot written by `record`.
+    @param shocks Comma separated relative price changes, reached linearly over `steps` steps.
+    @param step_duration Seconds between two steps, used for the recovery mode grace period.
+    """
+    model = CdpManagerModel.load(snapshot)
+    shocks = [float(shock) for shock in shocks.split(",")]
+    paths = linear_paths(model.system["price"], shocks, int(steps))
+    result = stress_test(model, paths, step_duration=int(step_duration))
+
+    C.print(
+        f"[cyan]{len(model.ids)} CDPs, TCR: {(model.tcr()/1e16):.3f}%. Oracle price: {(model.system['price']/1e18):.5f}.\n[/cyan]"
+    )
+
+    table = Table(title=f"Price shocks over {steps} steps of {step_duration}s")
+    table.add_column("Shock", justify="right")
+    table.add_column("Final price", justify="right")
+    table.add_column("Final TCR", justify="right")
+    table.add_column("Recovery mode at step", justify="right")
+    table.add_column("CDPs < CCR", justify="right")
+    table.add_column("CDPs < MCR", justify="right")
+    table.add_column("Liquidated CDPs", justify="right")
+    table.add_column("Liquidated collateral", justify="right")
+    table.add_column("Liquidated debt", justify="right")
+    table.add_column("Bad debt", justify="right")
+
+    for i, shock in enumerate(shocks):
+        rm_step = result["recovery_mode_step"][i]
+        table.add_row(
+            f"{shock * 100:.1f}%",
+            f"{(paths[i, -1] / 1e18):.5f}",
+            f"{(result['tcr'][i, -1] / 1e16):.3f}%",
+            str(rm_step) if rm_step >= 0 else "-",
+            str(result["ccr_count"][i, -1]),
+            str(result["mcr_count"][i, -1]),
+            str(result["liquidated_count"][i].sum()),
+            f"{(np.sum(result['liquidated_coll'][i]) / 1e18):.3f}",
+            f"{(np.sum(result['liquidated_debt'][i]) / 1e18):.3f}",
+            f"{(np.sum(result['bad_debt'][i]) / 1e18):.3f}",
+        )
+
+    C.print(table)
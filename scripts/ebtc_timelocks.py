@@ -1,4 +1,5 @@
 from great_ape_safe import GreatApeSafe
+from great_ape_safe.ape_api.helpers.ebtc.timelock_scheduler import TimelockScheduler
 from helpers.addresses import r
 from rich.console import Console
 
@@ -121,3 +122,28 @@ def highsec_cancel_timelock(
     safe.ebtc.cancel_highsec_timelock(id, target, value, data, predecessor, salt)
 
     safe.post_safe_tx()
+
+
+"""
+Execution of ready operations
+
+Operations of all the timelocks are executed by the techops or security multisig, whichever holds the EXECUTOR_ROLE.
+"""
+
+
+def execute_ready(wait=False):
+    """
+    Execute every ready operation of the timelocks, one multisend per safe. If `wait`, sleeps until one is ready.
+    """
+    scheduler = TimelockScheduler(
+        [
+            GreatApeSafe(r.ebtc_wallets.techops_multisig),
+            GreatApeSafe(r.ebtc_wallets.security_multisig),
+        ]
+    )
+    multisends = scheduler.prepare(wait=wait in [True, "true", "True"])
+    if not multisends:
+        C.print("[yellow]No operation ready to be executed[/yellow]")
+    for safe, safe_tx in multisends:
+        C.print(f"\nUsing {safe.account} for the ready operations\n")
+        safe.post_safe_tx(safe_tx=safe_tx)
@@ -1,4 +1,5 @@
 from great_ape_safe import GreatApeSafe
+from great_ape_safe.ape_api.helpers.ebtc.timelock_indexer import TimelockIndexer
 from brownie import network
 import pandas as pd
 from tabulate import tabulate
@@ -62,3 +63,38 @@ def main(export_csv=False):
             df.to_csv(
                 f"data/timelocks_audit/{timelock_key}_audit_{network.show_active()}_{timestamp}.csv"
             )
+
+
+def operations(state=None, target=None, selector=None, start_block=0):
+    """
+    Lists the operations of the eBTC timelocks from a local sqlite index,
+    which is brought up to date with the chain first.
+    e.g. `brownie run scripts/ebtc_timelocks_lens.py operations ready`
+    """
+    safe = GreatApeSafe(r.ebtc_wallets.security_multisig)
+    safe.init_ebtc()
+
+    indexer = TimelockIndexer(
+        {
+            "lowsec_timelock": safe.ebtc.lowsec_timelock,
+            "highsec_timelock": safe.ebtc.highsec_timelock,
+            "treasury_timelock": safe.ebtc.treasury_timelock,
+        },
+        start_block=int(start_block),
+    )
+    indexer.sync()
+
+    rows = [
+        {
+            "timelock": row["timelock"],
+            "id": row["id"][:10],
+            "state": row["state"],
+            "ready_at": time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.gmtime(row["ready_at"])
+            ),
+            "target": reverse.get(row["target"], row["target"]),
+            "call": row["signature"] or row["selector"],
+        }
+        for row in indexer.operations(state=state, target=target, selector=selector)
+    ]
+    C.print(tabulate(rows, headers="keys", tablefmt="grid"))
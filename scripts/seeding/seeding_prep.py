@@ -8,7 +8,7 @@ from great_ape_safe.ape_api.helpers.uni_v3.uni_v3_sdk import Q96
 
 from great_ape_safe.ape_api.helpers.coingecko import get_cg_price
 
-from brownie import accounts, chain, interface
+from brownie import accounts, interface
 from helpers.addresses import r
 from rich.console import Console
 
@@ -321,61 +321,20 @@ def _retrive_token_id(file_matching_pattern_str, current_tick):
     return token_id
 
 
-def _max_wbtc_upper_bound(path, wbtc_pool_balance):
-    """
-    Calculate the upper bound of $wbtc amount that can be swapped for $ebtc
-    w/o causing the swap to return less $ebtc than $wbtc
-    """
-    wbtc_decimals = path[0].decimals()
-    decimals_diff = path[1].decimals() - wbtc_decimals
-    step_increase = 0.1 * 10 ** wbtc_decimals
-    max_wbtc_amount = int(
-        wbtc_pool_balance / 3
-    )  # start checking swaps of 1/3 of the pool balance
-    amount_out_wbtc_adjusted = max_wbtc_amount
-
-    chain.snapshot()
-    while True:
-        amount_out = safe.uni_v3.swap(path, max_wbtc_amount)
-        amount_out_wbtc_adjusted = int(amount_out / 10 ** decimals_diff)
-        chain.revert()
-        # at this point the swap is returning less $ebtc than $wbtc in
-        if amount_out_wbtc_adjusted < max_wbtc_amount:
-            break
-        max_wbtc_amount += step_increase
-
-    return max_wbtc_amount / 10 ** wbtc_decimals
-
-
 def _calc_steth_out_to_peg_tick(pool, wbtc, ebtc, collateral):
-    path = [wbtc, ebtc]
-    step_increase = 0.05
-    min_wbtc_amount = 0.5
-    max_wbtc_amount = _max_wbtc_upper_bound(path, wbtc.balanceOf(pool))
-    wbtc_amount_for_swap = 0
-
-    chain.snapshot()
-    while min_wbtc_amount < max_wbtc_amount:
-        mid_amount = (min_wbtc_amount + max_wbtc_amount) / 2
-
-        # swap
-        safe.uni_v3.swap(path, mid_amount * 1e8)
-
-        current_tick = pool.slot0()[1]
-        C.print(f"[green]Pool tick after swap: {current_tick} \n[/green]")
-        C.print(f"[blue]mid_amount={mid_amount} \n[/blue]")
-
-        if current_tick > THEORETICAL_TICK_PEG:  # under peg
-            wbtc_amount_for_swap = mid_amount
-            min_wbtc_amount = mid_amount + step_increase
-        elif current_tick == THEORETICAL_TICK_PEG:  # theoretical peg
-            wbtc_amount_for_swap = mid_amount
-            chain.revert()
-            break
-        else:  # over peg
-            max_wbtc_amount = mid_amount - step_increase
-
-        chain.revert()
+    # exact $wbtc input moving the pool price down to the peg, solved locally
+    solution = safe.uni_v3.amount_to_tick(pool, THEORETICAL_TICK_PEG)
+    if solution["token_in"] == wbtc.address:
+        wbtc_amount_for_swap = solution["amount_in"] / 10 ** wbtc.decimals()
+        C.print(
+            f"[green]Swapping {wbtc_amount_for_swap} $wbtc for {solution['amount_out'] / 10 ** ebtc.decimals()} $ebtc moves the pool to tick {solution['tick_after']} \n[/green]"
+        )
+    else:
+        # pool already at or over peg
+        wbtc_amount_for_swap = 0
+        C.print(
+            f"[green]Pool tick {pool.slot0()[1]} is already at or over peg \n[/green]"
+        )
 
     # convert $wbtc amount into $steth denominated
     wbtc_price = get_cg_price(wbtc.address)
@@ -0,0 +1,75 @@
+from brownie import chain, web3
+from great_ape_safe.ape_api.helpers.ebtc.bsm import BsmLens, RateLimitModel, minting_cap
+
+
+def test_bsm_lens_matches_getters(techops):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    lens = BsmLens(ebtc)
+
+    state = lens.read()
+
+    assert state["fee_to_buy_bps"] == ebtc.bsm.feeToBuyBPS()
+    assert state["fee_to_sell_bps"] == ebtc.bsm.feeToSellBPS()
+    assert state["paused"] == ebtc.bsm.paused()
+    assert state["escrow_total_balance"] == ebtc.bsm_escrow.totalBalance()
+    assert (
+        state["oracle_min_price_bps"] == ebtc.bsm_oracle_price_constraint.minPriceBPS()
+    )
+    assert state["stebtc_minting_fee"] == ebtc.staked_ebtc.mintingFee()
+
+    config = ebtc.bsm_rate_limiting_constraint.getMintingConfig(ebtc.bsm)
+    cap = minting_cap(config, ebtc.active_pool.getSystemDebt())
+    assert state["minting_cap"] == cap
+    assert state["minting_headroom"] == max(cap - ebtc.bsm.totalMinted(), 0)
+
+
+def test_bsm_lens_series(techops):
+    techops.init_ebtc()
+    lens = BsmLens(techops.ebtc)
+    start = chain.height
+    chain.mine(2)
+
+    series = lens.series([start, start + 2])
+
+    assert [state["block"] for state in series] == [start, start + 2]
+    assert series[1]["timestamp"] >= series[0]["timestamp"]
+
+
+def test_bsm_lens_before_deployment(techops):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    lens = BsmLens(ebtc)
+    # before eBTC launched
+    block = 19_000_000
+    assert web3.eth.get_code(ebtc.bsm.address, block) == b""
+
+    state = lens.read(block)
+
+    assert state["block"] == block
+    assert state["fee_to_buy_bps"] is None
+    assert state["minting_cap"] is None
+    assert state["stebtc_rewards_per_cycle"] is None
+
+
+def test_rate_limit_plan_fits_headroom(techops):
+    techops.init_ebtc()
+    model = RateLimitModel.from_chain(techops.ebtc)
+    headroom = model.headroom()
+    assert headroom == BsmLens(techops.ebtc).read()["minting_headroom"]
+
+    ## Selling more than the headroom leaves the excess unfilled
+    chunk = headroom // 3 + 1
+    result = model.plan([headroom + chunk], max_chunk=chunk)
+
+    assert all(c["amount"] <= chunk for c in result["chunks"])
+    assert sum(c["amount"] for c in result["chunks"]) == headroom
+    assert result["unfilled"] == {0: chunk}
+    assert all(
+        p["valid"] for p in model.project([c["amount"] for c in result["chunks"]])
+    )
+
+    ## A buy queued behind frees the capacity for the rest of the sell
+    result = model.plan([headroom + chunk, -chunk], max_chunk=chunk)
+    assert result["unfilled"] == {}
+    assert result["chunks"][-1]["total_minted"] == model.total_minted + headroom
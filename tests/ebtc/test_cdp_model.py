@@ -0,0 +1,169 @@
+import brownie
+from brownie import accounts, chain
+from great_ape_safe.ape_api.helpers.ebtc.model import CdpManagerModel
+from great_ape_safe.ape_api.helpers.ebtc.stress import linear_paths, stress_test
+from helpers.constants import EmptyBytes32
+from helpers.utils import approx
+
+
+def test_model_matches_synced_values(techops):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    model = CdpManagerModel.from_chain(ebtc)
+    price = model.system["price"]
+
+    assert len(model.ids) == ebtc.sorted_cdps.getSize()
+    assert approx(model.tcr(), ebtc.cdp_manager.getSyncedTCR(price), 0.001)
+
+    icr, nicr = model.icr(), model.nicr()
+    for i in [0, len(model.ids) // 2, len(model.ids) - 1]:
+        cdp_id = model.ids[i]
+        assert approx(icr[i], ebtc.cdp_manager.getSyncedICR(cdp_id, price), 0.001)
+        assert approx(nicr[i], ebtc.cdp_manager.getSyncedNominalICR(cdp_id), 0.001)
+
+    # nicr order matches the sorted list
+    assert all(nicr[:-1] >= nicr[1:] * 0.999)
+
+
+def test_model_redemption_fee_floor_matches_fork(techops):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    model = CdpManagerModel.from_chain(ebtc)
+    new_floor = 0.006e18
+
+    ebtc.cdpManager_set_redemption_fee_floor(new_floor)
+    chain.sleep(ebtc.lowsec_timelock.getMinDelay() + 1)
+    chain.mine()
+    ebtc.cdpManager_set_redemption_fee_floor(new_floor)
+
+    rates = model.redemption_rate(
+        [model.system["redemptionFeeFloor"], new_floor], timestamp=chain.time()
+    )
+    assert approx(rates[1], ebtc.cdp_manager.getRedemptionRateWithDecay(), 0.001)
+    assert approx(
+        rates[1] - rates[0], new_floor - model.system["redemptionFeeFloor"], 0.001
+    )
+
+
+def test_model_redemption_decay_and_beta_match_fork(
+    techops, random_safe, setup_test_coll
+):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    cdp_manager = ebtc.cdp_manager
+    old = CdpManagerModel.from_chain(ebtc).system
+    new_decay = 999_500_000_000_000_000
+    new_beta = old["beta"] * 2
+
+    ebtc.cdpManager_set_minute_decay_factor(new_decay)
+    ebtc.cdpManager_set_beta(new_beta)
+    chain.sleep(ebtc.lowsec_timelock.getMinDelay() + 1)
+    chain.mine()
+    ebtc.cdpManager_set_minute_decay_factor(new_decay)
+    ebtc.cdpManager_set_beta(new_beta)
+
+    # redeem part of a fresh cdp's debt, the base rate grows by fraction / beta
+    random_safe.ebtc.open_cdp(5e18, 160e16)
+    model = CdpManagerModel.from_chain(ebtc)
+    first, nicr, amount, _ = ebtc.hint_helpers.getRedemptionHints(
+        ebtc.ebtc_token.balanceOf(random_safe.address) // 2, model.system["price"], 0
+    )
+    tx = cdp_manager.redeemCollateral(
+        amount,
+        first,
+        EmptyBytes32,
+        EmptyBytes32,
+        nicr,
+        0,
+        1e18,
+        {"from": random_safe.account},
+    )
+    _, base_rates = model.redemption(
+        amount,
+        minute_decay_factor=new_decay,
+        beta=[old["beta"], new_beta],
+        timestamp=tx.timestamp,
+    )
+    assert approx(base_rates[1], cdp_manager.baseRate(), 0.1)
+    assert not approx(base_rates[0], cdp_manager.baseRate(), 1)
+
+    # then it decays by the new factor every minute
+    chain.sleep(2 * 3600)
+    chain.mine()
+    model = CdpManagerModel.from_chain(ebtc)
+    timestamp = model.system["timestamp"]
+    rate = cdp_manager.getRedemptionRateWithDecay()
+    decayed = model.decayed_base_rate([old["minuteDecayFactor"], new_decay], timestamp)
+    assert approx(decayed[1], rate - model.system["redemptionFeeFloor"], 1)
+    assert not approx(decayed[0], decayed[1], 1)
+    assert approx(model.redemption_rate(timestamp=timestamp), rate, 0.1)
+    coll = 10e18
+    assert approx(
+        model.redemption_rate(timestamp=timestamp) * coll / 1e18,
+        cdp_manager.getRedemptionFeeWithDecay(coll),
+        0.1,
+    )
+
+
+def test_model_liquidatable_grace_period_matches_fork(
+    techops, random_safe, setup_test_coll, test_price_feed
+):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    cdp_manager = ebtc.cdp_manager
+    old_grace_period = cdp_manager.recoveryModeGracePeriodDuration()
+    grace_period = old_grace_period + 3600
+
+    ebtc.cdpManager_set_grace_period(grace_period)
+    chain.sleep(ebtc.lowsec_timelock.getMinDelay() + 1)
+    chain.mine()
+    ebtc.cdpManager_set_grace_period(grace_period)
+
+    # a cdp that lands between MCR and the TCR once the TCR is pushed to 120%
+    price = ebtc.ebtc_feed.fetchPrice.call()
+    tcr = cdp_manager.getSyncedTCR(price)
+    cdp_id = random_safe.ebtc.open_cdp(5e18, tcr * 115 // 120)
+    new_price = price * int(120e16) // cdp_manager.getSyncedTCR(price)
+    test_price_feed.setPrice(new_price, {"from": accounts[0]})
+    ebtc.ebtc_feed.setPrimaryOracle(
+        test_price_feed,
+        {"from": accounts.at(ebtc.highsec_timelock.address, force=True)},
+    )
+    cdp_manager.syncGlobalAccountingAndGracePeriod({"from": accounts[0]})
+    assert cdp_manager.checkRecoveryMode(new_price)
+
+    model = CdpManagerModel.from_chain(ebtc)
+    model.system["price"] = new_price
+    i = model.ids.index(cdp_id)
+    assert model.system["MCR"] < model.icr()[i] < model.tcr()
+
+    # within the grace period only cdps below MCR can be liquidated
+    chain.sleep(old_grace_period + 60)
+    chain.mine()
+    assert list(
+        model.liquidatable([old_grace_period, grace_period], chain.time())[:, i]
+    ) == [True, False]
+    with brownie.reverts():
+        cdp_manager.liquidate.call(cdp_id, {"from": random_safe.account})
+
+    chain.sleep(grace_period - old_grace_period)
+    chain.mine()
+    assert model.liquidatable(grace_period, chain.time())[0, i]
+    cdp_manager.liquidate.call(cdp_id, {"from": random_safe.account})
+
+
+def test_stress_test_on_recorded_snapshot(techops, tmp_path):
+    techops.init_ebtc()
+    CdpManagerModel.from_chain(techops.ebtc).save(str(tmp_path / "snapshot.json"))
+    model = CdpManagerModel.load(str(tmp_path / "snapshot.json"))
+
+    paths = linear_paths(model.system["price"], [0, -0.99], 10)
+    result = stress_test(model, paths)
+
+    # no price change, no liquidation
+    assert result["liquidated_count"][0].sum() == result["mcr_count"][0, -1] == 0
+    # collateral worthless: every cdp whose ICR falls below MCR is liquidated, cdps
+    # strong enough to stay above it may survive, and the system goes in recovery mode
+    below_mcr = model.icr(paths[1, -1]) < model.system["MCR"]
+    assert result["liquidated_count"][1].sum() >= below_mcr.sum()
+    assert result["recovery_mode_step"][1] >= 0
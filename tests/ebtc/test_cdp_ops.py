@@ -1,4 +1,8 @@
 import pytest
+from brownie import accounts, chain
+from great_ape_safe.ape_api.helpers.ebtc.portfolio import read_cdp_portfolio
+from helpers.constants import EmptyBytes32
+from helpers.utils import approx
 
 
 def test_cdp_open_happy(random_safe, setup_test_coll):
@@ -196,3 +200,91 @@ def test_adjust_cdp_with_collateral_increase_debt_and_decrease_collateral(
 
     assert final_debt == prev_debt + debt_amount
     assert final_coll_shares == prev_coll_shares - coll_reduction_shares
+
+
+def test_sorted_cdps_mirror_hints(random_safe, setup_test_coll):
+    coll_amount = 5e18
+    random_safe.init_ebtc()
+    ebtc = random_safe.ebtc
+    ebtc.VERIFY_HINTS = True
+
+    mirror = ebtc.sorted_cdps_mirror
+    mirror.load()
+    assert len(mirror) == ebtc.sorted_cdps.getSize()
+
+    # the new cdp is picked up from its CdpUpdated log
+    cdp_id = ebtc.open_cdp(coll_amount, 160e16)
+    mirror.sync()
+    assert cdp_id in mirror.ids()
+    assert mirror.ids()[0] == ebtc.sorted_cdps.getFirst()
+
+    nicr = mirror.nicr(cdp_id)
+    hints = mirror.hints(nicr)
+    assert mirror.verify(nicr, hints) == hints
+
+
+def test_sorted_cdps_mirror_after_partial_liquidation(
+    random_safe, setup_test_coll, test_price_feed
+):
+    random_safe.init_ebtc()
+    ebtc = random_safe.ebtc
+    cdp_manager = ebtc.cdp_manager
+    cdp_id = ebtc.open_cdp(5e18, 160e16)
+    mirror = ebtc.sorted_cdps_mirror
+    mirror.load()
+
+    # drop the price so the cdp sits at ~105% ICR, below MCR
+    price = ebtc.ebtc_feed.fetchPrice.call() * 105 // 160
+    test_price_feed.setPrice(price, {"from": accounts[0]})
+    ebtc.ebtc_feed.setPrimaryOracle(
+        test_price_feed,
+        {"from": accounts.at(ebtc.highsec_timelock.address, force=True)},
+    )
+    assert cdp_manager.getSyncedICR(cdp_id, price) < cdp_manager.MCR()
+
+    debt = cdp_manager.getSyncedCdpDebt(cdp_id)
+    cdp_manager.partiallyLiquidate(
+        cdp_id, debt // 2, EmptyBytes32, EmptyBytes32, {"from": random_safe.account}
+    )
+    mirror.sync()
+
+    assert mirror.debt[cdp_id] == cdp_manager.getSyncedCdpDebt(cdp_id)
+    assert mirror.nicr(cdp_id) == cdp_manager.getCachedNominalICR(cdp_id)
+    for nicr in [mirror.nicr(cdp_id), mirror.nicr(cdp_id) + 1, mirror.nicr(cdp_id) - 1]:
+        hints = mirror.hints(nicr)
+        assert mirror.verify(nicr, hints) == hints
+
+
+def test_cdp_portfolio_matches_synced_values(random_safe, setup_test_coll):
+    coll_amount = 5e18
+    random_safe.init_ebtc()
+    ebtc = random_safe.ebtc
+
+    cdp_id = ebtc.open_cdp(coll_amount, 160e16)
+    portfolio = read_cdp_portfolio(ebtc, [random_safe.address])
+
+    assert [cdp["cdp_id"] for cdp in portfolio["cdps"]] == [cdp_id]
+    cdp = portfolio["cdps"][0]
+    price = portfolio["price"]
+    assert cdp["debt"] == ebtc.cdp_manager.getSyncedCdpDebt(cdp_id)
+    assert cdp["coll_shares"] == ebtc.cdp_manager.getSyncedCdpCollShares(cdp_id)
+    assert approx(cdp["icr"], ebtc.cdp_manager.getSyncedICR(cdp_id, price), 0.001)
+    assert approx(
+        portfolio["system"]["tcr"], ebtc.cdp_manager.getSyncedTCR(price), 0.001
+    )
+
+
+def test_cdp_portfolio_leaves_hint_mirror_alone(random_safe, setup_test_coll):
+    random_safe.init_ebtc()
+    ebtc = random_safe.ebtc
+    block_before = chain.height
+
+    ebtc.open_cdp(5e18, 160e16)
+    ebtc.sorted_cdps_mirror.sync()
+    synced_at = ebtc.sorted_cdps_mirror.last_block
+
+    # a historical read from before the cdp was opened
+    portfolio = read_cdp_portfolio(ebtc, [random_safe.address], block_before)
+
+    assert portfolio["cdps"] == []
+    assert ebtc.sorted_cdps_mirror.last_block == synced_at
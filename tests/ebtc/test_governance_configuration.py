@@ -1,4 +1,5 @@
 from brownie import chain, accounts
+from helpers.utils import encode_signature
 
 # Test authority_set_role_name
 
@@ -170,3 +171,77 @@ def test_authority_set_authority_happy(security_multisig):
     security_multisig.ebtc.authority_set_authority(new_authority)
 
     assert security_multisig.ebtc.authority.authority() == new_authority
+
+
+# Test lazy contract wiring
+
+
+def test_init_ebtc_binds_contracts_lazily(security_multisig):
+    security_multisig.init_ebtc()
+
+    assert "cdp_manager" not in security_multisig.ebtc.__dict__
+    assert "fee_recipient" not in security_multisig.ebtc.__dict__
+
+    cdp_manager = security_multisig.ebtc.cdp_manager
+
+    assert security_multisig.ebtc.cdp_manager is cdp_manager
+    assert security_multisig.ebtc.governance_signatures[
+        "SET_USER_ROLE_SIG"
+    ] == encode_signature("setUserRole(address,uint8,bool)")
+    assert (
+        security_multisig.ebtc.fee_recipient
+        == security_multisig.ebtc.active_pool.feeRecipientAddress()
+    )
+
+
+# Test governance_drift
+
+
+def test_governance_drift_fix_batch(security_multisig, random_safe):
+    security_multisig.init_ebtc()
+    ebtc = security_multisig.ebtc
+    role = ebtc.governance_roles.SWEEPER.value
+    mock_signature = "0x1a1a1a1a"
+    owner = accounts.at(ebtc.highsec_timelock.address, force=True)
+
+    baseline = ebtc.governance_drift()
+
+    ebtc.authority.setUserRole(random_safe.address, role, True, {"from": owner})
+    ebtc.authority.setRoleCapability(
+        role, ebtc.ebtc_token.address, mock_signature, True, {"from": owner}
+    )
+
+    drift = ebtc.governance_drift()
+
+    assert (random_safe.address, role) in drift["extra_users"]
+    assert (role, ebtc.ebtc_token.address, mock_signature) in drift[
+        "extra_capabilities"
+    ]
+    assert len(drift["data"]) == len(baseline["data"]) + 2
+    assert (
+        ebtc.authority.setUserRole.encode_input(random_safe.address, role, False)
+        in drift["data"]
+    )
+
+    # applying the batch leaves no drift behind
+    for target, data in zip(drift["targets"], drift["data"]):
+        owner.transfer(target, data=data)
+
+    drift = ebtc.governance_drift()
+    assert drift["data"] == []
+    assert drift["missing_users"] == drift["extra_users"] == []
+
+
+def test_governance_drift_reads_fee_recipient_at_block(security_multisig, random_safe):
+    security_multisig.init_ebtc()
+    ebtc = security_multisig.ebtc
+    block = chain.height
+    baseline = ebtc.governance_drift(block)
+
+    # a recipient cached from another block must not leak into the comparison
+    ebtc.__dict__["fee_recipient"] = random_safe.address
+    drift = ebtc.governance_drift(block)
+
+    assert drift["missing_users"] == baseline["missing_users"]
+    assert drift["extra_users"] == baseline["extra_users"]
+    assert drift["data"] == baseline["data"]
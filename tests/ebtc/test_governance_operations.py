@@ -1,4 +1,4 @@
-from brownie import chain
+from brownie import accounts, chain
 import pytest
 from helpers.constants import (
     AddressZero,
@@ -10,6 +10,7 @@ from helpers.constants import (
     MAX_MINUTE_DECAY_FACTOR,
     MINIMUM_GRACE_PERIOD,
     MAX_FEE_BPS,
+    PROPOSER_ROLE,
 )
 
 
@@ -422,3 +423,80 @@ def test_batch_collateral_feed_source_and_redemption_fee_floor_happy(techops):
 
     assert techops.ebtc.price_feed.useDynamicFeed() == new_status
     assert techops.ebtc.cdp_manager.redemptionFeeFloor() == 0.006e18
+
+
+# Test governance_batch
+def test_governance_batch_coalesces_setters(techops):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    timelock = ebtc.lowsec_timelock
+
+    def setters():
+        ebtc.cdpManager_set_beta(1000)
+        ebtc.cdpManager_set_redemption_fee_floor(0.006e18)
+        ebtc.activePool_set_fee_bps(1000)
+
+    with ebtc.governance_batch(timelock=timelock) as batch:
+        setters()
+
+    # one operation with all the calls, nothing executed yet
+    assert list(batch.operations) == [timelock.address]
+    assert len(batch.operations[timelock.address]["data"]) == 3
+    assert ebtc.cdp_manager.beta() != 1000
+
+    chain.sleep(timelock.getMinDelay() + 1)
+    chain.mine()
+
+    with ebtc.governance_batch(timelock=timelock):
+        setters()
+
+    assert ebtc.cdp_manager.beta() == 1000
+    assert ebtc.cdp_manager.redemptionFeeFloor() == 0.006e18
+    assert ebtc.active_pool.feeBps() == 1000
+
+
+# Test governance_batch post-execution checks
+def test_governance_batch_checks_against_state_before_execution(
+    techops, security_multisig
+):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    timelock = ebtc.lowsec_timelock
+    # let the low sec timelock claim the fee recipient shares
+    owner = accounts.at(ebtc.highsec_timelock.address, force=True)
+    ebtc.authority.setUserRole(
+        timelock.address, ebtc.governance_roles.FEE_CLAIMER.value, True, {"from": owner}
+    )
+    value = ebtc.active_pool.getFeeRecipientClaimableCollShares() // 2
+    coll = ebtc.collateral
+    recipient = ebtc.active_pool.feeRecipientAddress()
+
+    def helpers():
+        # the role is held before execution only, the shares are claimed on execution
+        ebtc.revoke_timelock_role("PROPOSER_ROLE", security_multisig.account)
+        ebtc.activePool_claim_fee_recipient_coll_shares(value, use_timelock=True)
+
+    with ebtc.governance_batch(timelock=timelock):
+        helpers()
+
+    chain.sleep(timelock.getMinDelay() + 1)
+    chain.mine()
+
+    shares_before = coll.sharesOf(recipient)
+    with ebtc.governance_batch(timelock=timelock):
+        helpers()
+
+    assert not timelock.hasRole(PROPOSER_ROLE, security_multisig.account)
+    assert coll.sharesOf(recipient) - shares_before == value
+
+
+# Test governance_batch timelock check
+def test_governance_batch_timelock_checks(techops):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+
+    with pytest.raises(AssertionError, match="Error: Operation on another timelock"):
+        with ebtc.governance_batch(timelock=ebtc.lowsec_timelock):
+            ebtc.cdpManager_set_beta(1000, use_high_sec=True)
+
+    assert ebtc._governance_batch is None
@@ -0,0 +1,76 @@
+import os
+
+from brownie import chain
+from great_ape_safe.ape_api.helpers.ebtc.timelock_indexer import TimelockIndexer
+from helpers.cache import cache_path
+from helpers.constants import EmptyBytes32
+from helpers.utils import hash_operation
+
+
+def test_indexer_tracks_operation_lifecycle(techops, canceller):
+    techops.init_ebtc()
+    canceller.init_ebtc()
+
+    timelock = techops.ebtc.lowsec_timelock
+    indexer = TimelockIndexer(
+        {"lowsec_timelock": timelock},
+        db_path=":memory:",
+        start_block=chain.height + 1,
+    )
+
+    target = techops.ebtc.active_pool
+    data = target.setFeeBps.encode_input(100)
+    salt = "0x" + "02" * 32
+    id = hash_operation(target.address, 0, data, EmptyBytes32, EmptyBytes32)
+    cancelled_id = hash_operation(target.address, 0, data, EmptyBytes32, salt)
+
+    techops.ebtc.schedule_timelock(
+        timelock, target.address, 0, data, EmptyBytes32, EmptyBytes32
+    )
+    techops.ebtc.schedule_timelock(
+        timelock, target.address, 0, data, EmptyBytes32, salt
+    )
+    indexer.sync()
+
+    pending = indexer.operations(state="pending")
+    assert {row["id"] for row in pending} == {id, cancelled_id}
+    assert pending[0]["signature"] == "SET_FEE_BPS_SIG"
+    assert pending[0]["ready_at"] == timelock.getTimestamp(id)
+    assert len(indexer.operations(target=target, selector="SET_FEE_BPS_SIG")) == 2
+
+    canceller.ebtc.cancel_lowsec_timelock(cancelled_id)
+    chain.sleep(timelock.getMinDelay() + 1)
+    chain.mine()
+    indexer.sync()
+
+    assert [row["id"] for row in indexer.operations(state="ready")] == [id]
+    assert [row["id"] for row in indexer.operations(state="cancelled")] == [
+        cancelled_id
+    ]
+
+    techops.ebtc.execute_timelock(
+        timelock, target.address, 0, data, EmptyBytes32, EmptyBytes32
+    )
+    indexer.sync()
+
+    assert [row["id"] for row in indexer.operations(state="done")] == [id]
+    assert indexer.operations(state="pending") == []
+
+
+def test_indexer_on_fork_leaves_store_untouched(techops):
+    techops.init_ebtc()
+    timelock = techops.ebtc.lowsec_timelock
+    path = cache_path("timelocks", f"{chain.id}.sqlite")
+    stat = os.stat(path) if os.path.exists(path) else None
+
+    indexer = TimelockIndexer(
+        {"lowsec_timelock": timelock}, start_block=chain.height - 1_000
+    )
+    indexer.sync()
+
+    assert indexer.cursor("lowsec_timelock") == chain.height
+    if stat is None:
+        assert not os.path.exists(path)
+    else:
+        after = os.stat(path)
+        assert (after.st_size, after.st_mtime_ns) == (stat.st_size, stat.st_mtime_ns)
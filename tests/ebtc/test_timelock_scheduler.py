@@ -0,0 +1,54 @@
+from brownie import chain
+from great_ape_safe.ape_api.helpers.ebtc.timelock_indexer import TimelockIndexer
+from great_ape_safe.ape_api.helpers.ebtc.timelock_scheduler import (
+    TIMELOCKS,
+    TimelockScheduler,
+)
+from helpers.constants import EmptyBytes32
+
+
+def fork_sleep(seconds):
+    chain.sleep(int(seconds))
+    chain.mine()
+
+
+def test_scheduler_executes_ready_operations(techops):
+    techops.init_ebtc()
+    ebtc = techops.ebtc
+    timelock = ebtc.lowsec_timelock
+    indexer = TimelockIndexer(
+        {name: getattr(ebtc, name) for name in TIMELOCKS},
+        db_path=":memory:",
+        start_block=chain.height + 1,
+    )
+    scheduler = TimelockScheduler([techops], indexer=indexer, sleep=fork_sleep)
+
+    salt = "0x" + "03" * 32
+    target = ebtc.active_pool
+    ebtc.schedule_timelock(
+        timelock, target, 0, target.setFeeBps.encode_input(100), EmptyBytes32, salt
+    )
+    ebtc.schedule_batch_timelock(
+        timelock,
+        [ebtc.cdp_manager, ebtc.borrower_operations],
+        [0, 0],
+        [
+            ebtc.cdp_manager.setBeta.encode_input(1000),
+            ebtc.borrower_operations.setFeeBps.encode_input(100),
+        ],
+        EmptyBytes32,
+    )
+
+    # nothing is ready yet
+    pending = scheduler.pending()
+    assert len(pending) == 2
+    assert scheduler.ready(pending) == []
+
+    # sleeps on the fork until the operations are ready, then executes both
+    multisends = scheduler.prepare()
+
+    assert [safe for safe, _ in multisends] == [techops]
+    assert target.feeBps() == 100
+    assert ebtc.cdp_manager.beta() == 1000
+    assert ebtc.borrower_operations.feeBps() == 100
+    assert scheduler.pending() == []
@@ -2,6 +2,7 @@ from brownie import chain
 import pytest
 import brownie
 from helpers.constants import EmptyBytes32
+from helpers.utils import hash_operation, hash_operation_batch
 
 
 def test_schedule_permissions(random_safe):
@@ -66,6 +67,28 @@ def test_execute_timelock_permissions_on_target(techops):
         )
 
 
+def test_schedule_batch_timelock_permissions_on_duplicate_target(techops):
+    techops.init_ebtc()
+
+    ## The same target twice: each of its selectors is checked, not only the first one
+    target = techops.ebtc.active_pool
+    targets = [target.address, target.address]
+    data = [
+        target.setFeeBps.encode_input(100),
+        target.increaseSystemDebt.encode_input(1),
+    ]
+    timelock = techops.ebtc.lowsec_timelock
+
+    with pytest.raises(AssertionError, match="Error: Not authorized") as exc:
+        techops.ebtc.schedule_batch_timelock(
+            timelock, targets, [0, 0], data, EmptyBytes32
+        )
+
+    ## Only the failing pair is reported
+    assert target.increaseSystemDebt.signature in str(exc.value)
+    assert target.setFeeBps.signature not in str(exc.value)
+
+
 def test_cancel_timelock_before_scheduling(techops, canceller):
     techops.init_ebtc()
     canceller.init_ebtc()
@@ -276,3 +299,24 @@ def test_schedule_batch_timelock(techops):
 
     assert targets[0].feeBps() == 100
     assert targets[1].feeBps() == 50
+
+
+def test_local_operation_ids_match_timelock(techops):
+    techops.init_ebtc()
+
+    timelock = techops.ebtc.lowsec_timelock
+    target = techops.ebtc.active_pool
+    data = target.setFeeBps.encode_input(100)
+    salt = "0x" + "01" * 32
+
+    assert hash_operation(
+        target.address, 0, data, EmptyBytes32, salt
+    ) == timelock.hashOperation(target.address, 0, data, EmptyBytes32, salt)
+
+    targets = [target.address, techops.ebtc.borrower_operations.address]
+    values = [0, 0]
+    payloads = [data, techops.ebtc.borrower_operations.setFeeBps.encode_input(100)]
+
+    assert hash_operation_batch(
+        targets, values, payloads, EmptyBytes32, salt
+    ) == timelock.hashOperationBatch(targets, values, payloads, EmptyBytes32, salt)
@@ -0,0 +1,23 @@
+import os
+
+from brownie import interface
+from helpers.addresses import registry
+from helpers.contracts import _abi_path, _store_abi, get_contract
+
+
+def test_fork_abis_are_not_stored():
+    address = registry.eth.ebtc.cdp_manager
+    contract = interface.ICdpManager(address)
+    path = _abi_path(address, "0x" + "ab" * 20)
+
+    _store_abi(address, "0x" + "ab" * 20, contract)
+
+    # forks report the chain id of mainnet, their abis must not reach the store
+    assert not os.path.exists(path)
+
+
+def test_memoized_contracts_are_reused():
+    address = registry.eth.ebtc.cdp_manager
+    contract = get_contract(address, interface.ICdpManager)
+
+    assert get_contract(address, interface.ICdpManager) is contract
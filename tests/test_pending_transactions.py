@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+
+import pytest
+from ape_safe import ApeSafe, ApiError, PendingTransactionCache
+
+SAFE = "0x9bB7B3F2f2e6e7C4e0F5B3c1b1fB8C3c6a2F4b21"
+
+
+def _entry(safe_tx_hash, nonce, modified, confirmations=1, executed=False):
+    return {
+        "safeTxHash": safe_tx_hash,
+        "nonce": nonce,
+        "modified": modified,
+        "submissionDate": "2024-01-01T00:00:00Z",
+        "isExecuted": executed,
+        "confirmations": [{"owner": f"0x{i:040x}"} for i in range(confirmations)],
+    }
+
+
+class StubResponse:
+    def __init__(self, results):
+        self.ok = True
+        self.text = ""
+        self._results = results
+
+    def json(self):
+        return {"results": self._results, "next": None}
+
+
+class StubClient:
+    """
+    Serves a single page of the queue held in `txs`, honouring `modified__gt`.
+    """
+
+    def __init__(self, txs):
+        self.txs = txs
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append(params)
+        since = params.get("modified__gt")
+        return StubResponse(
+            [
+                tx
+                for tx in self.txs.values()
+                if tx["nonce"] >= params["nonce__gte"]
+                and (since is None or tx["modified"] > since)
+            ]
+        )
+
+
+@pytest.fixture
+def stub_safe(tmp_path):
+    client = StubClient({})
+    safe = SimpleNamespace(
+        base_url="https://safe-transaction.invalid",
+        address=SAFE,
+        client=client,
+        tx_cache=PendingTransactionCache(str(tmp_path / "pending.json")),
+        retrieve_nonce=lambda: 5,
+    )
+    return safe, client
+
+
+def _sync(safe):
+    return ApeSafe.sync_pending_transactions(safe)
+
+
+def test_upsert_refreshes_confirmations_with_same_modified(tmp_path):
+    cache = PendingTransactionCache(str(tmp_path / "pending.json"))
+    cache.upsert(_entry("0x01", 5, "2024-01-01T00:00:01Z"))
+    cache.decoded["0x01"] = object()
+
+    cache.upsert(_entry("0x01", 5, "2024-01-01T00:00:01Z", confirmations=2))
+
+    assert len(cache.entries["0x01"]["confirmations"]) == 2
+    assert "0x01" not in cache.decoded
+
+
+def test_prune_drops_executed_and_stale_nonces(tmp_path):
+    cache = PendingTransactionCache(str(tmp_path / "pending.json"))
+    cache.upsert(_entry("0x01", 4, "2024-01-01T00:00:01Z"))
+    cache.upsert(_entry("0x02", 5, "2024-01-01T00:00:02Z", executed=True))
+    cache.upsert(_entry("0x03", 5, "2024-01-01T00:00:03Z"))
+
+    cache.prune(5)
+
+    assert set(cache.entries) == {"0x03"}
+    assert cache.by_nonce == {5: {"0x03"}}
+
+
+def test_sync_reconciles_deleted_and_reconfirmed_txs(stub_safe):
+    safe, client = stub_safe
+    client.txs["0x01"] = _entry("0x01", 5, "2024-01-01T00:00:01Z")
+    client.txs["0x02"] = _entry("0x02", 6, "2024-01-01T00:00:02Z")
+
+    # nothing cached yet: full listing
+    cache = _sync(safe)
+    assert "modified__gt" not in client.requests[-1]
+    assert set(cache.entries) == {"0x01", "0x02"}
+    assert not cache.needs_full_sync()
+
+    # a deletion and a confirmation without a bumped `modified` are both
+    # invisible to the incremental sync
+    del client.txs["0x02"]
+    client.txs["0x01"] = _entry("0x01", 5, "2024-01-01T00:00:01Z", confirmations=2)
+    cache = _sync(safe)
+    assert client.requests[-1]["modified__gt"] == "2024-01-01T00:00:02Z"
+    assert set(cache.entries) == {"0x01", "0x02"}
+
+    # the periodic full listing reconciles both
+    cache.last_full_sync = 0
+    assert cache.needs_full_sync()
+    cache = _sync(safe)
+    assert "modified__gt" not in client.requests[-1]
+    assert set(cache.entries) == {"0x01"}
+    assert cache.by_nonce == {5: {"0x01"}}
+    assert len(cache.entries["0x01"]["confirmations"]) == 2
+
+    # executed txs are pruned
+    client.txs["0x01"] = _entry(
+        "0x01", 5, "2024-01-01T00:00:03Z", confirmations=2, executed=True
+    )
+    cache = _sync(safe)
+    assert cache.entries == {}
+
+
+def test_sync_raises_on_service_error(stub_safe):
+    safe, client = stub_safe
+    client.get = lambda url, params=None: SimpleNamespace(ok=False, text="boom")
+
+    with pytest.raises(ApiError):
+        _sync(safe)
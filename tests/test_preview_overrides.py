@@ -0,0 +1,175 @@
+import pytest
+from brownie import Contract, accounts, web3
+from ape_safe import ApiError, OverridePreview, approved_hash_slot
+from eth_abi import encode_abi
+
+
+@pytest.fixture
+def approval_tx(techops):
+    techops.init_ebtc()
+    ebtc_token = techops.ebtc.ebtc_token
+    return techops.build_multisig_tx(
+        ebtc_token.address,
+        0,
+        ebtc_token.approve.encode_input(accounts[0], 1),
+        safe_nonce=techops.retrieve_nonce(),
+    )
+
+
+@pytest.fixture
+def owners(techops):
+    safe = Contract.from_abi("Gnosis Safe", techops.address, techops.get_contract().abi)
+    sorted_owners = sorted(safe.getOwners(), key=lambda x: int(x, 16))
+    return sorted_owners[: safe.getThreshold()]
+
+
+def test_approved_hash_slot_matches_safe_storage(techops, approval_tx, owners):
+    safe = Contract.from_abi("Gnosis Safe", techops.address, techops.get_contract().abi)
+    owner = owners[0]
+    slot = approved_hash_slot(owner, approval_tx.safe_tx_hash)
+    assert int(web3.eth.get_storage_at(techops.address, int(slot, 16)).hex(), 16) == 0
+
+    safe.approveHash(approval_tx.safe_tx_hash, {"from": accounts.at(owner, force=True)})
+
+    assert safe.approvedHashes(owner, approval_tx.safe_tx_hash) == 1
+    assert int(web3.eth.get_storage_at(techops.address, int(slot, 16)).hex(), 16) == 1
+
+
+def test_preview_with_overrides_payload(techops, approval_tx, owners, monkeypatch):
+    requests = []
+    forward = web3.provider.make_request
+
+    def make_request(method, params):
+        if method != "debug_traceCall":
+            return forward(method, params)
+        requests.append((method, params))
+        return {"error": "captured"}
+
+    monkeypatch.setattr(web3.provider, "make_request", make_request)
+    with pytest.raises(ApiError):
+        techops.preview_with_overrides(approval_tx)
+
+    [(method, [call, block, config])] = requests
+    assert method == "debug_traceCall"
+    assert block == "latest"
+    assert call["from"] == owners[0]
+    assert call["to"] == techops.address
+    assert config["tracer"] == "callTracer"
+    # every owner but the sender approves the hash through the override
+    assert config["stateOverrides"] == {
+        techops.address: {
+            "stateDiff": {
+                approved_hash_slot(owner, approval_tx.safe_tx_hash): "0x"
+                + "00" * 31
+                + "01"
+                for owner in owners[1:]
+            }
+        }
+    }
+
+
+def _log(contract, event, indexed, data, position):
+    topic = web3.keccak(text=event).hex()
+    return {
+        "address": contract.address.lower(),
+        "topics": [topic]
+        + ["0x" + encode_abi(["address"], [arg]).hex() for arg in indexed],
+        "data": "0x" + data.hex(),
+        "position": hex(position),
+    }
+
+
+@pytest.fixture
+def recorded_trace(techops, owners):
+    # callTracer output of an exec with a successful approve and a reverted subcall
+    ebtc_token = techops.ebtc.ebtc_token
+    safe = Contract.from_abi("Gnosis Safe", techops.address, techops.get_contract().abi)
+    approve = _log(
+        ebtc_token,
+        "Approval(address,address,uint256)",
+        [techops.address, accounts[0].address],
+        encode_abi(["uint256"], [1]),
+        0,
+    )
+    dropped = _log(
+        ebtc_token,
+        "Transfer(address,address,uint256)",
+        [techops.address, accounts[1].address],
+        encode_abi(["uint256"], [2]),
+        0,
+    )
+    success = _log(
+        safe,
+        "ExecutionSuccess(bytes32,uint256)",
+        [],
+        encode_abi(["bytes32", "uint256"], [b"\x01" * 32, 0]),
+        2,
+    )
+    return {
+        "type": "CALL",
+        "from": owners[0].lower(),
+        "to": techops.address.lower(),
+        "input": safe.nonce.encode_input(),
+        "gasUsed": hex(85_000),
+        "calls": [
+            {
+                "type": "CALL",
+                "from": techops.address.lower(),
+                "to": ebtc_token.address.lower(),
+                "input": ebtc_token.approve.encode_input(accounts[0], 1),
+                "gasUsed": hex(24_000),
+                "logs": [approve],
+            },
+            {
+                "type": "CALL",
+                "from": techops.address.lower(),
+                "to": ebtc_token.address.lower(),
+                "input": ebtc_token.transfer.encode_input(accounts[1], 2),
+                "gasUsed": hex(3_000),
+                "error": "execution reverted",
+                "revertReason": "ERC20: transfer amount exceeds balance",
+                "logs": [dropped],
+            },
+        ],
+        "logs": [success],
+    }
+
+
+def test_override_preview_decodes_recorded_trace(
+    techops, owners, recorded_trace, capsys
+):
+    receipt = OverridePreview(
+        accounts.at(owners[0], force=True),
+        techops.address,
+        recorded_trace["input"],
+        0,
+        recorded_trace,
+    )
+
+    assert receipt.status == 1
+    assert receipt.gas_used == 85_000
+    # logs of the reverted subcall are dropped, the rest keep their order
+    assert [event.name for event in receipt.events] == [
+        "Approval",
+        "ExecutionSuccess",
+    ]
+    assert receipt.events["Approval"]["value"] == 1
+    assert "Transfer" not in receipt.events
+
+    receipt.call_trace(True)
+    trace = capsys.readouterr().out
+    assert "[85000 gas]" in trace
+    assert "approve" in trace
+    assert "<- ERC20: transfer amount exceeds balance" in trace
+
+
+def test_override_preview_reports_revert(techops, owners, recorded_trace):
+    trace = {**recorded_trace, "error": "execution reverted", "revertReason": "GS013"}
+    receipt = OverridePreview(
+        accounts.at(owners[0], force=True), techops.address, trace["input"], 0, trace
+    )
+
+    assert receipt.status == 0
+    assert receipt.revert_msg == "GS013"
+    assert receipt.gas_used == 85_000
+    assert len(receipt.events) == 0
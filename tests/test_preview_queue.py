@@ -0,0 +1,81 @@
+import socket
+
+import pytest
+from brownie import accounts, chain, history
+
+from ape_safe import _free_ports
+
+
+@pytest.fixture
+def queued_approval(techops, monkeypatch):
+    techops.init_ebtc()
+    ebtc_token = techops.ebtc.ebtc_token
+    safe_tx = techops.build_multisig_tx(
+        ebtc_token.address,
+        0,
+        ebtc_token.approve.encode_input(accounts[0], 1),
+        safe_nonce=techops.retrieve_nonce(),
+    )
+    # stand in for the transaction service queue
+    monkeypatch.setattr(
+        type(techops), "pending_transactions", property(lambda self: [safe_tx])
+    )
+    return safe_tx
+
+
+def test_preview_queue_restores_snapshot(techops, queued_approval):
+    ebtc_token = techops.ebtc.ebtc_token
+    height = chain.height
+    nonce = techops.retrieve_nonce()
+    allowance = ebtc_token.allowance(techops, accounts[0])
+
+    techops.preview_queue()
+    results = techops.simulate_pending()
+
+    for mode in ["queue", "isolated"]:
+        assert len(results[mode]) == 1
+        assert results[mode][0]["success"]
+        assert results[mode][0]["nonce"] == queued_approval.safe_nonce
+    assert chain.height == height
+    assert techops.retrieve_nonce() == nonce
+    assert ebtc_token.allowance(techops, accounts[0]) == allowance
+
+
+def test_simulate_pending_refuses_workers_on_dirty_fork(techops, queued_approval):
+    accounts[0].transfer(accounts[1], 1)
+    assert len(history) > 0
+
+    with pytest.raises(AssertionError):
+        techops.simulate_pending(workers=1)
+
+
+def test_simulate_failing_tx_reports_no_gas(techops, monkeypatch):
+    techops.init_ebtc()
+    ebtc_token = techops.ebtc.ebtc_token
+    # more than the safe holds, the exec reverts
+    safe_tx = techops.build_multisig_tx(
+        ebtc_token.address,
+        0,
+        ebtc_token.transfer.encode_input(
+            accounts[0], ebtc_token.balanceOf(techops) + 1
+        ),
+        safe_nonce=techops.retrieve_nonce(),
+    )
+    monkeypatch.setattr(
+        type(techops), "pending_transactions", property(lambda self: [safe_tx])
+    )
+
+    result = techops.simulate_pending()["queue"][0]
+
+    assert not result["success"]
+    assert result["gas_used"] is None
+    assert result["error"]
+
+
+def test_free_ports_are_distinct_and_bindable():
+    ports = _free_ports(4)
+
+    assert len(set(ports)) == 4
+    for port in ports:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", port))
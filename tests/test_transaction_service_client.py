@@ -0,0 +1,104 @@
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from ape_safe import TransactionServiceClient
+
+
+class StubAdapter(BaseAdapter):
+    """
+    Replies with the queued status codes (or raises the queued exceptions) in order.
+    """
+
+    def __init__(self, replies):
+        super().__init__()
+        self.replies = list(replies)
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        status, headers = reply if isinstance(reply, tuple) else (reply, {})
+        response = Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = b"{}"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(time, "sleep", slept.append)
+    return slept
+
+
+def _client(replies, **kwargs):
+    client = TransactionServiceClient(min_interval=0, **kwargs)
+    adapter = StubAdapter(replies)
+    client.session.mount("https://", adapter)
+    return client, adapter
+
+
+def test_retries_after_rate_limit(sleeps):
+    client, adapter = _client([(429, {"Retry-After": "2"}), 200], backoff=0.01)
+
+    response = client.get("https://safe.test/api/v1/about/")
+
+    assert response.status_code == 200
+    assert len(adapter.sent) == 2
+    # the server's Retry-After wins over the (tiny) jittered backoff
+    assert sleeps == [2]
+
+
+def test_retries_connection_errors_with_capped_backoff(sleeps):
+    client, adapter = _client(
+        [requests.ConnectionError(), requests.ConnectionError(), 200],
+        backoff=10,
+        max_backoff=15,
+    )
+
+    assert client.get("https://safe.test/api/v1/about/").status_code == 200
+    assert len(adapter.sent) == 3
+    # full jitter: uniform in [0, min(max_backoff, backoff * 2 ** attempt)]
+    assert 0 <= sleeps[0] <= 10 and 0 <= sleeps[1] <= 15
+
+
+def test_gives_up_after_retries(sleeps):
+    client, adapter = _client([503] * 3, retries=2, backoff=0.01)
+
+    assert client.get("https://safe.test/api/v1/about/").status_code == 503
+    assert len(adapter.sent) == 3
+    assert len(sleeps) == 2
+
+
+def test_post_is_not_retried(sleeps):
+    client, adapter = _client([503, 200])
+
+    response = client.post("https://safe.test/api/v1/safes/", json={})
+
+    assert response.status_code == 503
+    assert len(adapter.sent) == 1
+    assert sleeps == []
+
+
+def test_throttle_spaces_calls_per_host(sleeps):
+    client, _ = _client([200] * 3)
+    client.min_interval = 5
+
+    client.get("https://safe.test/a")
+    client.get("https://safe.test/b")
+    client.get("https://other.test/a")
+
+    # only the second call to the same host waits for its slot
+    assert len(sleeps) == 1
+    assert 4.9 < sleeps[0] <= 5
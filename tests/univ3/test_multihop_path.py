@@ -0,0 +1,43 @@
+from brownie import chain, interface, ZERO_ADDRESS
+
+from helpers.addresses import registry
+from helpers.cache import cache_path, load_json
+
+
+def test_multihop_path_picks_deepest_tiers(treasury, wbtc):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    weth = treasury.contract(registry.eth.assets.weth)
+    badger = treasury.contract(registry.eth.assets.badger)
+    path = [weth, wbtc, badger]
+
+    multihop = uni_v3._build_multihop_path(path)
+
+    assert multihop[::2] == [token.address for token in path]
+    for i, tier in enumerate(multihop[1::2]):
+        liquidity = {}
+        for fee in uni_v3.fee_tiers:
+            pool = uni_v3.factory.getPool(path[i], path[i + 1], fee)
+            if pool != ZERO_ADDRESS:
+                liquidity[fee] = interface.IUniswapV3Pool(pool).liquidity()
+        assert tier == max(liquidity, key=liquidity.get)
+
+    # pool addresses are served from the cache, in either token order
+    assert (
+        uni_v3._pool_addresses([(wbtc, weth, 500), (weth, wbtc, 500)])
+        == [uni_v3.factory.getPool(weth, wbtc, 500)] * 2
+    )
+
+
+def test_missing_pools_are_read_again(treasury, liq, wbtc):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    assert uni_v3._pool_addresses([(liq, wbtc, 500)]) == [ZERO_ADDRESS]
+
+    pool = uni_v3.factory.createPool(liq, wbtc, 500).return_value
+
+    position = {"token0": wbtc.address, "token1": liq.address, "fee": 500}
+    assert uni_v3._get_pool(position).address == pool
+    # pools created on a fork never reach the on-disk cache
+    cached = load_json(cache_path("univ3_pools", f"{chain.id}.json"), default={})
+    assert pool not in cached.values()
@@ -0,0 +1,46 @@
+from math import sqrt
+
+from brownie import chain, interface
+
+from great_ape_safe.ape_api.helpers.uni_v3.uni_v3_sdk import Q96
+
+FEE_TIER = 500
+
+
+def test_positions_cover_every_nft(treasury, liq, wbtc):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    nfp = uni_v3.nonfungible_position_manager
+
+    pool_address = uni_v3.factory.createPool(liq, wbtc, FEE_TIER).return_value
+    pool = interface.IUniswapV3Pool(pool_address, owner=treasury.account)
+    pool.initialize(sqrt(1e18 / 10 ** wbtc.decimals()) * Q96)
+
+    # one range around the price and one above it
+    minted = [
+        uni_v3.mint_position(pool, 0.99, 1.01, 1e8, 1e18),
+        uni_v3.mint_position(pool, 1.05, 1.1, 1e8, 1e18),
+    ]
+
+    records = uni_v3.positions()
+
+    token_ids = [record["token_id"] for record in records]
+    assert len(records) == nfp.balanceOf(treasury)
+    assert set(minted) <= set(token_ids)
+
+    for record in records:
+        if record["token_id"] not in minted:
+            continue
+        assert record["pool"] == pool_address
+        assert (record["symbol0"], record["symbol1"]) == (wbtc.symbol(), liq.symbol())
+        assert record["fees0"] == record["fees1"] == 0
+
+        # the amounts are what burning the whole liquidity gives back
+        amount0, amount1 = nfp.decreaseLiquidity.call(
+            (record["token_id"], record["liquidity"], 0, 0, chain.time() + 60),
+            {"from": treasury.account},
+        )
+        assert (record["amount0"], record["amount1"]) == (amount0, amount1)
+
+    above = next(record for record in records if record["token_id"] == minted[1])
+    assert not above["in_range"]
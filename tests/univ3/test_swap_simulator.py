@@ -0,0 +1,106 @@
+import pytest
+from brownie import chain, interface
+
+from great_ape_safe.ape_api.helpers.uni_v3.simulator import DEFAULT_WORDS
+from great_ape_safe.ape_api.helpers.uni_v3.uni_v3_sdk import getSqrtRatioAtTick
+from helpers.addresses import registry
+
+
+def test_simulator_matches_quoter(treasury, wbtc):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    pool = interface.IUniswapV3Pool(
+        registry.eth.uniswap.v3pool_wbtc_weth, owner=treasury.account
+    )
+    sim = uni_v3.simulator(pool)
+    weth = pool.token1() if pool.token0() == wbtc.address else pool.token0()
+
+    for amount in [1e6, 1e8, 50e8]:
+        quote = uni_v3.quoter.quoteExactInputSingle.call(
+            wbtc, weth, pool.fee(), amount, 0
+        )
+        assert sim.amount_out(wbtc, amount) == quote
+
+    quote = uni_v3.quoter.quoteExactOutputSingle.call(weth, wbtc, pool.fee(), 1e8, 0)
+    assert sim.amount_in(weth, 1e8) == quote
+
+
+def test_simulator_reaches_target_tick(treasury, wbtc):
+    treasury.init_uni_v3()
+    pool = interface.IUniswapV3Pool(
+        registry.eth.uniswap.v3pool_wbtc_weth, owner=treasury.account
+    )
+    sim = treasury.uni_v3.simulator(pool)
+    target_tick = pool.slot0()[1] + 100
+
+    result = sim.to_tick(target_tick)
+    _, tick = sim.price_after(result["token_in"], result["amount_in"])
+
+    assert tick == target_tick
+    # one wei less is not enough
+    _, tick = sim.price_after(result["token_in"], result["amount_in"] - 1)
+    assert tick < target_tick
+
+
+def test_amount_to_tick_matches_quoter(treasury):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    pool = interface.IUniswapV3Pool(
+        registry.eth.uniswap.v3pool_wbtc_weth, owner=treasury.account
+    )
+    # far enough to cross a few initialized ticks
+    target_tick = pool.slot0()[1] - 20 * pool.tickSpacing()
+
+    solution = uni_v3.amount_to_tick(pool, target_tick)
+
+    assert solution["token_in"] == pool.token0()
+    assert sum(r["amount_in"] for r in solution["ranges"]) == solution["amount_in"]
+    assert sum(r["amount_out"] for r in solution["ranges"]) == solution["amount_out"]
+    assert solution["tick_after"] in [target_tick, target_tick - 1]
+
+    quote = uni_v3.quoter.quoteExactInputSingle.call(
+        pool.token0(),
+        pool.token1(),
+        pool.fee(),
+        solution["amount_in"],
+        getSqrtRatioAtTick(target_tick),
+    )
+    assert quote == solution["amount_out"]
+
+
+def test_amount_to_tick_beyond_simulator_words(treasury):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    pool = interface.IUniswapV3Pool(
+        registry.eth.uniswap.v3pool_wbtc_weth, owner=treasury.account
+    )
+    spacing = pool.tickSpacing()
+    # past the bitmap words the windowed simulator reads
+    target_tick = pool.slot0()[1] - (DEFAULT_WORDS + 2) * 256 * spacing
+    with pytest.raises(ValueError):
+        uni_v3.simulator(pool).to_tick(target_tick)
+
+    solution = uni_v3.amount_to_tick(pool, target_tick)
+
+    assert solution["token_in"] == pool.token0()
+    assert solution["tick_after"] in [target_tick, target_tick - 1]
+    assert sum(r["amount_in"] for r in solution["ranges"]) == solution["amount_in"]
+
+
+def test_simulator_not_reused_across_reverts(treasury, wbtc):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    pool = interface.IUniswapV3Pool(
+        registry.eth.uniswap.v3pool_wbtc_weth, owner=treasury.account
+    )
+
+    chain.snapshot()
+    chain.mine()
+    before_revert = uni_v3.simulator(pool)
+    chain.revert()
+    # same block number, another block
+    chain.sleep(1)
+    chain.mine()
+
+    assert uni_v3.simulator(pool) is not before_revert
+    assert len(uni_v3._simulators) <= uni_v3.simulators_cache_size
@@ -0,0 +1,54 @@
+from brownie import accounts, interface
+
+from helpers.addresses import registry
+
+
+def test_tick_index_matches_pool(treasury, wbtc):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    pool = interface.IUniswapV3Pool(
+        registry.eth.uniswap.v3pool_wbtc_weth, owner=treasury.account
+    )
+    index = uni_v3.tick_index(pool)
+
+    assert len(index) > 0
+    assert list(index.ticks) == sorted(index.ticks)
+    for i in [0, len(index) // 2, len(index) - 1]:
+        info = pool.ticks(index.ticks[i])
+        assert info[7]
+        assert index.liquidity_net[i] == info[1]
+        assert index.fee_growth_outside0[i] == info[2]
+
+    # active liquidity of the range holding the current tick
+    for tick_lower, tick_upper, liquidity in index.distribution():
+        if tick_lower <= index.tick < tick_upper:
+            assert liquidity == pool.liquidity()
+
+    # the index covers every word, so it quotes as far as the local simulator
+    sim = uni_v3.simulator(pool)
+    assert index.simulator().amount_out(wbtc, 1e8) == sim.amount_out(wbtc, 1e8)
+
+
+def test_tick_index_syncs_from_logs(treasury, wbtc):
+    treasury.init_uni_v3()
+    uni_v3 = treasury.uni_v3
+    weth = treasury.contract(registry.eth.assets.weth)
+    # index the pool the swap goes through
+    fee = uni_v3._build_multihop_path([wbtc, weth])[1]
+    pool = interface.IUniswapV3Pool(
+        uni_v3.factory.getPool(wbtc, weth, fee), owner=treasury.account
+    )
+    index = uni_v3.tick_index(pool)
+    tick_before = index.tick
+
+    owner = accounts.at(wbtc.owner(), force=True)
+    interface.IMintableERC20(wbtc).mint(treasury, 100e8, {"from": owner})
+    uni_v3.swap([wbtc, weth], 100e8)
+
+    index = uni_v3.tick_index(pool)
+    assert index.tick == pool.slot0()[1] != tick_before
+    assert index.liquidity == pool.liquidity()
+    # crossed ticks were read again
+    for t, growth in zip(index.ticks, index.fee_growth_outside0):
+        if index.tick <= t <= tick_before:
+            assert growth == pool.ticks(t)[2]